@@ -1,12 +1,30 @@
 # Import necessary libraries
+import uuid
+
 import streamlit as st 
 import mlxtend
 import plotly
+import plotly.graph_objects as go
 
 import pandas as pd
 import numpy as np
-from mlxtend.preprocessing import TransactionEncoder
-from mlxtend.frequent_patterns import apriori, association_rules
+
+from mba.cache import ResultCache
+from mba.display import format_page_html, itemset_highlight, page_frame, rule_highlight, sort_page, style_window
+from mba.examples import find_multi_item_rule, find_single_item_rule
+from mba.incremental import append_transactions, update_store
+from mba.instrument import recorder, records_frame
+from mba.jobs import JobManager
+from mba.mining import ALGORITHMS
+from mba.pairs import PAIR_METRICS, PairMatrix
+from mba.parallel import default_workers
+from mba.pipeline import PipelineCache
+from mba.recommend import Recommender
+from mba.rules import generate_rules
+from mba.sampling import DEFAULT_SAMPLE_SIZE, SamplePreview
+from mba.snapshot import SnapshotStore
+from mba.store import MinedStore
+from mba.timeline import FREQUENCIES, BucketedCounts, rule_timeline
 
 # Function to load CSS file
 def load_css(file_path):
@@ -16,17 +34,214 @@ def load_css(file_path):
 # Load the CSS file
 load_css('styles.css')
 
+# Stages recorded from here on belong to this script run (see the Performance panel at the end)
+run_mark = recorder.mark()
+
+# Shared cache of load -> parse -> encode results, keyed on the content hash of the file bytes.
+# Encoded matrices are memory-mapped from snapshots, so sessions and worker processes share one copy
+@st.cache_resource
+def get_pipeline_cache():
+    return PipelineCache(max_entries=4, max_bytes=2 * 1024 ** 3, snapshot_store=SnapshotStore())
+
 #add side for uploading file
 uploaded_file = st.sidebar.file_uploader("Upload a file")
 
-#default dataset: read the dataset
-transactions_df = pd.read_csv('my_transactions.csv')#change the path to the dataset
+# Progress of the chunked read, shown in the sidebar while a new file is being encoded
+ingest_progress = st.sidebar.empty()
+
+def report_ingest(fraction):
+    ingest_progress.progress(fraction, text='Reading transactions')
 
 if uploaded_file is not None:
-    transactions_df = pd.read_csv(uploaded_file)
-    #st.write(transactions_df)
-    #st.write(transactions_df.columns)
+    dataset = get_pipeline_cache().get(uploaded_file, progress=report_ingest, name=uploaded_file.name)
+else:
+    #default dataset: read the dataset
+    with open('my_transactions.csv', 'rb') as f:#change the path to the dataset
+        dataset = get_pipeline_cache().get(f, progress=report_ingest)
+
+# New batches of transactions appended to the loaded file, in upload order
+batch_files = st.sidebar.file_uploader('Append transaction batches', accept_multiple_files=True)
+
+@st.cache_resource(max_entries=8)
+def get_appended_dataset(_history, history_key, _batch, batch_key):
+    return append_transactions(_history, _batch)
+
+# The loaded file, then the file with each batch appended in turn; the last one is analysed
+dataset_versions = [dataset]
+for batch_file in batch_files or []:
+    batch = get_pipeline_cache().get(batch_file, progress=report_ingest, name=batch_file.name)
+    dataset = get_appended_dataset(dataset, dataset.key, batch, batch.key)
+    dataset_versions.append(dataset)
+
+ingest_progress.empty()
+
+# Number of encoded rows and item columns turned back into dense form for display at a time
+DISPLAY_PAGE_SIZE = 500
+DISPLAY_MAX_COLUMNS = 100
+
+# Page selector for the encoded dataset -- returns the row range currently on screen
+def display_page(key):
+    num_pages = max(1, -(-dataset.n_transactions // DISPLAY_PAGE_SIZE))
+    page = 1
+    if num_pages > 1:
+        page = st.number_input(f'Page (1-{num_pages}, {DISPLAY_PAGE_SIZE} transactions per page)', min_value=1, max_value=num_pages, value=1, step=1, key=key)
+    start = (page - 1) * DISPLAY_PAGE_SIZE
+    stop = min(start + DISPLAY_PAGE_SIZE, dataset.n_transactions)
+    st.caption(f'Showing transactions {start + 1}-{stop} of {dataset.n_transactions}')
+    return start, stop
+
+# Item columns on screen: the pinned (selected) items first, then a page of the remaining items
+def display_columns(key, pinned=()):
+    pinned = list(dict.fromkeys(pinned))
+    others = [item for item in dataset.columns if item not in set(pinned)]
+    if len(pinned) + len(others) <= DISPLAY_MAX_COLUMNS:
+        return pinned + others
+    per_page = max(1, DISPLAY_MAX_COLUMNS - len(pinned))
+    num_pages = max(1, -(-len(others) // per_page))
+    page = st.number_input(f'Item columns page (1-{num_pages}, {per_page} items per page)', min_value=1, max_value=num_pages, value=1, step=1, key=f'{key}_columns')
+    return pinned + others[(page - 1) * per_page:page * per_page]
+
+# Rows of the itemset and rule tables sent to the browser at a time
+TABLE_PAGE_SIZE = 50
+
+# Windowed HTML table over an ItemsetTable or RuleTable: sorting, column selection and paging happen
+# server-side and only the current page is decoded into item names, formatted and sent to the browser
+def windowed_table(table, key, columns, default_sort, number_formats=None):
+    sort_col, order_col, page_col = st.columns(3)
+    sort_by = sort_col.selectbox('Sort by', columns, index=columns.index(default_sort), key=f'{key}_sort')
+    ascending = order_col.toggle('Ascending', value=False, key=f'{key}_ascending')
+    shown = st.multiselect('Columns', columns, default=columns, key=f'{key}_columns') or columns
+    num_pages = max(1, -(-len(table) // TABLE_PAGE_SIZE))
+    page = page_col.number_input(f'Page (1-{num_pages})', min_value=1, max_value=num_pages, value=1, step=1, key=f'{key}_page')
+    start = (page - 1) * TABLE_PAGE_SIZE
+    stop = min(start + TABLE_PAGE_SIZE, len(table))
+    st.caption(f'Showing rows {start + 1}-{stop} of {len(table)}')
+
+    positions = sort_page(table, sort_by, ascending, start, stop, dataset.dictionary)
+    formats = {column: fmt for column, fmt in (number_formats or {}).items() if column in shown}
+    html = format_page_html(page_frame(table, positions, shown, dataset.dictionary), formats)
+    st.markdown(html, unsafe_allow_html=True)
+
+# Dense window of the encoded dataset with the Transaction_ID column, for display only
+def encoded_disp(start, stop, columns=None):
+    window = dataset.dense_rows(start, stop, columns)
+    window.insert(0, 'Transaction_ID', dataset.transaction_ids[start:stop])
+    return window
     
+# Mining backend used by the Frequent Itemsets, Association Rules and Filter tabs
+mining_algorithm = st.sidebar.selectbox('Mining algorithm', options=list(ALGORITHMS), format_func=lambda a: ALGORITHMS[a][0])
+mining_workers = st.sidebar.number_input('Worker processes (parallel ECLAT)', min_value=1, max_value=default_workers(), value=default_workers(), step=1)
+mining_runs = st.sidebar.expander('Mining runs (wall time, peak memory)')
+mining_jobs = st.sidebar.expander('Background jobs', expanded=True)
+performance_panel = st.sidebar.expander('Performance')
+
+# Lowest support the sliders allow -- itemsets and rules are mined once at this floor
+MINING_FLOOR = 0.01
+
+# On-disk cache of mining results, shared by sessions, restarts and worker processes
+@st.cache_resource
+def get_result_cache():
+    return ResultCache()
+
+# Mining runs as background jobs shared by every session; the finished jobs double as the store cache.
+# Two workers let a new job start while a superseded one is still winding down
+@st.cache_resource
+def get_job_manager():
+    return JobManager(max_workers=2, max_jobs=8)
+
+# One mining pass per dataset versions and backend; slider moves are answered by filtering it.
+# The worker count does not change the result, so it is not part of the key
+def store_job_key(versions, algorithm):
+    return ('mine', tuple(version.key for version in versions), algorithm)
+
+# Store for the dataset versions (the loaded file, then each appended batch). With batches, the store
+# of the earlier versions is taken from its finished job if there is one and updated incrementally
+def build_store(jobs, result_cache, versions, algorithm, workers):
+    if len(versions) == 1:
+        return MinedStore(versions[0], algorithm=algorithm, floor_support=MINING_FLOOR, result_cache=result_cache, workers=workers)
+    store = jobs.result(store_job_key(versions[:-1], algorithm))
+    if store is None:
+        store = build_store(jobs, result_cache, versions[:-1], algorithm, workers)
+    return update_store(store, versions[-1], versions[-2].n_transactions, result_cache=result_cache)
+
+# Uniform sample of the dataset for the fast preview, mined per threshold on demand
+@st.cache_resource(max_entries=4)
+def get_sample_preview(_dataset, dataset_key, sample_size):
+    return SamplePreview(_dataset, sample_size=sample_size)
+
+# Exact frequent itemsets at one threshold, from counting the sample candidates and their negative border
+@st.cache_resource(max_entries=8)
+def get_verification(_preview, dataset_key, sample_size, min_support):
+    return _preview.verify(min_support)
+
+# Example rules for the Association Rules tab, searched once per dataset (the search is deterministic)
+@st.cache_resource(max_entries=4)
+def get_single_item_rule(_dataset, dataset_key):
+    return find_single_item_rule(_dataset)
+
+@st.cache_resource(max_entries=4)
+def get_multi_item_rule(_dataset, dataset_key):
+    return find_multi_item_rule(_dataset)
+
+# Co-occurrence counts of every item pair (one sparse XᵀX product per dataset)
+@st.cache_resource(max_entries=4)
+def get_pair_matrix(_dataset, dataset_key):
+    return PairMatrix(_dataset)
+
+# Basket recommender over the rules meeting the filter thresholds, indexed once per thresholds and metric
+@st.cache_resource(max_entries=8)
+def get_recommender(_store, dataset_key, algorithm, min_support, min_confidence, sort_by):
+    return Recommender(_store.rules.filter(min_support, min_confidence), _store.dictionary, sort_by=sort_by)
+
+# The mining job for the current data and backend, started on first use; submitting it supersedes
+# this session's job of any earlier data or backend. The group is per session, so a job another
+# session still waits on keeps running
+def mining_job(restart=False):
+    jobs, result_cache = get_job_manager(), get_result_cache()
+    versions, algorithm, workers = list(dataset_versions), mining_algorithm, int(mining_workers)
+    session_id = st.session_state.setdefault('session_id', uuid.uuid4().hex)
+    return jobs.submit(store_job_key(versions, algorithm), lambda: build_store(jobs, result_cache, versions, algorithm, workers),
+                       group=('mine', session_id), description=f'{ALGORITHMS[algorithm][0]} on {dataset.n_transactions} transactions',
+                       restart=restart)
+
+# Jobs this run showed a placeholder for; the job list reruns the page when they finish
+waiting_jobs = []
+
+# The mined store, or None while its job runs (a progress notice is shown in its place); key tells
+# the tabs' notices apart
+def mined_store(key):
+    job = mining_job()
+    if job.state == 'done':
+        mining_runs.caption(f'{job.result.summary()} (mined once, reused)')
+        return job.result
+    if job.active:
+        st.info(f'Mining in the background ({job.describe()}). Results appear here when it finishes.')
+        waiting_jobs.append(job)
+    elif job.state == 'failed':
+        st.error(f'Mining failed: {type(job.error).__name__}: {job.error}')
+    else:
+        st.warning('Mining was cancelled.')
+    if not job.active and st.button('Run mining again', key=f'restart_mining_{key}'):
+        mining_job(restart=True)
+        st.rerun()
+    return None
+
+# Running and recent jobs with their progress, refreshed every second. When a job this run was
+# waiting for finishes, the whole page reruns so its results flow into the tabs.
+@st.fragment(run_every=1.0)
+def job_list(waiting):
+    jobs = get_job_manager().jobs()
+    if not jobs:
+        st.caption('No jobs yet.')
+    for job in jobs:
+        text_col, button_col = st.columns([4, 1])
+        status = job.describe() if job.active else job.state
+        text_col.caption(f'**{job.description}**: {status} ({job.elapsed():.1f} s)')
+        if job.active:
+            button_col.button('Cancel', key=f'cancel_job_{id(job)}', on_click=job.cancel)
+    if any(not job.active for job in waiting):
+        st.rerun()
+
 #put a download button
 st.sidebar.markdown('Download the template') 
 st.sidebar.markdown('[The template](https://github.com/umresearcher/Market-Basket-Analysis/blob/main/my_transactions.csv)')#update the link to the dataset
@@ -35,7 +250,7 @@ st.sidebar.markdown('[The template](https://github.com/umresearcher/Market-Baske
 st.title('Market Basket Analysis')
 
 #create pages tabs
-tab_intro,tab_encoded,tab_itemset,tab_freq,tab_associa,tab_metrics,tab_other_metrics,tab_filter,tab_references = st.tabs(['Introduction','The encoded dataset','ItemSets and Support','Frequent Itemsets','Association rules','Metrics for Association Rules','Other Metrics','Filter functions','Further Reading'])
+tab_intro,tab_encoded,tab_itemset,tab_freq,tab_associa,tab_metrics,tab_other_metrics,tab_filter,tab_pairs,tab_time,tab_references = st.tabs(['Introduction','The encoded dataset','ItemSets and Support','Frequent Itemsets','Association rules','Metrics for Association Rules','Other Metrics','Filter functions','Item pairs','Rules over time','Further Reading'])
 
 with tab_intro:
     #st.header("Introduction")
@@ -57,11 +272,15 @@ with tab_intro:
     be a header row with column headings as Transaction_ID, and Items. The items in a 
     transaction are comma separated. Each transaction must have 1 or more items. Different transactions can have different number 
     of items. As part of our processing, we trim any spaces around an item. 
+
+    Long-format files with one row per item (column headings Transaction_ID and Item) are also accepted, as .csv, 
+    Parquet (.parquet) or Arrow IPC (.arrow/.feather) files.
     """)
     #display the dataset
     st.write('These are the transactions and the items in each transaction from your data.')
     #st.write(transactions_df)
-    st.dataframe(transactions_df, hide_index=True)
+    start, stop = display_page('intro_page')
+    st.dataframe(dataset.transactions_window(start, stop), hide_index=True)
 
 with tab_encoded:
     st.header("The Encoded Dataset")
@@ -73,24 +292,12 @@ with tab_encoded:
     csv file has the right values and follows the template.
 
     """)
-    #conver column of transactions to list -- trim whitespaces
-    transactions = transactions_df['Items'].apply(lambda x: [item.strip() for item in x.split(',')])
-
-    # Initialize the TransactionEncoder
-    te = TransactionEncoder()
-
-    # Transform the list of transactions into an array of booleans
-    te_ary = te.fit(transactions).transform(transactions)
-
-    # Convert the array into two DataFrames - one for future processing and one for the display on this page
-    transactions_encoded = pd.DataFrame(te_ary, columns=te.columns_)
-    transactions_encoded_disp = transactions_encoded.copy()
-
-    #transactions_encoded_disp.insert(0, 'Transaction_ID', transactions_df['Transaction_ID'])
-    transactions_encoded_disp.insert(0, 'Transaction_ID', transactions_df['Transaction_ID'])
+    # Item vocabulary and sparse boolean matrix come from the cached pipeline; only the rows on screen are
+    # made dense for display
 
     # Display the encoded transaction dataset
-    st.dataframe(transactions_encoded_disp, hide_index=True)
+    start, stop = display_page('encoded_page')
+    st.dataframe(encoded_disp(start, stop, display_columns('encoded_page')), hide_index=True)
 
 with tab_itemset:
     #st.header("Itemsets and Support")
@@ -124,22 +331,20 @@ with tab_itemset:
     """)
 
     # Display items for selection
-    selected_items = st.multiselect('Select items:', options=te.columns_)
+    selected_items = st.multiselect('Select items:', options=dataset.columns)
     
         # Highlight transactions containing selected items
-    highlighted_transactions = transactions_encoded[transactions_encoded[selected_items].all(axis=1)]
-
-    # Function to apply highlighting
-    def highlight_rows(row):
-        return ['background-color: lightgreen' if row.name in highlighted_transactions.index else '' for _ in row]
+    highlight = itemset_highlight(dataset, selected_items)
 
     # Display the encoded transaction dataset without the index
-    st.dataframe(transactions_encoded.style.apply(highlight_rows, axis=1), hide_index=True)
+    start, stop = display_page('itemset_page')
+    columns = display_columns('itemset_page', selected_items)
+    st.dataframe(style_window(dataset.dense_rows(start, stop, columns), highlight, start), hide_index=True)
 
     # Calculate support for the selected items
-    support = len(highlighted_transactions) / len(transactions_encoded)
-    num_transactions_containing_itemset = len(highlighted_transactions)
-    total_transactions = len(transactions_encoded)
+    num_transactions_containing_itemset = dataset.support_count(selected_items)
+    total_transactions = dataset.n_transactions
+    support = num_transactions_containing_itemset / total_transactions
 
     # Highlight transactions
     # Define the common HTML structure
@@ -184,26 +389,46 @@ with tab_freq:
     # Input for minimum support threshold
     min_support = st.slider('Set the minimum support threshold (&gt;= 0.01):', min_value=0.01, max_value=1.0, value=0.4, step=0.01)
 
-    # Calculate frequent itemsets
-    frequent_itemsets = apriori(transactions_encoded, min_support=min_support, use_colnames=True)
-
-    # Check if there are any frequent itemsets
-    if frequent_itemsets.empty:
-        st.warning(f'There are no itemsets with support >= {min_support:.2f}.')
+    # Preview mode: supports estimated on a random sample instead of mining every transaction
+    preview_mode = st.toggle('Fast preview (estimate from a random sample)', value=False, key='freq_preview')
+
+    if preview_mode:
+        sample_size = st.number_input('Sample size (transactions)', min_value=1, max_value=max(1, dataset.n_transactions),
+                                      value=min(DEFAULT_SAMPLE_SIZE, dataset.n_transactions), step=1000, key='freq_sample_size')
+        preview = get_sample_preview(dataset, dataset.key, int(sample_size))
+        estimates = preview.estimates(min_support)
+        st.caption(f'Estimated from {preview.sample_size} of {dataset.n_transactions} transactions, mined at a lowered '
+                   f'threshold of {preview.lowered(min_support):.4f}. Support low/high is the 95% confidence interval.')
+        if estimates.empty:
+            st.warning(f'No itemsets have an estimated support >= {min_support:.2f} in the sample.')
+        else:
+            windowed_table(estimates, 'preview_itemsets', ['itemsets', 'support', 'support low', 'support high'], 'support',
+                           number_formats={'support': '.4f', 'support low': '.4f', 'support high': '.4f'})
+
+        # Verify exactly: count the sample candidates and their negative border on the full data
+        if st.button('Verify exactly', key='freq_verify'):
+            st.session_state['freq_verified'] = (dataset.key, int(sample_size), min_support)
+        if st.session_state.get('freq_verified') == (dataset.key, int(sample_size), min_support):
+            verification = get_verification(preview, dataset.key, int(sample_size), min_support)
+            if verification.complete_from_sample:
+                st.success(verification.summary())
+            else:
+                st.info(verification.summary())
+            if not verification.itemsets.empty:
+                windowed_table(verification.itemsets, 'verified_itemsets', ['itemsets', 'support'], 'support',
+                               number_formats={'support': None})
     else:
-        # Sort frequent itemsets by support in descending order
-        frequent_itemsets = frequent_itemsets.sort_values(by='support', ascending=False)
-
-        #form frequent_itemsets_disp for display purposes
-        frequent_itemsets_disp = frequent_itemsets.copy()
-        frequent_itemsets_disp['itemsets'] = frequent_itemsets_disp['itemsets'].apply(lambda x: ', '.join(list(x)))
-        #Switch columns so that itemset appears first and support second
-        frequent_itemsets_disp = frequent_itemsets_disp[['itemsets', 'support']]
-        # Apply custom CSS class to support column
-        frequent_itemsets_disp['support'] = frequent_itemsets_disp['support'].apply(lambda x: f'<div class="left-align">{x}</div>')
-
-        #Display frequent itemsets in a table
-        st.markdown(frequent_itemsets_disp.to_html(escape=False, index=False), unsafe_allow_html=True)
+        # Frequent itemsets above the threshold, filtered from the floor-threshold pass (None while it is mined)
+        store = mined_store('freq')
+        frequent_itemsets = store.itemsets.above(min_support) if store is not None else None
+
+        # Check if there are any frequent itemsets
+        if frequent_itemsets is not None and frequent_itemsets.empty:
+            st.warning(f'There are no itemsets with support >= {min_support:.2f}.')
+        elif frequent_itemsets is not None:
+            # Display frequent itemsets (itemset first, support second) one sorted page at a time
+            windowed_table(frequent_itemsets, 'frequent_itemsets', ['itemsets', 'support'], 'support',
+                           number_formats={'support': None})
 
 with tab_associa:
     st.header("Association Rules")
@@ -232,29 +457,15 @@ with tab_associa:
     indicates that there is a significant relationship between the purchase of bread and butter. -->
     """, unsafe_allow_html=True)
 
-    min_support_exp = 1 / len(transactions_encoded)
-    frequent_itemsets_exp = apriori(transactions_encoded, min_support=min_support_exp, use_colnames=True)
-    min_threhold_exp = 1 / len(transactions_encoded)
-
-    # Generate association rules
-    rules = association_rules(frequent_itemsets_exp, metric="confidence", min_threshold=min_threhold_exp)
-
-    # Select examples -- assumption: confidence < 1 is helpful for understanding
-    single_item_rules = rules[(rules['antecedents'].apply(lambda x: len(x) == 1)) & 
-                              (rules['consequents'].apply(lambda x: len(x) == 1)) & 
-                         (rules['confidence'] < 1)].sort_values(by=['support', 'confidence'], ascending=False)
-
-
-    # Check if there is at least one rule with confidence < 1. If not pick any rule with any confidence
-    if single_item_rules.empty:
-        single_item_rules = rules[(rules['antecedents'].apply(lambda x: len(x) == 1)) & 
-                                  (rules['consequents'].apply(lambda x: len(x) == 1))].sort_values(by=['support', 'confidence'], ascending=False)
+    # Select examples -- assumption: confidence < 1 is helpful for understanding. The example finder searches
+    # itemsets in descending support order within a node budget instead of mining every itemset at support 1/N,
+    # and falls back to a rule with any confidence if there is none with confidence < 1
+    single_item_rule = get_single_item_rule(dataset, dataset.key)
 
     # Check if there is at least one rule with any confidence
-    if single_item_rules.empty:
+    if single_item_rule is None:
         st.warning('No association rules found in the given dataset. Please change the dataset.')
     else:
-        single_item_rule = single_item_rules.iloc[0]
         # Format rules for display
         single_item_antecedent = ', '.join(list(single_item_rule['antecedents']))
         single_item_consequent = ', '.join(list(single_item_rule['consequents']))
@@ -268,37 +479,17 @@ with tab_associa:
         """, unsafe_allow_html=True)
 
         # Highlight transactions
-        def highlight_rows(row):
-            antecedent_items = single_item_rule['antecedents']
-            consequent_items = single_item_rule['consequents']
-            if all(row[antecedent_items]):
-                if all(row[consequent_items]):
-                    return ['background-color: lightgreen' for _ in row]
-                return ['background-color: lightblue' for _ in row]
-            return ['' for _ in row]
+        highlight = rule_highlight(dataset, single_item_rule['antecedents'], single_item_rule['consequents'])
 
         # Display the encoded transaction dataset with highlighting
-        st.dataframe(transactions_encoded_disp.style.apply(highlight_rows, axis=1), hide_index=True)
+        start, stop = display_page('single_rule_page')
+        columns = display_columns('single_rule_page', sorted(single_item_rule['antecedents']) + sorted(single_item_rule['consequents']))
+        st.dataframe(style_window(encoded_disp(start, stop, columns), highlight, start), hide_index=True)
 
-        #multi_item_rule = rules[(rules['antecedents'].apply(lambda x: len(x) > 1)) & (rules['consequents'].apply(lambda x: len(x) > 1))].iloc[0]
-
-        multi_item_rules = rules[(rules['antecedents'].apply(lambda x: len(x) > 1)) & 
-                         (rules['consequents'].apply(lambda x: len(x) > 1)) & 
-                         (rules['confidence'] < 1)].sort_values(by='support', ascending=False)
-
-        if multi_item_rules.empty:        
-            multi_item_rules = rules[(rules['antecedents'].apply(lambda x: len(x) > 1)) & (rules['consequents'].apply(lambda x: len(x) > 1))].sort_values(by=['support', 'confidence'], ascending=False)
-
-        # Check if there is at least one rule
-        if multi_item_rules.empty:
-            multi_item_rules = rules[(rules['antecedents'].apply(lambda x: len(x) > 1)) & 
-                         (rules['consequents'].apply(lambda x: len(x) == 1)) & 
-                         (rules['confidence'] < 1)].sort_values(by='support', ascending=False)
-        if multi_item_rules.empty:
-            multi_item_rules = rules[(rules['antecedents'].apply(lambda x: len(x) > 1)) & (rules['consequents'].apply(lambda x: len(x) == 1))].sort_values(by=['support', 'confidence'], ascending=False)
-        if not multi_item_rules.empty:
-            multi_item_rule = multi_item_rules.iloc[0]
+        # Multi-item example: multiple items on both sides if possible, else multiple items -> single item
+        multi_item_rule = get_multi_item_rule(dataset, dataset.key)
 
+        if multi_item_rule is not None:
             # Format rules for display
             multi_item_antecedent = ', '.join(list(multi_item_rule['antecedents']))
             multi_item_consequent = ', '.join(list(multi_item_rule['consequents']))
@@ -311,17 +502,12 @@ with tab_associa:
             """)
 
             # Highlight transactions for multi-item rule
-            def highlight_multi_item_rows(row):
-                antecedent_items = multi_item_rule['antecedents']
-                consequent_items = multi_item_rule['consequents']
-                if all(row[antecedent_items]):
-                    if all(row[consequent_items]):
-                        return ['background-color: lightgreen' for _ in row]
-                    return ['background-color: lightblue' for _ in row]
-                return ['' for _ in row]
+            highlight = rule_highlight(dataset, multi_item_rule['antecedents'], multi_item_rule['consequents'])
 
             # Display the encoded transaction dataset with highlighting for multi-item rule
-            st.dataframe(transactions_encoded_disp.style.apply(highlight_multi_item_rows, axis=1), hide_index=True)
+            start, stop = display_page('multi_rule_page')
+            columns = display_columns('multi_rule_page', sorted(multi_item_rule['antecedents']) + sorted(multi_item_rule['consequents']))
+            st.dataframe(style_window(encoded_disp(start, stop, columns), highlight, start), hide_index=True)
         else:
             st.warning('No multi-set association rules found in the given dataset. Please change the dataset.')
 
@@ -389,40 +575,34 @@ with tab_metrics:
     st.markdown("""**Illustrating Support and Confidence. Select Antecedent and Consequent**""")
 
     # Selection widgets within the tab
-    items = te.columns_
+    items = dataset.columns
     antecedent = st.multiselect("Antecedent", items)
     consequent = st.multiselect("Consequent", items)
 
-    # Function to highlight transactions based on user selections
-    def highlight_user_selected_rows(row, antecedent, consequent):
-        if all(row[antecedent]):
-            if all(row[consequent]):
-                return ['background-color: lightgreen' for _ in row]
-            return ['background-color: lightblue' for _ in row]
-        return ['' for _ in row]
-
     # Calculate support and confidence
-    def calculate_support_confidence(transactions_encoded, antecedent, consequent):
+    def calculate_support_confidence(dataset, antecedent, consequent):
         # Calculate combined support
-        combined_support = transactions_encoded[antecedent + consequent].all(axis=1).mean()
+        combined_support = dataset.support(antecedent + consequent)
 
         # Calculate confidence
-        antecedent_support = transactions_encoded[antecedent].all(axis=1).mean()
+        antecedent_support = dataset.support(antecedent)
         confidence = combined_support / antecedent_support if antecedent_support > 0 else 0
 
         return combined_support, confidence
 
     # Apply highlighting based on user selections
+    start, stop = display_page('metrics_page')
+    columns = display_columns('metrics_page', antecedent + consequent)
     if antecedent and consequent:
-        styled_df = transactions_encoded_disp.style.apply(lambda row: highlight_user_selected_rows(row, antecedent, consequent), axis=1)
+        styled_df = style_window(encoded_disp(start, stop, columns), rule_highlight(dataset, antecedent, consequent), start)
         st.dataframe(styled_df, hide_index=True)
 
         # Calculate and display support and confidence
-        combined_support, confidence = calculate_support_confidence(transactions_encoded, antecedent, consequent)
+        combined_support, confidence = calculate_support_confidence(dataset, antecedent, consequent)
         antecedent_str = ', '.join(antecedent)
         consequent_str = ', '.join(consequent)
-        num_transactions_containing_itemset = transactions_encoded[antecedent + consequent].all(axis=1).sum()
-        total_transactions = len(transactions_encoded)
+        num_transactions_containing_itemset = dataset.support_count(antecedent + consequent)
+        total_transactions = dataset.n_transactions
 
         st.markdown(f"""
         <div style="font-family: Arial, sans-serif; padding: 10px; border: 1px solid #ddd; border-radius: 5px; background-color: #f9f9f9;">
@@ -446,7 +626,7 @@ with tab_metrics:
         </div>
         """, unsafe_allow_html=True)
     else:
-        st.dataframe(transactions_encoded_disp, hide_index=True)
+        st.dataframe(encoded_disp(start, stop, columns), hide_index=True)
 
 
 with tab_other_metrics:
@@ -591,29 +771,21 @@ with tab_other_metrics:
     """, unsafe_allow_html=True)
 
     # Selection widgets within the tab
-    items = te.columns_
+    items = dataset.columns
     antecedent = st.multiselect("Antecedent", items, key="antecedent_multiselect")
     consequent = st.multiselect("Consequent", items, key="consequent_multiselect")
 
-    # Function to highlight transactions based on user selections
-    def highlight_user_selected_rows(row, antecedent, consequent):
-        if all(row[antecedent]):
-            if all(row[consequent]):
-                return ['background-color: lightgreen' for _ in row]
-            return ['background-color: lightblue' for _ in row]
-        return ['' for _ in row]
-
     # Calculate support, confidence, lift, leverage, and conviction
-    def calculate_metrics(transactions_encoded, antecedent, consequent):
+    def calculate_metrics(dataset, antecedent, consequent):
         # Calculate combined support
-        combined_support = transactions_encoded[antecedent + consequent].all(axis=1).mean()
+        combined_support = dataset.support(antecedent + consequent)
 
         # Calculate confidence
-        antecedent_support = transactions_encoded[antecedent].all(axis=1).mean()
+        antecedent_support = dataset.support(antecedent)
         confidence = combined_support / antecedent_support if antecedent_support > 0 else 0
 
         # Calculate lift
-        consequent_support = transactions_encoded[consequent].all(axis=1).mean()
+        consequent_support = dataset.support(consequent)
         lift = confidence / consequent_support if consequent_support > 0 else 0
 
         # Calculate leverage
@@ -625,16 +797,18 @@ with tab_other_metrics:
         return combined_support, confidence, lift, leverage, conviction
 
     # Apply highlighting based on user selections
+    start, stop = display_page('other_metrics_page')
+    columns = display_columns('other_metrics_page', antecedent + consequent)
     if antecedent and consequent:
-        styled_df = transactions_encoded_disp.style.apply(lambda row: highlight_user_selected_rows(row, antecedent, consequent), axis=1)
+        styled_df = style_window(encoded_disp(start, stop, columns), rule_highlight(dataset, antecedent, consequent), start)
         st.dataframe(styled_df, hide_index=True)
 
         # Calculate and display metrics
-        combined_support, confidence, lift, leverage, conviction = calculate_metrics(transactions_encoded, antecedent, consequent)
+        combined_support, confidence, lift, leverage, conviction = calculate_metrics(dataset, antecedent, consequent)
         antecedent_str = ', '.join(antecedent)
         consequent_str = ', '.join(consequent)
-        num_transactions_containing_itemset = transactions_encoded[antecedent + consequent].all(axis=1).sum()
-        total_transactions = len(transactions_encoded)
+        num_transactions_containing_itemset = dataset.support_count(antecedent + consequent)
+        total_transactions = dataset.n_transactions
 
         st.markdown(f"""
         <div style="font-family: Arial, sans-serif; padding: 10px; border: 1px solid #ddd; border-radius: 5px; background-color: #f9f9f9;">
@@ -688,7 +862,7 @@ with tab_other_metrics:
         </div>
         """, unsafe_allow_html=True)
     else:
-        st.dataframe(transactions_encoded_disp, hide_index=True)
+        st.dataframe(encoded_disp(start, stop, columns), hide_index=True)
 
 
 with tab_filter:
@@ -705,47 +879,139 @@ with tab_filter:
 
 
     # Selection widgets for filters
-    support_threshold = st.slider('Set the minimum support threshold for rules (&gt;= 0.01):', min_value=0.01, max_value=1.0, value=1/len(transactions_encoded), step=0.01, key="support_threshold")
-    confidence_threshold = st.slider('Set the minimum confidence threshold for rules:', min_value=0.0, max_value=1.0, value=1/len(transactions_encoded), step=0.01, key="confidence_threshold")
+    support_threshold = st.slider('Set the minimum support threshold for rules (&gt;= 0.01):', min_value=0.01, max_value=1.0, value=1/dataset.n_transactions, step=0.01, key="support_threshold")
+    confidence_threshold = st.slider('Set the minimum confidence threshold for rules:', min_value=0.0, max_value=1.0, value=1/dataset.n_transactions, step=0.01, key="confidence_threshold")
     antecedent_filter = st.multiselect("Filter Antecedent Items", items, key="antecedent_filter")
     consequent_filter = st.multiselect("Filter Consequent Items", items, key="consequent_filter")
 
-    frequent_itemsets = apriori(transactions_encoded, min_support=support_threshold, use_colnames=True)
-
-    # Calculate association rules
-    rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=confidence_threshold)
-
-    # Apply filters to rules
-    if antecedent_filter:
-        rules = rules[rules['antecedents'].apply(lambda x: all(item in x for item in antecedent_filter))]
-    if consequent_filter:
-        rules = rules[rules['consequents'].apply(lambda x: all(item in x for item in consequent_filter))]
-    rules = rules[rules['support'] >= support_threshold]
+    top_k_metric = st.selectbox('Show', ['all rules', 'lift', 'confidence'], format_func=lambda m: m if m == 'all rules' else f'only the top K rules by {m}', key="top_k_metric")
+    if top_k_metric != 'all rules':
+        top_k = st.number_input('K', min_value=1, value=10, step=1, key="top_k")
+
+    # Association rules meeting the thresholds and item filters, answered from the floor-threshold rules,
+    # or generated top-K with the thresholds and filters pushed into rule generation (None while they are mined)
+    store = mined_store('filter')
+    rules = None
+    if store is not None and top_k_metric == 'all rules':
+        rules = store.rules.filter(support_threshold, confidence_threshold, antecedent_filter, consequent_filter)
+        default_sort = 'support'
+    elif store is not None:
+        rules = store.top_rules(int(top_k), top_k_metric, support_threshold, confidence_threshold, antecedent_filter, consequent_filter)
+        default_sort = top_k_metric
 
     # Check if there are any rules after filtering
-    if rules.empty:
+    if rules is not None and rules.empty:
         st.warning('No association rules found with the specified filter conditions.')
-    else:
-        # Sort rules by confidence in descending order
-        # rules = rules.sort_values(by='confidence', ascending=False)
-        rules = rules.sort_values(by=['support', 'confidence'], ascending=[False, False])
+    elif rules is not None:
+        # Rules arrive sorted by support then confidence; display them one sorted page at a time
+        rule_columns = ['antecedents', 'consequents', 'support', 'confidence', 'lift', 'leverage', 'conviction']
+        windowed_table(rules, 'rules', rule_columns, default_sort,
+                       number_formats={column: '.2f' for column in ['support', 'confidence', 'lift', 'leverage', 'conviction']})
+
+    st.subheader("Recommendations for a basket")
+    st.markdown("""
+    The rules meeting the support and confidence thresholds above can recommend items for a basket: a rule applies when
+    the basket holds all of its antecedent items, and each consequent item not yet in the basket is recommended with the
+    best confidence (or lift) among the rules that apply.
+    """)
+    recommend_basket = st.multiselect("Basket", items, key="recommend_basket")
+    recommend_by = st.radio("Rank by", ['confidence', 'lift'], horizontal=True, key="recommend_by")
+    recommend_n = st.number_input('Number of recommendations', min_value=1, value=5, step=1, key="recommend_n")
+    if recommend_basket and store is not None:
+        recommender = get_recommender(store, dataset.key, mining_algorithm, support_threshold, confidence_threshold, recommend_by)
+        recommendations = recommender.recommend(recommend_basket, int(recommend_n))
+        if recommendations:
+            st.dataframe(pd.DataFrame(recommendations, columns=['item', recommend_by]), hide_index=True)
+        else:
+            st.info('No rule applies to this basket.')
+
 
+# Per-bucket counts of the itemsets frequent in any bucket, computed once per dataset and bucket size
+@st.cache_resource(max_entries=8)
+def get_bucketed_counts(_dataset, dataset_key, freq):
+    return BucketedCounts(_dataset, freq=freq, min_support=MINING_FLOOR)
 
-        # Form rules_disp for display purposes
-        rules_disp = rules.copy()
-        rules_disp['antecedents'] = rules_disp['antecedents'].apply(lambda x: ', '.join(list(x)))
-        rules_disp['consequents'] = rules_disp['consequents'].apply(lambda x: ', '.join(list(x)))
-        rules_disp = rules_disp[['antecedents', 'consequents', 'support', 'confidence', 'lift', 'leverage', 'conviction']]
-        # Apply custom CSS class to support and confidence columns
-        rules_disp['support'] = rules_disp['support'].apply(lambda x: f'<div class="left-align">{x:.2f}</div>')
-        rules_disp['confidence'] = rules_disp['confidence'].apply(lambda x: f'<div class="left-align">{x:.2f}</div>')
-        rules_disp['lift'] = rules_disp['lift'].apply(lambda x: f'<div class="left-align">{x:.2f}</div>')
-        rules_disp['leverage'] = rules_disp['leverage'].apply(lambda x: f'<div class="left-align">{x:.2f}</div>')
-        rules_disp['conviction'] = rules_disp['conviction'].apply(lambda x: f'<div class="left-align">{x:.2f}</div>')
+with tab_pairs:
+    st.header("Item Pairs")
+    st.markdown("""
+    Many questions are about pairs of items: which products are bought together, and how strongly one predicts the other.
+    The count of transactions containing each pair of items is computed for every pair at once, so the rules
+    **A → B** with a single item on each side are available without mining frequent itemsets first.
+    """)
 
-        # Display rules in a table
-        st.markdown(rules_disp.to_html(escape=False, index=False), unsafe_allow_html=True)
+    pairs = get_pair_matrix(dataset, dataset.key)
+    metric_col, support_col, top_col = st.columns(3)
+    pair_metric = metric_col.selectbox('Metric', PAIR_METRICS, index=PAIR_METRICS.index('lift'), key='pairs_metric')
+    pair_support = support_col.slider('Minimum pair support', min_value=0.0, max_value=1.0, value=0.01, step=0.01, key='pairs_support')
+    top_n = top_col.number_input('Top N pairs', min_value=1, max_value=10000, value=50, step=10, key='pairs_top_n')
 
+    # Top-N table of the ordered pairs by the chosen metric
+    top_pairs = pairs.top(int(top_n), pair_metric, pair_support)
+    if top_pairs.empty:
+        st.warning(f'No pairs of items appear together in at least {pair_support:.2f} of the transactions.')
+    else:
+        rule_columns = ['antecedents', 'consequents', 'support', 'confidence', 'lift', 'leverage', 'conviction']
+        windowed_table(top_pairs, 'top_pairs', rule_columns, pair_metric,
+                       number_formats={column: '.4f' for column in PAIR_METRICS})
+
+    # Heatmap of the metric over the most frequent items (rows: antecedent, columns: consequent)
+    if len(dataset.columns) < 2:
+        st.info('The heatmap needs at least two items.')
+    else:
+        max_heat_items = min(200, len(dataset.columns))
+        heat_items = st.slider('Items in the heatmap (most frequent first)', min_value=2, max_value=max_heat_items,
+                               value=min(30, max_heat_items), key='pairs_heat_items')
+        heat_ids = pairs.frequent_item_ids(heat_items)
+        heat_names = list(dataset.dictionary.names[heat_ids])
+        values = pairs.block(heat_ids, pair_metric)
+        # Conviction is infinite for rules that always hold; plotly cannot draw infinities
+        values[np.isinf(values)] = np.nan
+        figure = go.Figure(go.Heatmap(z=values, x=heat_names, y=heat_names, colorscale='Viridis', colorbar=dict(title=pair_metric),
+                                      hovertemplate='%{y} → %{x}<br>' + pair_metric + ': %{z:.4f}<extra></extra>'))
+        figure.update_layout(xaxis_title='Consequent', yaxis_title='Antecedent', yaxis=dict(autorange='reversed'),
+                             height=max(400, 16 * heat_items))
+        st.plotly_chart(figure, use_container_width=True)
+
+with tab_time:
+    st.header("Rules over time")
+    if dataset.timestamps is None:
+        st.info('Add a Timestamp column to the transactions file (Transaction_ID,Items,Timestamp) to mine rules per day, week or month and over a rolling window.')
+    else:
+        st.markdown("""
+        Transactions are grouped into time buckets. The rolling window covers the last N buckets; moving it adds one
+        bucket and drops another, so the supports are updated from per-bucket counts instead of mining the window again.
+        """)
+        bucket_freq = st.selectbox('Bucket', list(FREQUENCIES), format_func=FREQUENCIES.get, key="time_bucket")
+        window_length = st.number_input('Rolling window (buckets)', min_value=1, value=7, step=1, key="time_window")
+
+        # How one rule moves over time
+        time_antecedent = st.multiselect("Antecedent items", dataset.columns, key="time_antecedent")
+        time_consequent = st.multiselect("Consequent items", [item for item in dataset.columns if item not in time_antecedent], key="time_consequent")
+        if time_antecedent and time_consequent:
+            timeline = rule_timeline(dataset, time_antecedent, time_consequent, freq=bucket_freq, window=int(window_length))
+            figure = go.Figure()
+            figure.add_trace(go.Scatter(x=timeline.index, y=timeline['support'], name='support'))
+            figure.add_trace(go.Scatter(x=timeline.index, y=timeline['confidence'], name='confidence'))
+            figure.add_trace(go.Scatter(x=timeline.index, y=timeline['lift'], name='lift', yaxis='y2'))
+            figure.update_layout(title=f"{', '.join(time_antecedent)} → {', '.join(time_consequent)} (rolling {int(window_length)} buckets)",
+                                 yaxis=dict(title='support / confidence', range=[0, 1]),
+                                 yaxis2=dict(title='lift', overlaying='y', side='right'), hovermode='x unified')
+            st.plotly_chart(figure, use_container_width=True)
+
+        # Frequent itemsets and rules of one window
+        bucketed = get_bucketed_counts(dataset, dataset.key, bucket_freq)
+        if len(bucketed.labels):
+            window_end = st.select_slider('Window ending at', options=list(range(len(bucketed.labels))), value=len(bucketed.labels) - 1,
+                                          format_func=lambda b: str(bucketed.labels[b]), key="time_window_end")
+            window_support = st.slider('Minimum support in the window (&gt;= 0.01):', min_value=0.01, max_value=1.0, value=0.05, step=0.01, key="time_support")
+            window_itemsets = bucketed.window(window_end, int(window_length), window_support)
+            window_rules = generate_rules(window_itemsets, dataset.dictionary)
+            if window_rules.empty:
+                st.warning('No association rules in this window at the given support.')
+            else:
+                rule_columns = ['antecedents', 'consequents', 'support', 'confidence', 'lift', 'leverage', 'conviction']
+                windowed_table(window_rules, 'window_rules', rule_columns, 'support',
+                               number_formats={column: '.2f' for column in ['support', 'confidence', 'lift', 'leverage', 'conviction']})
 
 with tab_references:
     st.header("Further Reading")
@@ -755,3 +1021,23 @@ with tab_references:
         - Coding with Python libraries for market basket analysis, and apriori algorithm [https://www.kaggle.com/code/burakbuyukyagmur/association-rules-with-apriori](https://www.kaggle.com/code/burakbuyukyagmur/association-rules-with-apriori)
     """)
 
+
+# Started after every tab has asked for the results it needs
+with mining_jobs:
+    job_list(waiting_jobs)
+
+# Filled last, once every stage of this run has been recorded
+with performance_panel:
+    run_records = recorder.since(run_mark)
+    if run_records:
+        st.caption('Stages computed in this run (cached results are not recomputed, so they do not appear here)')
+        st.dataframe(records_frame(run_records), hide_index=True)
+    else:
+        st.caption('Every result of this run came from a cache.')
+    st.caption('Latest run of every stage')
+    st.dataframe(records_frame(recorder.latest()), hide_index=True)
+    log_col, metrics_col = st.columns(2)
+    log_col.download_button('Stage log (JSON lines)', recorder.json_lines(), file_name='mba-stages.jsonl')
+    metrics_col.download_button('OpenMetrics', recorder.openmetrics(), file_name='mba-stages.prom')
+    if recorder.log_path or recorder.metrics_path:
+        st.caption(f'Also writing to {", ".join(path for path in (recorder.log_path, recorder.metrics_path) if path)}')
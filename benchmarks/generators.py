@@ -0,0 +1,109 @@
+# Reproducible synthetic basket generators for the benchmarks.
+# Each generator returns an EncodedDataset; to_template_csv turns one back into the
+# Transaction_ID,Items template so the ingestion path can be timed on the same data.
+import io
+import os
+import sys
+
+import numpy as np
+from scipy import sparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mba.pipeline import EncodedDataset  # noqa: E402
+
+
+def _item_names(n_items):
+    width = len(str(n_items - 1))
+    return [f'item{i:0{width}d}' for i in range(n_items)]
+
+
+def _dataset(rows, cols, n_transactions, n_items):
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=bool), (rows, cols)), shape=(n_transactions, n_items))
+    matrix.sum_duplicates()
+    return EncodedDataset(None, _item_names(n_items), matrix)
+
+
+# IBM Quest-style baskets (Agrawal & Srikant, 1994), e.g. T10I4D100K is
+# quest_baskets(100_000, mean_basket_size=10, mean_pattern_size=4). Transactions are filled with
+# weighted, corrupted copies of n_patterns potentially large itemsets; each pattern shares an
+# exponentially distributed fraction of its items with the previous one.
+def quest_baskets(n_transactions, mean_basket_size=10, mean_pattern_size=4, n_items=1000, n_patterns=2000,
+                  correlation=0.5, seed=0):
+    rng = np.random.default_rng(seed)
+    patterns = []
+    previous = np.empty(0, dtype=np.int64)
+    for _ in range(n_patterns):
+        size = max(1, rng.poisson(mean_pattern_size))
+        shared = min(len(previous), size, int(round(rng.exponential(correlation) * size)))
+        items = set(rng.choice(previous, shared, replace=False).tolist()) if shared else set()
+        while len(items) < size:
+            items.add(int(rng.integers(n_items)))
+        previous = np.fromiter(items, dtype=np.int64)
+        patterns.append(previous)
+    weights = rng.exponential(1.0, n_patterns)
+    weights /= weights.sum()
+    corruption = np.clip(rng.normal(0.5, 0.1, n_patterns), 0.0, 0.99)
+
+    sizes = np.maximum(1, rng.poisson(mean_basket_size, n_transactions))
+    # One stream of pattern draws for all transactions; a corrupted pattern loses a geometric number
+    # of items (items are dropped while a uniform draw stays below its corruption level)
+    stream = rng.choice(n_patterns, size=4 * int(sizes.sum()) + 16, p=weights)
+    dropped = rng.geometric(1.0 - corruption[stream]) - 1
+    coins = rng.random(len(stream)) < 0.5
+
+    rows, cols = [], []
+    position = 0
+    for transaction, size in enumerate(sizes):
+        basket = set()
+        while len(basket) < size and position < len(stream):
+            items = patterns[stream[position]]
+            items = items[:max(len(items) - dropped[position], 0)]
+            coin = coins[position]
+            position += 1
+            # A pattern that does not fit is still added half of the time, otherwise the basket is closed
+            if basket and len(basket) + len(items) > size and coin:
+                break
+            basket.update(items.tolist())
+        rows.extend([transaction] * len(basket))
+        cols.extend(basket)
+    return _dataset(np.array(rows), np.array(cols), n_transactions, n_items)
+
+
+# Baskets with power-law (Zipfian) item popularity: item of rank r is drawn with probability
+# proportional to 1 / r ** exponent; basket sizes are Poisson
+def zipf_baskets(n_transactions, n_items=5000, mean_basket_size=8, exponent=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    sizes = rng.poisson(mean_basket_size, n_transactions).clip(1, n_items)
+    weights = 1.0 / np.arange(1, n_items + 1) ** exponent
+    weights /= weights.sum()
+    rows = np.repeat(np.arange(n_transactions), sizes)
+    cols = rng.choice(n_items, size=len(rows), p=weights)
+    return _dataset(rows, cols, n_transactions, n_items)
+
+
+# Dense long baskets over a small vocabulary (like the chess/mushroom benchmarks): every item is
+# present independently with its own probability, drawn uniformly from [low, high]
+def dense_baskets(n_transactions, n_items=60, low=0.2, high=0.9, seed=0):
+    rng = np.random.default_rng(seed)
+    probabilities = rng.uniform(low, high, n_items)
+    rows, cols = np.nonzero(rng.random((n_transactions, n_items)) < probabilities)
+    return _dataset(rows, cols, n_transactions, n_items)
+
+
+GENERATORS = {
+    'quest': quest_baskets,
+    'zipf': zipf_baskets,
+    'dense': dense_baskets,
+}
+
+
+# The dataset written back as template CSV bytes (Transaction_ID,Items)
+def to_template_csv(dataset):
+    out = io.StringIO()
+    out.write('Transaction_ID,Items\n')
+    names = np.array(dataset.columns, dtype=object)
+    indptr, indices = dataset.matrix.indptr, dataset.matrix.indices
+    for row, transaction_id in enumerate(dataset.transaction_ids):
+        out.write(f'{transaction_id},"{",".join(names[indices[indptr[row]:indptr[row + 1]]])}"\n')
+    return out.getvalue().encode()
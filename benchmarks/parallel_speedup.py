@@ -0,0 +1,44 @@
+# Speedup curve of the parallel ECLAT backend against the serial one.
+# Usage: python benchmarks/parallel_speedup.py [--transactions N] [--items N] [--min-support S] [--max-workers N]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from generators import zipf_baskets  # noqa: E402
+from mba.mining import mine  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Speedup curve of the parallel ECLAT backend against the serial one.')
+    parser.add_argument('--transactions', type=int, default=200_000)
+    parser.add_argument('--items', type=int, default=200)
+    parser.add_argument('--basket-size', type=float, default=8)
+    parser.add_argument('--min-support', type=float, default=0.002)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    dataset = zipf_baskets(args.transactions, n_items=args.items, mean_basket_size=args.basket_size)
+    dataset.vertical  # build the index outside the timings
+
+    start = time.perf_counter()
+    serial = mine(dataset, args.min_support, algorithm='eclat').frequent_itemsets
+    serial_time = time.perf_counter() - start
+    print(f'{len(serial)} frequent itemsets; serial ECLAT {serial_time:.2f} s')
+    print(f'{"workers":>8} {"seconds":>9} {"speedup":>8}')
+
+    workers = 1
+    while workers <= args.max_workers:
+        start = time.perf_counter()
+        parallel = mine(dataset, args.min_support, algorithm='parallel_eclat', workers=workers).frequent_itemsets
+        elapsed = time.perf_counter() - start
+        if not parallel.equals(serial):
+            raise SystemExit(f'parallel result with {workers} workers differs from the serial result')
+        print(f'{workers:>8} {elapsed:>9.2f} {serial_time / elapsed:>8.2f}')
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
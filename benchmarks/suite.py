@@ -0,0 +1,232 @@
+# Benchmark suite: ingestion, encoding, mining, rule generation and support queries on synthetic
+# baskets at several scales, written as JSON so runs can be compared across commits.
+# Usage: python benchmarks/suite.py [--generators quest,zipf,dense] [--scales 10000,100000]
+#                                   [--algorithms apriori,eclat] [--output results.json] [--baseline old.json]
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from generators import GENERATORS, to_template_csv  # noqa: E402
+from mba.cli import parse_bytes  # noqa: E402
+from mba.instrument import PeakRSS  # noqa: E402
+from mba.mining import ALGORITHMS, mine  # noqa: E402
+from mba.pipeline import EncodedDataset, load_and_encode  # noqa: E402
+from mba.rules import generate_rules  # noqa: E402
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Minimum support per generator, chosen so each mines a few hundred to a few thousand itemsets
+DEFAULT_SUPPORT = {'quest': 0.01, 'zipf': 0.005, 'dense': 0.5}
+
+
+# Run fn repeat times; (best wall time, highest peak RSS, result of the last run)
+def measure(fn, repeat=1):
+    best, peak, result = float('inf'), 0, None
+    for _ in range(repeat):
+        with PeakRSS(interval=0.002) as rss:
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+        best, peak = min(best, elapsed), max(peak, rss.peak)
+    return best, peak, result
+
+
+# A stage that ran out of memory or was killed
+class StageFailed(Exception):
+    pass
+
+
+# measure() in a forked child, so that a stage running out of memory (or over memory_limit bytes of
+# address space) fails on its own instead of taking the whole suite down
+def measure_isolated(fn, repeat=1, memory_limit=None):
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return measure(fn, repeat)
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+
+    def child():
+        if memory_limit:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        try:
+            sender.send(('ok', measure(fn, repeat)))
+        except MemoryError:
+            sender.send(('error', 'MemoryError'))
+
+    process = context.Process(target=child)
+    process.start()
+    sender.close()
+    try:
+        status, payload = receiver.recv()
+    except EOFError:
+        status, payload = 'error', None
+    process.join()
+    if status == 'error':
+        raise StageFailed(payload or f'killed (exit code {process.exitcode})')
+    return payload
+
+
+# Random single itemsets of 1-3 items drawn from the frequent items, for the support query timings
+def _queries(dataset, frequent_itemsets, n_queries, seed):
+    rng = np.random.default_rng(seed)
+    itemsets = frequent_itemsets.itemsets
+    singles = itemsets.ids[itemsets.offsets[:-1][itemsets.lengths == 1]]
+    if not len(singles):
+        singles = np.arange(len(dataset.columns))
+    names = np.array(dataset.columns, dtype=object)
+    return [list(names[rng.choice(singles, size=min(len(singles), rng.integers(1, 4)), replace=False)])
+            for _ in range(n_queries)]
+
+
+def run_case(generator, n_transactions, args):
+    source = GENERATORS[generator](n_transactions, seed=args.seed)
+    csv_bytes = to_template_csv(source)
+    case = {'generator': generator, 'transactions': n_transactions, 'items': len(source.columns),
+            'nnz': int(source.matrix.nnz)}
+    records = []
+
+    def record(stage, seconds, peak, **extra):
+        records.append(dict(case, stage=stage, seconds=seconds, peak_rss_bytes=peak, **extra))
+        timing = f'{seconds:>9.3f} s {peak / 1024 ** 2:>9.1f} MiB' if seconds is not None else f'{"failed":>25}'
+        print(f'{generator:>6} {n_transactions:>9} {stage:<24} {timing} '
+              + ' '.join(f'{key}={value}' for key, value in extra.items()), file=sys.stderr)
+
+    seconds, peak, dataset = measure(lambda: load_and_encode(csv_bytes), args.repeat)
+    record('ingest', seconds, peak, input_bytes=len(csv_bytes))
+
+    # Encoding: the sparse DataFrame handed to mlxtend, built on a fresh dataset each run
+    def encode():
+        fresh = EncodedDataset(dataset.transaction_ids, dataset.columns, dataset.matrix)
+        fresh.sparse_frame()
+        return fresh
+    seconds, peak, _ = measure(encode, args.repeat)
+    record('encode', seconds, peak)
+
+    min_support = args.min_support if args.min_support is not None else DEFAULT_SUPPORT[generator]
+    frequent_itemsets = None
+    for algorithm in args.algorithms:
+        try:
+            seconds, peak, mining = measure_isolated(lambda: mine(dataset, min_support, algorithm=algorithm),
+                                                     args.repeat, args.memory_limit)
+        except StageFailed as error:
+            record(f'mine:{algorithm}', None, None, min_support=min_support, error=str(error))
+            continue
+        record(f'mine:{algorithm}', seconds, peak, min_support=min_support, itemsets=len(mining.frequent_itemsets),
+               traced_peak_bytes=mining.peak_memory)
+        if ALGORITHMS[algorithm][2] is None:
+            frequent_itemsets = mining.frequent_itemsets
+    if frequent_itemsets is None:
+        frequent_itemsets = mine(dataset, min_support, algorithm='eclat').frequent_itemsets
+
+    seconds, peak, rules = measure(lambda: generate_rules(frequent_itemsets, dataset.dictionary), args.repeat)
+    record('rules', seconds, peak, rules=len(rules))
+
+    queries = _queries(dataset, frequent_itemsets, args.queries, args.seed)
+    dataset.vertical  # index built outside the query timings
+    seconds, peak, _ = measure(lambda: [dataset.support(items) for items in queries], args.repeat)
+    record('support_queries', seconds, peak, queries=len(queries), us_per_query=round(seconds / len(queries) * 1e6, 2))
+    return records
+
+
+def _git(*command):
+    try:
+        return subprocess.run(['git', *command], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(args):
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'args': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+    }
+
+
+# Compare seconds with a baseline run, case by case; returns the regressed records. Stages faster
+# than min_seconds in both runs are listed but not flagged, their ratios are mostly timer noise.
+def compare(results, baseline, tolerance, min_seconds=0.05):
+    def key(record):
+        return record['generator'], record['transactions'], record['stage']
+    previous = {key(record): record for record in baseline['results']}
+    regressions = []
+    print(f'\n{"case":<44} {"baseline":>10} {"current":>10} {"ratio":>7}', file=sys.stderr)
+    for record in results:
+        old = previous.get(key(record))
+        if old is None or not old['seconds'] or record['seconds'] is None:
+            continue
+        ratio = record['seconds'] / old['seconds']
+        slow = max(record['seconds'], old['seconds']) >= min_seconds
+        flag = '  REGRESSION' if ratio > tolerance and slow else ''
+        print(f'{" ".join(map(str, key(record))):<44} {old["seconds"]:>10.3f} {record["seconds"]:>10.3f} {ratio:>7.2f}{flag}',
+              file=sys.stderr)
+        if flag:
+            regressions.append(record)
+    return regressions
+
+
+def _list(text):
+    return [part.strip() for part in text.split(',') if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the mining pipeline on synthetic baskets.')
+    parser.add_argument('--generators', type=_list, default=list(GENERATORS))
+    parser.add_argument('--scales', type=lambda text: [int(part) for part in _list(text)], default=[10_000, 100_000],
+                        help='numbers of transactions, comma-separated')
+    parser.add_argument('--algorithms', type=_list, default=['apriori', 'fpgrowth', 'eclat'])
+    parser.add_argument('--min-support', type=float, default=None, help='override the per-generator defaults')
+    parser.add_argument('--queries', type=int, default=1000, help='support queries per case')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per stage; the fastest is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--memory-limit', type=parse_bytes, default=None,
+                        help='address space allowed to each mining stage, e.g. 4G; a stage over it is recorded as failed')
+    parser.add_argument('--output', default=None, help='JSON file to write (default: stdout)')
+    parser.add_argument('--baseline', default=None, help='earlier JSON output to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.2, help='slowdown ratio reported as a regression')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='stages faster than this are never flagged')
+    args = parser.parse_args(argv)
+    for name in args.generators:
+        if name not in GENERATORS:
+            parser.error(f'unknown generator {name!r}; choose from {sorted(GENERATORS)}')
+    for name in args.algorithms:
+        if name not in ALGORITHMS:
+            parser.error(f'unknown algorithm {name!r}; choose from {sorted(ALGORITHMS)}')
+
+    results = []
+    for generator in args.generators:
+        for n_transactions in args.scales:
+            results.extend(run_case(generator, n_transactions, args))
+    report = {'meta': metadata(args), 'results': results}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_seconds)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+# Market basket analysis helpers used by the Streamlit app (analysis.py)
@@ -0,0 +1,6 @@
+# python -m mba: headless mining, see mba/cli.py
+import sys
+
+from mba.cli import main
+
+sys.exit(main())
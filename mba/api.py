@@ -0,0 +1,104 @@
+# Headless load -> encode -> mine -> rules pipeline, for scheduled jobs that run outside the
+# Streamlit app (see mba/cli.py for the command line entry point).
+import os
+from contextlib import nullcontext
+
+import pandas as pd
+
+from mba.ingest import DEFAULT_CHUNKSIZE
+from mba.instrument import recorder
+from mba.itemsets import ItemsetTable
+from mba.mining import ALGORITHMS, complete_itemsets, mine
+from mba.partitioned import mine_partitioned
+from mba.pipeline import load_and_encode
+from mba.rules import generate_rules
+
+CSV_EXTENSIONS = ('.csv', '.txt')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+
+# Raised when the encoded data or a mining run does not fit in the memory budget
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+# Encoded dataset of a transactions file (template CSV, long-format CSV, Parquet or Arrow)
+def load_dataset(path, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    with open(path, 'rb') as f:
+        return load_and_encode(f, progress=progress, name=os.path.basename(path), chunksize=chunksize)
+
+
+# Frequent itemsets (MiningResult, maximal/closed for the condensed algorithms) and rules (RuleTable)
+# of a dataset. memory_budget, in bytes, is checked against the encoded data before mining and the traced
+# mining peak afterwards (memory is traced for the run when there is a budget).
+def mine_rules(dataset, min_support, min_confidence=0.0, algorithm='apriori', workers=1, max_len=None,
+               min_lift=None, top_k=None, sort_by='confidence', memory_budget=None):
+    if memory_budget is not None and dataset.nbytes() > memory_budget:
+        raise MemoryBudgetExceeded(f'The encoded transactions take {dataset.nbytes()} bytes, '
+                                   f'more than the memory budget of {memory_budget} bytes.')
+    with recorder.tracing_memory() if memory_budget is not None else nullcontext():
+        mining = mine(dataset, min_support, algorithm=algorithm, max_len=max_len, workers=workers)
+    if memory_budget is not None and mining.peak_memory > memory_budget:
+        raise MemoryBudgetExceeded(f'Mining peaked at {mining.peak_memory} bytes, '
+                                   f'more than the memory budget of {memory_budget} bytes.')
+    frequent_itemsets = mining.frequent_itemsets
+    if ALGORITHMS[algorithm][2] is not None:
+        frequent_itemsets = complete_itemsets(dataset, frequent_itemsets)
+    rules = generate_rules(frequent_itemsets, dataset.dictionary, min_support=min_support,
+                           min_confidence=min_confidence, min_lift=min_lift, top_k=top_k, sort_by=sort_by)
+    return mining, rules
+
+
+# Out-of-core variant of mine_rules for files larger than memory: the file is mined in two passes over
+# chunks of chunksize transactions (see mba/partitioned.py). Returns (PartitionedResult, RuleTable).
+def mine_rules_partitioned(path, min_support, min_confidence=0.0, algorithm='apriori', max_len=None, min_lift=None,
+                           top_k=None, sort_by='confidence', chunksize=DEFAULT_CHUNKSIZE, memory_budget=None):
+    with recorder.tracing_memory() if memory_budget is not None else nullcontext():
+        result = mine_partitioned(path, min_support, algorithm=algorithm, max_len=max_len, chunksize=chunksize)
+    if memory_budget is not None and result.mining.peak_memory > memory_budget:
+        raise MemoryBudgetExceeded(f'Partitioned mining peaked at {result.mining.peak_memory} bytes, '
+                                   f'more than the memory budget of {memory_budget} bytes; try a smaller --chunksize.')
+    rules = generate_rules(result.all_itemsets, result.dictionary, min_support=min_support,
+                           min_confidence=min_confidence, min_lift=min_lift, top_k=top_k, sort_by=sort_by)
+    return result, rules
+
+
+def _metric_columns(table):
+    return ['support'] if isinstance(table, ItemsetTable) else list(table.metrics.columns)
+
+
+# Arrow table of an ItemsetTable or RuleTable; itemset columns become lists of dictionary-encoded
+# item names built straight from the id arrays
+def to_arrow(table, dictionary):
+    import pyarrow as pa
+    names = pa.array(list(dictionary.names), type=pa.string())
+    columns = {}
+    for name in table.itemset_columns:
+        itemsets = table.column(name)
+        items = pa.DictionaryArray.from_arrays(pa.array(itemsets.ids), names)
+        columns[name] = pa.LargeListArray.from_arrays(pa.array(itemsets.offsets), items)
+    for metric in _metric_columns(table):
+        columns[metric] = pa.array(table.column(metric))
+    return pa.table(columns)
+
+
+def output_format(path):
+    lowered = path.lower()
+    if lowered.endswith(PARQUET_EXTENSIONS):
+        return 'parquet'
+    if lowered.endswith(CSV_EXTENSIONS):
+        return 'csv'
+    raise ValueError(f'Unsupported output format for {path!r}: use .parquet or .csv.')
+
+
+# Write an ItemsetTable or RuleTable to Parquet (lists of item names) or CSV (items joined with ', '),
+# chosen by the file extension
+def write_table(table, dictionary, path):
+    if output_format(path) == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(to_arrow(table, dictionary), path)
+    else:
+        frame = pd.DataFrame({name: table.column(name).join(dictionary) for name in table.itemset_columns})
+        for metric in _metric_columns(table):
+            frame[metric] = table.column(metric)
+        frame.to_csv(path, index=False)
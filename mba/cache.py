@@ -0,0 +1,121 @@
+# Disk-backed cache of mining results shared by every session and worker process.
+# Entries are Parquet files keyed on (dataset hash, algorithm, min_support, min_confidence);
+# writes are atomic renames and reads refresh the file times, so eviction is size-based LRU.
+import hashlib
+import os
+import tempfile
+
+from mba.itemsets import ItemsetArray, ItemsetTable
+from mba.rules import RuleTable
+
+DEFAULT_CACHE_DIR = os.environ.get('MBA_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'market-basket-analysis'))
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+# Bumped whenever the file layout changes, so older entries are never read back
+FORMAT_VERSION = 2
+
+
+def result_key(dataset_key, algorithm, min_support, min_confidence):
+    raw = f'{FORMAT_VERSION}|{dataset_key}|{algorithm}|{float(min_support)!r}|{float(min_confidence)!r}'
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+# Itemsets are stored as Parquet lists of int32 item ids, built from the ragged arrays without copying rows
+def _list_column(itemsets):
+    import pyarrow as pa
+    return pa.LargeListArray.from_arrays(pa.array(itemsets.offsets), pa.array(itemsets.ids))
+
+
+def _itemset_array(column):
+    column = column.combine_chunks()
+    offsets = column.offsets.to_numpy()
+    return ItemsetArray(column.flatten().to_numpy(zero_copy_only=False), offsets - offsets[0])
+
+
+def _to_arrow(table):
+    import pyarrow as pa
+    if isinstance(table, ItemsetTable):
+        return pa.table({'support': table.support, 'itemsets': _list_column(table.itemsets)})
+    columns = {'antecedents': _list_column(table.antecedents), 'consequents': _list_column(table.consequents)}
+    columns.update({name: table.metrics[name].to_numpy(dtype=float) for name in table.metrics.columns})
+    return pa.table(columns)
+
+
+def _itemsets_from_arrow(arrow):
+    return ItemsetTable(arrow.column('support').to_numpy(), _itemset_array(arrow.column('itemsets')))
+
+
+def _rules_from_arrow(arrow):
+    metrics = arrow.drop_columns(['antecedents', 'consequents']).to_pandas()
+    return RuleTable(_itemset_array(arrow.column('antecedents')), _itemset_array(arrow.column('consequents')), metrics)
+
+
+class ResultCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key):
+        return {part: os.path.join(self.directory, f'{key}.{part}.parquet') for part in ('itemsets', 'rules')}
+
+    # (ItemsetTable, RuleTable) for the given parameters, or None on a miss
+    def load(self, dataset_key, algorithm, min_support, min_confidence):
+        paths = self._paths(result_key(dataset_key, algorithm, min_support, min_confidence))
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        try:
+            tables = {part: pq.read_table(path) for part, path in paths.items()}
+            for path in paths.values():
+                os.utime(path)
+            return _itemsets_from_arrow(tables['itemsets']), _rules_from_arrow(tables['rules'])
+        except (FileNotFoundError, OSError, ValueError, KeyError, pa.ArrowException):
+            return None
+
+    # Store the results; each file is written to a temporary name and renamed into place
+    def save(self, dataset_key, algorithm, min_support, min_confidence, frequent_itemsets, rules):
+        key = result_key(dataset_key, algorithm, min_support, min_confidence)
+        import pyarrow.parquet as pq
+        paths = self._paths(key)
+        for part, table in (('rules', rules), ('itemsets', frequent_itemsets)):
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            os.close(fd)
+            try:
+                pq.write_table(_to_arrow(table), tmp_path)
+                os.replace(tmp_path, paths[part])
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self.evict(keep=key)
+
+    # Remove least recently used entries until the cache fits in max_bytes, never removing keep
+    def evict(self, keep=None):
+        entries = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith('.parquet'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            key = name.split('.', 1)[0]
+            size, last_used = entries.get(key, (0, 0.0))
+            entries[key] = (size + stat.st_size, max(last_used, stat.st_mtime))
+
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda entry: entry[1][1]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for path in self._paths(key).values():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+    def total_bytes(self):
+        return sum(os.path.getsize(os.path.join(self.directory, name))
+                   for name in os.listdir(self.directory) if name.endswith('.parquet'))
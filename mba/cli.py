@@ -0,0 +1,110 @@
+# Command line entry point: mine a transactions file and write frequent itemsets and rules.
+# Usage: python -m mba TRANSACTIONS [--itemsets-out FILE] [--rules-out FILE] [--algorithm NAME]
+#                     [--min-support S] [--min-confidence C] [--workers N] [--memory-budget 4G] [--partitioned]
+#                     [--serve PORT]
+import argparse
+import os
+import sys
+
+from mba.api import MemoryBudgetExceeded, load_dataset, mine_rules, mine_rules_partitioned, output_format, write_table
+from mba.ingest import DEFAULT_CHUNKSIZE
+from mba.instrument import recorder
+from mba.mining import ALGORITHMS
+from mba.recommend import Recommender, make_server
+
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+# Byte count from a size such as 512M, 4G or 1073741824
+def parse_bytes(text):
+    text = text.strip().upper().removesuffix('B').removesuffix('I')
+    unit = text[-1] if text and text[-1] in _UNITS else ''
+    try:
+        return int(float(text[:len(text) - len(unit)]) * _UNITS[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid size: {text!r}') from None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m mba', description='Mine frequent itemsets and association rules from a transactions file.')
+    parser.add_argument('transactions', help='template CSV (Transaction_ID,Items), long-format CSV, Parquet or Arrow file')
+    parser.add_argument('--itemsets-out', help='where to write the frequent itemsets (.parquet or .csv)')
+    parser.add_argument('--rules-out', help='where to write the association rules (.parquet or .csv)')
+    parser.add_argument('--algorithm', choices=sorted(ALGORITHMS), default='apriori')
+    parser.add_argument('--min-support', type=float, default=0.01)
+    parser.add_argument('--min-confidence', type=float, default=0.0)
+    parser.add_argument('--min-lift', type=float, default=None)
+    parser.add_argument('--max-len', type=int, default=None, help='largest itemset size to mine')
+    parser.add_argument('--top-k', type=int, default=None, help='keep only the K best rules by --sort-by')
+    parser.add_argument('--sort-by', choices=['confidence', 'lift', 'support'], default='confidence')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (parallel_eclat)')
+    parser.add_argument('--memory-budget', type=parse_bytes, default=None, metavar='SIZE',
+                        help='fail (exit status 3) when the encoded data is larger than SIZE, e.g. 4G, checked before mining, '
+                             'or when the traced mining peak was, checked after the run (it does not stop a run in progress)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='rows read at a time from CSV input')
+    parser.add_argument('--partitioned', action='store_true',
+                        help='mine out of core in two passes over chunks of --chunksize transactions (for files larger than memory)')
+    parser.add_argument('--perf-log', help='append a JSON line per pipeline stage (wall time, peak memory, sizes) to this file')
+    parser.add_argument('--metrics-file', help='write per-stage OpenMetrics text to this file')
+    parser.add_argument('--serve', type=int, metavar='PORT', default=None,
+                        help='after mining, serve basket recommendations from the rules on this port (POST /recommend)')
+    parser.add_argument('--host', default='127.0.0.1', help='address --serve listens on')
+    parser.add_argument('--recommend-by', choices=['confidence', 'lift'], default='confidence',
+                        help='metric recommendations are ranked by')
+    parser.add_argument('--quiet', action='store_true', help='do not print the summary')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    for path in (args.itemsets_out, args.rules_out):
+        if path:
+            try:
+                output_format(path)
+            except ValueError as error:
+                parser.error(str(error))
+    if not os.path.exists(args.transactions):
+        parser.error(f'{args.transactions}: no such file')
+    # Peak memory is only worth its tracing overhead when the stage records are exported
+    recorder.configure(log_path=args.perf_log, metrics_path=args.metrics_file,
+                       trace_memory=True if args.perf_log or args.metrics_file else None)
+
+    try:
+        if args.partitioned:
+            dataset, rules = mine_rules_partitioned(args.transactions, args.min_support, min_confidence=args.min_confidence,
+                                                    algorithm=args.algorithm, max_len=args.max_len, min_lift=args.min_lift,
+                                                    top_k=args.top_k, sort_by=args.sort_by, chunksize=args.chunksize,
+                                                    memory_budget=args.memory_budget)
+            mining, summary = dataset.mining, dataset.summary()
+        else:
+            dataset = load_dataset(args.transactions, chunksize=args.chunksize)
+            mining, rules = mine_rules(dataset, args.min_support, min_confidence=args.min_confidence,
+                                       algorithm=args.algorithm, workers=args.workers, max_len=args.max_len,
+                                       min_lift=args.min_lift, top_k=args.top_k, sort_by=args.sort_by,
+                                       memory_budget=args.memory_budget)
+            summary = mining.summary()
+    except MemoryBudgetExceeded as error:
+        print(f'error: {error}', file=sys.stderr)
+        if not args.partitioned:
+            print('hint: --partitioned mines the file in chunks without loading it whole', file=sys.stderr)
+        return 3
+
+    if args.itemsets_out:
+        write_table(mining.frequent_itemsets, dataset.dictionary, args.itemsets_out)
+    if args.rules_out:
+        write_table(rules, dataset.dictionary, args.rules_out)
+    if not args.quiet:
+        print(f'{dataset.n_transactions} transactions, {len(dataset.columns)} items', file=sys.stderr)
+        print(f'{summary}; {len(rules)} rules', file=sys.stderr)
+    if args.serve is not None:
+        server = make_server(Recommender(rules, dataset.dictionary, sort_by=args.recommend_by), args.host, args.serve)
+        host, port = server.server_address[:2]
+        print(f'serving recommendations on http://{host}:{port}/recommend (Ctrl+C to stop)', file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    return 0
@@ -0,0 +1,75 @@
+# Vectorized row highlighting for the encoded-dataset tables.
+# Highlight state is computed once per selection as a uint8 code per transaction (from the
+# vertical index), and CSS is only built for the rows and columns of the window on screen.
+import numpy as np
+import pandas as pd
+
+from mba.instrument import instrumented
+from mba.itemsets import ItemsetArray
+
+NO_HIGHLIGHT = 0
+ANTECEDENT_ONLY = 1
+FULL_MATCH = 2
+
+HIGHLIGHT_STYLES = np.array(['', 'background-color: lightblue', 'background-color: lightgreen'], dtype=object)
+
+
+# Green for transactions containing every item in items
+def itemset_highlight(dataset, items):
+    return dataset.contains_all(list(items)).astype(np.uint8) * FULL_MATCH
+
+
+# Green for transactions containing X and Y, blue for those containing X only
+def rule_highlight(dataset, antecedent, consequent):
+    antecedent_mask = dataset.contains_all(list(antecedent))
+    full_mask = dataset.contains_all(list(antecedent) + list(consequent))
+    return antecedent_mask.astype(np.uint8) + full_mask.astype(np.uint8)
+
+
+# Style a display window (rows start..start+len(window)) with the highlight codes in one call
+def style_window(window, codes, start):
+    styles = HIGHLIGHT_STYLES[codes[start:start + len(window)]]
+    styles = np.repeat(styles[:, None], window.shape[1], axis=1)
+    frame = pd.DataFrame(styles, index=window.index, columns=window.columns)
+    return window.style.apply(lambda _: frame, axis=None)
+
+
+# Server-side windowing for the itemset and rule tables (ItemsetTable / RuleTable): sort, slice and
+# format one page only. Itemsets stay as item ids until the rows on screen are decoded.
+
+# Positions start..stop of table after a stable sort on one column; only that column is sorted.
+# Itemset columns sort alphabetically by their display text, ranking the ids with the item dictionary.
+def sort_page(table, sort_by, ascending, start, stop, dictionary=None):
+    if sort_by is None:
+        return np.arange(start, min(stop, len(table)))
+    values = table.column(sort_by)
+    if isinstance(values, ItemsetArray):
+        order = values.sort_order(descending=not ascending, dictionary=dictionary)
+    else:
+        order = np.argsort(values if ascending else -values, kind='stable')
+    return order[start:stop]
+
+
+# Decoded frame of the given rows and columns: itemsets joined into text with the item dictionary
+def page_frame(table, positions, columns, dictionary):
+    page = {}
+    for column in columns:
+        values = table.column(column)
+        if isinstance(values, ItemsetArray):
+            page[column] = values.take(positions).join(dictionary)
+        else:
+            page[column] = values[positions]
+    return pd.DataFrame(page, columns=columns)
+
+
+# HTML for one page: number columns formatted with vectorized string ops (fmt None keeps the
+# full repr) and wrapped in the left-align div used by styles.css
+@instrumented('render', inputs=lambda page, *args, **kwargs: {'rows': len(page), 'columns': len(page.columns)},
+              outputs=lambda html: {'characters': len(html)})
+def format_page_html(page, number_formats=None):
+    page = page.copy()
+    for column, fmt in (number_formats or {}).items():
+        values = page[column].to_numpy(dtype=float)
+        text = values.astype(str) if fmt is None else np.char.mod(f'%{fmt}', values)
+        page[column] = np.char.add(np.char.add('<div class="left-align">', text), '</div>')
+    return page.to_html(escape=False, index=False)
@@ -0,0 +1,34 @@
+# ECLAT core on packed bitsets, shared by the serial and the parallel (prefix-partitioned) backends
+from mba.jobs import checkpoint
+from mba.vertical import popcount
+
+
+# Frequent single items as (column id, bitset, count) candidates, in column order
+def frequent_singles(vertical, min_support):
+    n = vertical.n_transactions
+    singles = []
+    for item_id in range(len(vertical.columns)):
+        count = len(vertical.tids(item_id))
+        if count / n >= min_support:
+            singles.append((item_id, vertical.bitset(item_id), count))
+    return singles
+
+
+# Depth-first extension of prefix by each candidate: each step ANDs the candidate bitset with
+# the bitsets of the candidates after it. Appends (count, itemset ids) to out in DFS order.
+def eclat_extend(prefix, candidates, n, min_support, max_len, out):
+    checkpoint(stage='mine', level=len(prefix) + 1, candidates=len(candidates), itemsets=len(out))
+    for k, (item_id, bits, count) in enumerate(candidates):
+        itemset = prefix + (item_id,)
+        out.append((count, itemset))
+        if max_len is not None and len(itemset) >= max_len:
+            continue
+        suffix = []
+        for other_id, other_bits, _ in candidates[k + 1:]:
+            joined = bits & other_bits
+            joined_count = popcount(joined)
+            if joined_count / n >= min_support:
+                suffix.append((other_id, joined, joined_count))
+        if suffix:
+            eclat_extend(itemset, suffix, n, min_support, max_len, out)
+    return out
@@ -0,0 +1,116 @@
+# Targeted search for the example rules shown on the Association Rules tab.
+# Instead of mining every itemset at support 1/N, itemsets are enumerated best-first in
+# non-increasing support order on the vertical index, only up to the size the example needs,
+# and the search stops as soon as the best rule of the required shape is known or the node or heap
+# budget runs out. Both budgets count work, not time, so the same data always gives the same example;
+# the time budget is only a backstop against pathological inputs and is not reached in normal runs.
+import heapq
+import time
+from itertools import combinations
+
+import pandas as pd
+
+# Kinds of heap entries: an itemset with its exact support, or a cursor that will generate
+# the next child of an itemset (its priority is an upper bound on that child's support)
+_NODE = 0
+_CURSOR = 1
+
+
+class SearchBudget:
+    def __init__(self, max_nodes=50000, max_heap=200000, time_budget=60.0):
+        self.time_budget = time_budget
+        self.max_nodes = max_nodes
+        self.max_heap = max_heap
+
+
+# Yield (itemset ids, support count) in non-increasing support order, for itemsets of at most
+# max_len items that occur in at least one transaction. Items are ranked by descending support and
+# itemsets are tuples of ranks, extended only with higher ranks so every itemset is generated once.
+def _best_first(vertical, max_len, budget):
+    counts = [len(vertical.tids(i)) for i in range(len(vertical.columns))]
+    ranked = sorted(range(len(counts)), key=lambda i: -counts[i])
+    n_transactions = vertical.n_transactions
+    # Heap entries: (-priority, kind, ranks, support count of ranks[:-1])
+    heap = [(-counts[ranked[0]], _CURSOR, (0,), n_transactions)] if ranked else []
+    deadline = time.perf_counter() + budget.time_budget
+    nodes = 0
+
+    while heap and nodes < budget.max_nodes and time.perf_counter() < deadline:
+        priority, kind, ranks, parent_count = heapq.heappop(heap)
+        if kind == _NODE:
+            nodes += 1
+            count = -priority
+            yield tuple(ranked[r] for r in ranks), count
+            if len(ranks) < max_len and ranks[-1] + 1 < len(ranked):
+                bound = min(count, counts[ranked[ranks[-1] + 1]])
+                heapq.heappush(heap, (-bound, _CURSOR, ranks + (ranks[-1] + 1,), count))
+            continue
+
+        # A cursor stands for the child ranks; materialise it and advance to the next sibling
+        count = vertical.support_count([vertical.columns[ranked[r]] for r in ranks])
+        if count > 0:
+            heapq.heappush(heap, (-count, _NODE, ranks, parent_count))
+        if ranks[-1] + 1 < len(ranked):
+            bound = min(parent_count, counts[ranked[ranks[-1] + 1]])
+            heapq.heappush(heap, (-bound, _CURSOR, ranks[:-1] + (ranks[-1] + 1,), parent_count))
+        if len(heap) > budget.max_heap:
+            return
+
+
+# Best-first rules of the requested shapes, in order of preference. Each shape is a
+# (antecedent size test, consequent size test, require confidence < 1) triple.
+def _search(dataset, shapes, max_len, budget):
+    vertical = dataset.vertical
+    n = dataset.n_transactions
+    best = [None] * len(shapes)
+    best_support = [None] * len(shapes)
+
+    for ids, count in _best_first(vertical, max_len, budget):
+        # Stop once the preferred shape is found and no later itemset can tie its support
+        if best[0] is not None and count < best_support[0]:
+            break
+        if len(ids) < 2:
+            continue
+        for antecedent_size in range(1, len(ids)):
+            for antecedent in combinations(ids, antecedent_size):
+                consequent = tuple(i for i in ids if i not in antecedent)
+                antecedent_count = vertical.support_count([vertical.columns[i] for i in antecedent])
+                confidence = count / antecedent_count
+                for k, (antecedent_ok, consequent_ok, below_one) in enumerate(shapes):
+                    if not (antecedent_ok(len(antecedent)) and consequent_ok(len(consequent))):
+                        continue
+                    if below_one and confidence >= 1:
+                        continue
+                    if best_support[k] is not None and count < best_support[k]:
+                        continue
+                    if best[k] is None or confidence > best[k]['confidence']:
+                        best[k] = {'antecedents': frozenset(dataset.columns[i] for i in antecedent),
+                                   'consequents': frozenset(dataset.columns[i] for i in consequent),
+                                   'support': count / n, 'confidence': confidence}
+                        best_support[k] = count
+
+    for rule in best:
+        if rule is not None:
+            return pd.Series(rule)
+    return None
+
+
+def _one(size):
+    return size == 1
+
+
+def _many(size):
+    return size > 1
+
+
+# Highest-support single-item rule (X -> Y with one item each), preferring confidence < 1
+def find_single_item_rule(dataset, budget=None):
+    shapes = [(_one, _one, True), (_one, _one, False)]
+    return _search(dataset, shapes, 2, budget or SearchBudget())
+
+
+# Highest-support multi-item rule, preferring multi -> multi items then multi -> single item,
+# and confidence < 1 within each. Itemsets of at most four items are enough for both shapes.
+def find_multi_item_rule(dataset, budget=None):
+    shapes = [(_many, _many, True), (_many, _many, False), (_many, _one, True), (_many, _one, False)]
+    return _search(dataset, shapes, 4, budget or SearchBudget())
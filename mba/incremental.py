@@ -0,0 +1,120 @@
+# Incremental mining for appended transaction batches, in the style of FUP (Cheung et al., 1996).
+# The frequent itemsets of the history are kept with their counts. When a batch is appended,
+# candidates are generated level by level as in Apriori over the updated data, and:
+#   - an itemset that was frequent in the history gets its new count as history count + batch count;
+#   - any other itemset can only be frequent overall if it is frequent in the batch, so only those
+#     are counted against the full data.
+# Batch counts come from a vertical index over the batch rows alone, so the work on the history
+# is limited to the itemsets that cross the threshold. Rules are refreshed by rescoring the existing
+# ones and splitting only the newly frequent itemsets.
+import hashlib
+import time
+
+import numpy as np
+from scipy import sparse
+
+from mba.instrument import instrumented
+from mba.itemsets import ItemsetArray, ItemsetTable, SizeIndex, apriori_gen
+from mba.jobs import checkpoint
+from mba.pipeline import EncodedDataset
+from mba.rules import RuleTable, generate_rules, rescore_rules
+from mba.store import MinedStore
+from mba.vertical import VerticalIndex
+
+
+# history followed by batch as one dataset. Items new in the batch are appended after the history's
+# vocabulary, so item ids of the history (and of its mined itemsets) stay valid.
+def append_transactions(history, batch):
+    new_items = [item for item in batch.columns if item not in history.column_index]
+    columns = history.columns + new_items
+    index = {item: i for i, item in enumerate(columns)}
+    batch_map = np.array([index[item] for item in batch.columns], dtype=np.int32)
+
+    batch_matrix = sparse.csr_matrix((batch.matrix.data, batch_map[batch.matrix.indices], batch.matrix.indptr),
+                                     shape=(batch.n_transactions, len(columns)))
+    batch_matrix.sort_indices()
+    history_matrix = sparse.csr_matrix((history.matrix.data, history.matrix.indices, history.matrix.indptr),
+                                       shape=(history.n_transactions, len(columns)))
+    matrix = sparse.vstack([history_matrix, batch_matrix], format='csr')
+    transaction_ids = np.concatenate([history.transaction_ids, batch.transaction_ids])
+    timestamps = None
+    if history.timestamps is not None and batch.timestamps is not None:
+        timestamps = np.concatenate([history.timestamps, batch.timestamps])
+    key = hashlib.sha256(f'{history.key}+{batch.key}'.encode()).hexdigest() if history.key and batch.key else None
+    return EncodedDataset(transaction_ids, columns, matrix, key=key, timestamps=timestamps)
+
+
+# What an update did, shown next to the mining summary
+class UpdateStats:
+    def __init__(self, n_history, n_batch, candidates, rescanned, wall_time):
+        self.n_history = n_history
+        self.n_batch = n_batch
+        self.candidates = candidates
+        self.rescanned = rescanned
+        self.wall_time = wall_time
+
+    def summary(self):
+        return (f'updated incrementally with {self.n_batch} new transactions ({self.candidates} candidates, '
+                f'{self.rescanned} re-counted on the full data), {self.wall_time * 1000:.1f} ms')
+
+
+# Every frequent itemset of dataset (history rows 0..n_history-1 followed by the batch), given
+# the complete frequent itemsets of the history at the same min_support.
+# Returns (ItemsetTable, number of candidates, number re-counted on the full data).
+def update_itemsets(history_itemsets, dataset, n_history, min_support):
+    n_total = dataset.n_transactions
+    n_batch = max(n_total - n_history, 1)
+    batch = VerticalIndex(dataset.matrix[n_history:], dataset.columns)
+    history_counts = np.rint(history_itemsets.support * n_history).astype(np.int64)
+    history_index = SizeIndex(history_itemsets.itemsets)
+
+    # Single items are counted for every row at once from the column sums
+    candidates = np.arange(len(dataset.columns), dtype=np.int32)[:, None]
+    counts = np.diff(dataset.vertical.csc.indptr)
+    n_candidates, rescanned = len(candidates), 0
+
+    supports, levels = [], []
+    while True:
+        frequent = (counts >= 0) & (counts / n_total >= min_support)
+        levels.append(candidates[frequent])
+        supports.append(counts[frequent] / n_total)
+        candidates = apriori_gen(candidates[frequent])
+        if not len(candidates):
+            break
+        checkpoint(stage='update', level=candidates.shape[1], candidates=len(candidates))
+
+        known = history_index.find(candidates)
+        batch_counts = batch.count_rows(candidates)
+        # known is -1 for itemsets not frequent in the history (possibly every one, when it has none)
+        known_counts = history_counts[np.maximum(known, 0)] if len(history_counts) else 0
+        counts = np.where(known >= 0, known_counts + batch_counts, -1)
+        crossing = np.flatnonzero((known < 0) & (batch_counts / n_batch >= min_support))
+        counts[crossing] = dataset.vertical.count_rows(candidates[crossing])
+        n_candidates += len(candidates)
+        rescanned += len(crossing)
+
+    itemsets = ItemsetTable(np.concatenate(supports), ItemsetArray.concat(ItemsetArray.from_padded(ids) for ids in levels))
+    return itemsets, n_candidates, rescanned
+
+
+# Rules after an update: the previous rules rescored on the new supports (dropping those whose
+# itemsets are no longer frequent) plus the rules of the newly frequent itemsets only
+def update_rules(rules, previous_itemsets, frequent_itemsets, dictionary):
+    kept = rescore_rules(rules, frequent_itemsets)
+    new = SizeIndex(previous_itemsets.itemsets).find_itemsets(frequent_itemsets.itemsets) < 0
+    return RuleTable.concat([kept, generate_rules(frequent_itemsets, dictionary, only=new)])
+
+
+# Store for history + batch from the store of the history, without re-mining the history.
+# dataset is append_transactions(history, batch) and n_history the number of history rows.
+@instrumented('update', inputs=lambda store, dataset, n_history, *args, **kwargs: {
+    'history': n_history, 'batch': dataset.n_transactions - n_history})
+def update_store(store, dataset, n_history, result_cache=None):
+    start = time.perf_counter()
+    previous = store.itemsets.frequent_itemsets
+    frequent_itemsets, n_candidates, rescanned = update_itemsets(previous, dataset, n_history, store.floor_support)
+    rules = update_rules(store.rules.rules, previous, frequent_itemsets, dataset.dictionary)
+    stats = UpdateStats(n_history, dataset.n_transactions - n_history, n_candidates, rescanned,
+                        time.perf_counter() - start)
+    return MinedStore(dataset, algorithm=store.algorithm, floor_support=store.floor_support,
+                      result_cache=result_cache, mined=(frequent_itemsets, rules), update=stats)
@@ -0,0 +1,359 @@
+# Streaming ingestion of Transaction_ID,Items files (with an optional Timestamp column).
+# The file is read in chunks; item names are interned into integer ids as they are first seen and
+# each chunk is appended to the CSR arrays (int32 column ids + row lengths) of the encoded store, so
+# no per-row Python lists or raw Items strings are kept beyond the current chunk.
+import csv
+import itertools
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Accepted names (case-insensitive) of the optional transaction time column
+TIMESTAMP_COLUMNS = ('timestamp', 'datetime', 'date', 'time')
+
+
+# Name of the timestamp column in names, or None if the file has none
+def resolve_timestamp(names):
+    lowered = {name.lower(): name for name in names}
+    return next((lowered[c] for c in TIMESTAMP_COLUMNS if c in lowered), None)
+
+
+# Parse timestamps into naive UTC datetime64[ns]; unparseable values become NaT
+def to_datetime64(values):
+    parsed = pd.to_datetime(pd.Series(values), errors='coerce', utc=True, format='mixed')
+    return parsed.dt.tz_localize(None).to_numpy(dtype='datetime64[ns]')
+
+
+# Total size of a seekable file-like object, or None if it cannot be determined
+def source_size(source):
+    try:
+        position = source.tell()
+        source.seek(0, 2)
+        size = source.tell()
+        source.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+# Incrementally built CSR store with an interning item vocabulary
+class StreamingEncoder:
+    def __init__(self):
+        self.vocabulary = {}
+        self._indices = []
+        self._row_lengths = []
+        self._transaction_ids = []
+        self._timestamps = []
+
+    # Intern the item names of one chunk and append its rows to the store. Empty item names (an empty
+    # Items cell, or doubled commas) are skipped; a transaction without items stays as an empty row.
+    def add_chunk(self, transaction_ids, items, timestamps=None):
+        if not len(items):
+            return
+        items = items.fillna('')
+        exploded = items.str.split(',').explode()
+        exploded = exploded[exploded.notna()].str.strip()
+        exploded = exploded[exploded != '']
+        rows = exploded.index.to_numpy() - items.index[0]
+
+        local_codes, uniques = pd.factorize(exploded, sort=False)
+        global_ids = np.fromiter((self.vocabulary.setdefault(item, len(self.vocabulary)) for item in uniques),
+                                 dtype=np.int32, count=len(uniques))
+        pairs = pd.DataFrame({'row': rows, 'item': global_ids[local_codes]}).drop_duplicates()
+
+        self._indices.append(pairs['item'].to_numpy(dtype=np.int32))
+        self._row_lengths.append(np.bincount(pairs['row'].to_numpy(), minlength=len(items)).astype(np.int64))
+        self._transaction_ids.append(np.asarray(transaction_ids))
+        if timestamps is not None:
+            self._timestamps.append(to_datetime64(timestamps))
+
+    # Columns sorted by item name (as TransactionEncoder does), the CSR matrix over them and the
+    # transaction timestamps (None without a timestamp column)
+    def finish(self):
+        columns = sorted(self.vocabulary)
+        remap = np.empty(len(columns), dtype=np.int32)
+        for new_id, item in enumerate(columns):
+            remap[self.vocabulary[item]] = new_id
+
+        indices = remap[np.concatenate(self._indices)] if self._indices else np.array([], dtype=np.int32)
+        lengths = np.concatenate(self._row_lengths) if self._row_lengths else np.array([], dtype=np.int64)
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        matrix = sparse.csr_matrix((np.ones(len(indices), dtype=bool), indices, indptr), shape=(len(lengths), len(columns)))
+        matrix.sort_indices()
+
+        transaction_ids = np.concatenate(self._transaction_ids) if self._transaction_ids else np.array([])
+        timestamps = np.concatenate(self._timestamps) if self._timestamps else None
+        return transaction_ids, columns, matrix, timestamps
+
+
+# Read a Transaction_ID,Items file (path or file-like) in chunks and encode it.
+# progress, if given, is called with the fraction of the file read so far.
+def stream_encode(source, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    total = source_size(source)
+    encoder = StreamingEncoder()
+    with pd.read_csv(source, chunksize=chunksize, dtype={'Items': str}) as reader:
+        for chunk in reader:
+            timestamp_column = resolve_timestamp(chunk.columns)
+            timestamps = chunk[timestamp_column] if timestamp_column is not None else None
+            encoder.add_chunk(chunk['Transaction_ID'].to_numpy(), chunk['Items'], timestamps)
+            if progress is not None and total:
+                progress(min(source.tell() / total, 1.0))
+    if progress is not None and not total:
+        progress(1.0)
+    return encoder.finish()
+
+
+# Long-format (one row per transaction_id, item) and Arrow-native inputs.
+# Columns are dictionary encoded by Arrow, so only the distinct item names and transaction ids
+# are ever turned into Python objects; everything per line item stays in integer arrays.
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.ipc', '.feather')
+TRANSACTION_COLUMNS = ('transaction_id',)
+TEMPLATE_ITEM_COLUMNS = ('items',)
+LONG_ITEM_COLUMNS = ('item', 'item_name', 'sku')
+HEADER_PEEK_BYTES = 64 * 1024
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as error:
+        raise ImportError('Reading long-format, Parquet or Arrow files requires pyarrow (pip install pyarrow).') from error
+
+
+# Find the transaction id column and the item column of a schema (case-insensitive).
+# Returns (transaction column, item column, True if the item column holds comma-joined Items).
+def resolve_columns(names):
+    lowered = {name.lower(): name for name in names}
+    transaction_column = next((lowered[c] for c in TRANSACTION_COLUMNS if c in lowered), None)
+    if transaction_column is None:
+        raise ValueError(f'No Transaction_ID column found in {list(names)}.')
+    for candidates, joined in ((TEMPLATE_ITEM_COLUMNS, True), (LONG_ITEM_COLUMNS, False)):
+        for candidate in candidates:
+            if candidate in lowered:
+                return transaction_column, lowered[candidate], joined
+    raise ValueError(f'No Items/Item column found in {list(names)}.')
+
+
+# Encoder fed with Arrow record batches; transaction ids and items are interned through their dictionaries
+class ArrowEncoder:
+    def __init__(self, transaction_column, item_column, joined_items, timestamp_column=None):
+        self.transaction_column = transaction_column
+        self.item_column = item_column
+        self.joined_items = joined_items
+        self.timestamp_column = timestamp_column
+        self.vocabulary = {}
+        self.transactions = {}
+        self._rows = []
+        self._items = []
+        self._timestamps = []
+
+    # Map the values of a dictionary array onto ids in the given interning table
+    @staticmethod
+    def _intern(dictionary, table):
+        return np.fromiter((table.setdefault(value, len(table)) for value in dictionary.to_pylist()),
+                           dtype=np.int64, count=len(dictionary))
+
+    # Lines without a transaction id are dropped; null or empty items are skipped, so a transaction
+    # whose lines hold no item stays as an empty row
+    def add_batch(self, batch):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        batch = batch.filter(pc.is_valid(batch.column(self.transaction_column)))
+        transactions = batch.column(self.transaction_column)
+        items = batch.column(self.item_column)
+        if pa.types.is_dictionary(items.type):
+            items = items.cast(items.type.value_type)
+
+        transaction_codes = pc.dictionary_encode(transactions)
+        transaction_ids = self._intern(transaction_codes.dictionary, self.transactions)
+        rows = transaction_ids[transaction_codes.indices.to_numpy(zero_copy_only=False)]
+        if self.timestamp_column is not None:
+            self._timestamps.append((rows, to_datetime64(batch.column(self.timestamp_column).to_pandas())))
+
+        # Template-format Items are split on commas in Arrow; list_parent_indices maps each item to its row
+        if self.joined_items:
+            split = pc.split_pattern(items, ',')
+            rows = rows[pc.list_parent_indices(split).to_numpy()]
+            items = pc.list_flatten(split)
+
+        items = pc.utf8_trim_whitespace(items)
+        valid = pc.fill_null(pc.not_equal(items, ''), False)
+        item_codes = pc.dictionary_encode(items.filter(valid))
+        item_ids = self._intern(item_codes.dictionary, self.vocabulary)
+        self._rows.append(rows[valid.to_numpy(zero_copy_only=False)])
+        self._items.append(item_ids[item_codes.indices.to_numpy()])
+
+    # Columns sorted by item name, the CSR matrix over them (rows in order of first appearance) and the
+    # transaction timestamps, taken from the last line of each transaction (None without a timestamp column)
+    def finish(self):
+        columns = sorted(self.vocabulary)
+        remap = np.empty(len(columns), dtype=np.int32)
+        for new_id, item in enumerate(columns):
+            remap[self.vocabulary[item]] = new_id
+
+        rows = np.concatenate(self._rows) if self._rows else np.array([], dtype=np.int64)
+        items = remap[np.concatenate(self._items)] if self._items else np.array([], dtype=np.int32)
+        matrix = sparse.coo_matrix((np.ones(len(rows), dtype=bool), (rows, items)),
+                                   shape=(len(self.transactions), len(columns))).tocsr()
+        matrix.sort_indices()
+
+        timestamps = None
+        if self.timestamp_column is not None:
+            timestamps = np.full(len(self.transactions), np.datetime64('NaT'), dtype='datetime64[ns]')
+            for rows, values in self._timestamps:
+                timestamps[rows] = values
+        return np.array(list(self.transactions), dtype=object), columns, matrix, timestamps
+
+
+# Iterate over the record batches of a Parquet, Arrow IPC or long-format CSV source,
+# yielding (batch, fraction of the source read so far)
+def _arrow_batches(source, file_format, chunksize):
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    if file_format == 'parquet':
+        parquet_file = pq.ParquetFile(source)
+        total = max(parquet_file.metadata.num_rows, 1)
+        done = 0
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            done += batch.num_rows
+            yield batch, done / total
+    elif file_format == 'arrow':
+        try:
+            reader = ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i), (i + 1) / reader.num_record_batches
+        except pa.ArrowInvalid:
+            source.seek(0)
+            for batch in ipc.open_stream(source):
+                yield batch, None
+    else:
+        total = source_size(source)
+        reader = pa_csv.open_csv(source, read_options=pa_csv.ReadOptions(block_size=1 << 24))
+        for batch in reader:
+            yield batch, (min(source.tell() / total, 1.0) if total else None)
+
+
+# Detect the input format from the file name, or from the CSV header for .csv/unknown names
+def detect_format(source, name=None):
+    lowered = (name or '').lower()
+    if lowered.endswith(PARQUET_EXTENSIONS):
+        return 'parquet'
+    if lowered.endswith(ARROW_EXTENSIONS):
+        return 'arrow'
+    position = source.tell()
+    head = source.read(HEADER_PEEK_BYTES)
+    source.seek(position)
+    if isinstance(head, bytes):
+        head = head.decode('utf-8', errors='replace')
+    # Header line, whatever the line endings (the template uses bare \r)
+    header = re.split(r'\r\n|\r|\n', head, maxsplit=1)[0]
+    names = [column.strip() for column in next(csv.reader([header]), [])]
+    _, _, joined = resolve_columns(names)
+    return 'csv' if joined else 'long_csv'
+
+
+# Encode any supported source: template CSV (chunked pandas path) or long-format CSV, Parquet
+# and Arrow IPC (Arrow path). Returns (transaction ids, columns, CSR matrix, timestamps or None).
+# Raises ValueError for a source without any transaction, e.g. a CSV with only its header line.
+def encode_source(source, name=None, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    file_format = detect_format(source, name)
+    if file_format == 'csv':
+        encoded = stream_encode(source, chunksize=chunksize, progress=progress)
+    else:
+        _require_pyarrow()
+        encoder = None
+        for batch, fraction in _arrow_batches(source, file_format, chunksize):
+            if encoder is None:
+                names = batch.schema.names
+                encoder = ArrowEncoder(*resolve_columns(names), timestamp_column=resolve_timestamp(names))
+            encoder.add_batch(batch)
+            if progress is not None and fraction is not None:
+                progress(fraction)
+        encoded = encoder.finish() if encoder is not None else (np.array([]), [], sparse.csr_matrix((0, 0), dtype=bool), None)
+    if not len(encoded[0]):
+        raise ValueError('No transactions found: the file has no rows with a Transaction_ID.')
+    return encoded
+
+
+# Regroup an iterator of row blocks into parts of at least chunksize rows; a last part smaller than
+# half a chunk is merged into the one before it, so no part is much smaller than the others
+def _rechunk(parts, chunksize, concat, length):
+    pending, size, ready = [], 0, None
+    for part in parts:
+        pending.append(part)
+        size += length(part)
+        if size >= chunksize:
+            if ready is not None:
+                yield ready
+            ready, pending, size = concat(pending), [], 0
+    if pending:
+        if ready is not None and size < chunksize // 2:
+            pending.insert(0, ready)
+        elif ready is not None:
+            yield ready
+        ready = concat(pending)
+    if ready is not None:
+        yield ready
+
+
+# Move the rows of the last transaction of each long-format table to the next one, so that no
+# transaction is split between chunks (lines of a transaction must be contiguous in the file)
+def _whole_transactions(tables, transaction_column):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    carry = None
+    for table in tables:
+        if carry is not None:
+            table = pa.concat_tables([carry, table])
+        ids = table.column(transaction_column)
+        last = pc.equal(ids, ids[len(ids) - 1]).to_numpy(zero_copy_only=False)
+        others = np.flatnonzero(~last)
+        split = others[-1] + 1 if len(others) else 0
+        carry = table.slice(split)
+        if split:
+            yield table.slice(0, split)
+    if carry is not None and carry.num_rows:
+        yield carry
+
+
+# Encode a source one chunk of about chunksize whole transactions at a time, for out-of-core mining.
+# Yields (columns, CSR matrix) per chunk; each chunk has its own columns, sorted by item name.
+def iter_encoded_chunks(source, name=None, chunksize=DEFAULT_CHUNKSIZE):
+    file_format = detect_format(source, name)
+    if file_format == 'csv':
+        with pd.read_csv(source, chunksize=chunksize, dtype={'Items': str}) as reader:
+            for chunk in _rechunk(reader, chunksize, pd.concat, len):
+                encoder = StreamingEncoder()
+                encoder.add_chunk(chunk['Transaction_ID'].to_numpy(), chunk['Items'])
+                _, columns, matrix, _ = encoder.finish()
+                yield columns, matrix
+        return
+
+    _require_pyarrow()
+    import pyarrow as pa
+
+    batches = (batch for batch, _ in _arrow_batches(source, file_format, chunksize))
+    first = next(batches, None)
+    if first is None:
+        return
+    transaction_column, item_column, joined = resolve_columns(first.schema.names)
+    tables = _rechunk((pa.Table.from_batches([batch]) for batch in itertools.chain([first], batches)),
+                      chunksize, pa.concat_tables, len)
+    if not joined:
+        tables = _whole_transactions(tables, transaction_column)
+    for table in tables:
+        encoder = ArrowEncoder(transaction_column, item_column, joined)
+        encoder.add_batch(table.combine_chunks().to_batches()[0])
+        _, columns, matrix, _ = encoder.finish()
+        yield columns, matrix
@@ -0,0 +1,299 @@
+# Hot-path instrumentation: every pipeline stage (ingest, encode, mining, rule generation, filtering,
+# rendering) records its wall time and input/output sizes with the recorder below, and its peak traced
+# memory when memory tracing is on. Tracing is opt-in (MBA_TRACE_MEMORY=1) because tracemalloc slows
+# down every allocation, which would skew the very timings being recorded.
+# MBA_PERF_LOG (a JSON lines file) and MBA_METRICS_FILE (an OpenMetrics text file, e.g. for the
+# node_exporter textfile collector) export the records as they arrive.
+# PeakRSS measures the resident set size of a block without tracing; mining always reports it.
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# One run of a stage. peak_memory is the traced allocation peak above what was allocated when the
+# stage started (None when memory tracing is off); inputs and outputs map size names to counts.
+class StageRecord:
+    def __init__(self, stage, sequence, thread, inputs=None):
+        self.stage = stage
+        self.sequence = sequence
+        self.thread = thread
+        self.started = time.time()
+        self.wall_time = None
+        self.peak_memory = None
+        self.inputs = dict(inputs or {})
+        self.outputs = {}
+        self.error = None
+
+    def as_dict(self):
+        return {'stage': self.stage, 'started': self.started, 'wall_time': self.wall_time,
+                'peak_memory': self.peak_memory, 'inputs': self.inputs, 'outputs': self.outputs, 'error': self.error}
+
+
+# Bounded history of stage records. Stages may nest (mining inside a store build): tracemalloc has one
+# global peak, so an inner stage hands the peak it saw to the enclosing one before resetting it.
+# Concurrent sessions share the tracer, so their peaks are approximate while they overlap.
+class Recorder:
+    def __init__(self, max_records=500, log_path=None, metrics_path=None, trace_memory=False):
+        self.records = deque(maxlen=max_records)
+        self.log_path = log_path
+        self.metrics_path = metrics_path
+        self.trace_memory = trace_memory
+        self._totals = {}
+        self._sequence = 0
+        self._open = 0
+        self._started_tracing = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def configure(self, log_path=None, metrics_path=None, trace_memory=None):
+        if log_path is not None:
+            self.log_path = log_path
+        if metrics_path is not None:
+            self.metrics_path = metrics_path
+        if trace_memory is not None:
+            self.trace_memory = trace_memory
+
+    # Trace memory inside the with block (e.g. to check a run against a memory budget), then restore
+    @contextmanager
+    def tracing_memory(self):
+        previous, self.trace_memory = self.trace_memory, True
+        try:
+            yield
+        finally:
+            self.trace_memory = previous
+
+    # Sequence number of the next record; pass it to since() to get the records of one script run
+    def mark(self):
+        with self._lock:
+            return self._sequence
+
+    # Records made by the calling thread from mark on, oldest first
+    def since(self, mark):
+        thread = threading.get_ident()
+        with self._lock:
+            return [record for record in self.records if record.sequence >= mark and record.thread == thread]
+
+    # Latest record of every stage
+    def latest(self):
+        with self._lock:
+            latest = {}
+            for record in self.records:
+                latest[record.stage] = record
+            return list(latest.values())
+
+    @contextmanager
+    def stage(self, name, **inputs):
+        with self._lock:
+            record = StageRecord(name, self._sequence, threading.get_ident(), inputs)
+            self._sequence += 1
+        stack = self._local.__dict__.setdefault('stack', [])
+        frame = self._enter(stack)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as error:
+            record.error = type(error).__name__
+            raise
+        finally:
+            record.wall_time = time.perf_counter() - start
+            record.peak_memory = self._exit(stack, frame)
+            self._finish(record)
+
+    # Start tracing with the first open stage; returns this stage's [baseline, peak seen] frame
+    def _enter(self, stack):
+        if not self.trace_memory:
+            return None
+        with self._lock:
+            if self._open == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            self._open += 1
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        frame = [current, current]
+        stack.append(frame)
+        return frame
+
+    def _exit(self, stack, frame):
+        if frame is None:
+            return None
+        _, peak = tracemalloc.get_traced_memory()
+        peak = max(frame[1], peak)
+        stack.pop()
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        with self._lock:
+            self._open -= 1
+            if self._open == 0 and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        return max(0, peak - frame[0])
+
+    def _finish(self, record):
+        with self._lock:
+            self.records.append(record)
+            runs, seconds = self._totals.get(record.stage, (0, 0.0))
+            self._totals[record.stage] = (runs + 1, seconds + record.wall_time)
+            if self.log_path:
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps(record.as_dict()) + '\n')
+            if self.metrics_path:
+                _write_atomic(self.metrics_path, self._openmetrics())
+
+    def openmetrics(self):
+        with self._lock:
+            return self._openmetrics()
+
+    # OpenMetrics exposition: run counts and total seconds per stage, plus the latest run's figures
+    def _openmetrics(self):
+        latest = {}
+        for record in self.records:
+            latest[record.stage] = record
+        lines = ['# HELP mba_stage_runs Pipeline stage runs.', '# TYPE mba_stage_runs counter']
+        lines += [f'mba_stage_runs_total{{stage="{stage}"}} {runs}' for stage, (runs, _) in sorted(self._totals.items())]
+        lines += ['# HELP mba_stage_seconds Wall time spent in pipeline stages.', '# TYPE mba_stage_seconds counter',
+                  '# UNIT mba_stage_seconds seconds']
+        lines += [f'mba_stage_seconds_total{{stage="{stage}"}} {seconds}' for stage, (_, seconds) in sorted(self._totals.items())]
+        lines += ['# HELP mba_stage_last_seconds Wall time of the latest run of a stage.',
+                  '# TYPE mba_stage_last_seconds gauge', '# UNIT mba_stage_last_seconds seconds']
+        lines += [f'mba_stage_last_seconds{{stage="{stage}"}} {record.wall_time}' for stage, record in sorted(latest.items())]
+        lines += ['# HELP mba_stage_last_peak_memory_bytes Peak traced memory of the latest run of a stage.',
+                  '# TYPE mba_stage_last_peak_memory_bytes gauge', '# UNIT mba_stage_last_peak_memory_bytes bytes']
+        lines += [f'mba_stage_last_peak_memory_bytes{{stage="{stage}"}} {record.peak_memory}'
+                  for stage, record in sorted(latest.items()) if record.peak_memory is not None]
+        lines += ['# HELP mba_stage_last_size Input and output sizes of the latest run of a stage.',
+                  '# TYPE mba_stage_last_size gauge']
+        for stage, record in sorted(latest.items()):
+            for side, sizes in (('input', record.inputs), ('output', record.outputs)):
+                lines += [f'mba_stage_last_size{{stage="{stage}",side="{side}",size="{name}"}} {value}'
+                          for name, value in sizes.items() if isinstance(value, (int, float))]
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def json_lines(self):
+        with self._lock:
+            return ''.join(json.dumps(record.as_dict()) + '\n' for record in self.records)
+
+
+def _write_atomic(path, text):
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+# Lifetime peak resident set size of this process in bytes (ru_maxrss is in KiB, in bytes on macOS),
+# or None where there is no resource module
+def max_rss():
+    if resource is None:
+        return None
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+_measuring = threading.local()
+
+
+# Peak resident set size while the block runs, sampled from /proc/self/statm (Linux) by a background
+# thread. Elsewhere it falls back to the lifetime peak of the process (ru_maxrss). Child processes doing
+# the block's work send their own peak back, reported with report_child_peak into child_peak.
+class PeakRSS:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self.child_peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current():
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current() or 0)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        _measuring.__dict__.setdefault('stack', []).append(self)
+        if self.current() is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        _measuring.stack.remove(self)
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, self.current() or 0)
+        else:
+            self.peak = max_rss() or 0
+        # Enclosing blocks cover this one, even where their own samples missed its peak
+        for rss in _measuring.stack:
+            rss.peak = max(rss.peak, self.peak)
+        return False
+
+
+# Hand the peak RSS of a child process that worked for this thread to every PeakRSS block open in it
+def report_child_peak(nbytes):
+    if nbytes is None:
+        return
+    for rss in getattr(_measuring, 'stack', []):
+        rss.child_peak = max(rss.child_peak or 0, nbytes)
+
+
+# Shared recorder used by the pipeline, the app and the command line
+recorder = Recorder(log_path=os.environ.get('MBA_PERF_LOG'), metrics_path=os.environ.get('MBA_METRICS_FILE'),
+                    trace_memory=os.environ.get('MBA_TRACE_MEMORY', '') not in ('', '0'))
+
+
+# Decorator recording every call of a function as a stage. inputs(*args, **kwargs) and outputs(result)
+# return the sizes to record, e.g. inputs=lambda table, *a, **k: {'itemsets': len(table)}.
+def instrumented(stage, inputs=None, outputs=None):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with recorder.stage(stage) as record:
+                if inputs is not None:
+                    record.inputs.update(inputs(*args, **kwargs))
+                result = func(*args, **kwargs)
+                if outputs is not None:
+                    record.outputs.update(outputs(result))
+            return result
+        return wrapper
+    return decorate
+
+
+def _sizes(sizes):
+    return ', '.join(f'{name}={value:,}' if isinstance(value, int) else f'{name}={value}' for name, value in sizes.items())
+
+
+# Table of records for display: one row per stage run
+def records_frame(records):
+    return pd.DataFrame({
+        'Stage': [record.stage for record in records],
+        'Wall time (ms)': [record.wall_time * 1000 for record in records],
+        'Peak memory (MiB)': [None if record.peak_memory is None else record.peak_memory / 1024 ** 2 for record in records],
+        'Inputs': [_sizes(record.inputs) for record in records],
+        'Outputs': [_sizes(record.outputs) if record.error is None else f'failed: {record.error}' for record in records],
+    })
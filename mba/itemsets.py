@@ -0,0 +1,264 @@
+# Compact integer representation of itemsets.
+# Items are interned once in an ItemDictionary (name <-> id, ids in vocabulary order). An itemset is
+# a sorted run of int32 ids in a ragged array (one flat id array plus row offsets), and when every id
+# is below 64 each itemset also has a uint64 bitmask. Item names are only decoded for display.
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+MASK_BITS = 64
+
+
+# Shared item vocabulary: ids follow the order of the names (the dataset columns). These are sorted
+# for a freshly encoded dataset; after an append new items follow the old ones, so ranks then maps
+# every id to the alphabetical position of its name (None while ids are already alphabetical).
+class ItemDictionary:
+    def __init__(self, names):
+        self.names = np.array(list(names), dtype=object)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.ranks = None
+        order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        if order != list(range(len(self.names))):
+            self.ranks = np.empty(len(self.names), dtype=np.int64)
+            self.ranks[order] = np.arange(len(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+    # Sorted unique ids of the given item names (KeyError for an unknown item)
+    def encode(self, items):
+        return np.unique(np.array([self.index[item] for item in items], dtype=np.int32))
+
+    def decode(self, ids):
+        return list(self.names[ids])
+
+    # Display text of an itemset given as ids, items in alphabetical order
+    def join(self, ids):
+        if self.ranks is not None:
+            ids = ids[np.argsort(self.ranks[ids], kind='stable')]
+        return ', '.join(self.names[ids])
+
+
+# One fixed-width byte key per row of an (n, size) id array, so rows can be sorted and binary searched as scalars
+def row_keys(ids):
+    ids = np.ascontiguousarray(ids.astype('>i4'))
+    return ids.view(np.dtype((np.void, ids.dtype.itemsize * ids.shape[1]))).ravel()
+
+
+# Ragged array of itemsets: row i is ids[offsets[i]:offsets[i + 1]], sorted ascending
+class ItemsetArray:
+    def __init__(self, ids, offsets):
+        self.ids = np.asarray(ids, dtype=np.int32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self._masks = None
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=np.int32), np.zeros(1, dtype=np.int64))
+
+    # From an iterable of id sequences (each is sorted here)
+    @classmethod
+    def from_rows(cls, rows):
+        rows = [sorted(row) for row in rows]
+        lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(np.fromiter(chain.from_iterable(rows), dtype=np.int32, count=int(offsets[-1])), offsets)
+
+    # From an (n, size) array whose rows are already sorted
+    @classmethod
+    def from_padded(cls, ids):
+        n, size = ids.shape
+        return cls(ids.ravel(), np.arange(n + 1, dtype=np.int64) * size)
+
+    @classmethod
+    def concat(cls, arrays):
+        arrays = list(arrays)
+        if not arrays:
+            return cls.empty()
+        starts = np.cumsum([0] + [array.offsets[-1] for array in arrays[:-1]])
+        offsets = [arrays[0].offsets[:1]] + [array.offsets[1:] + start for array, start in zip(arrays, starts)]
+        return cls(np.concatenate([array.ids for array in arrays]), np.concatenate(offsets))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.ids[self.offsets[i]:self.offsets[i + 1]]
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    # Row number of every entry of ids
+    def row_numbers(self):
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    # Itemsets at the given positions, gathered without a Python loop
+    def take(self, positions):
+        positions = np.asarray(positions, dtype=np.int64)
+        starts = self.offsets[positions]
+        lengths = self.offsets[positions + 1] - starts
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        gather = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return ItemsetArray(self.ids[gather], offsets)
+
+    # The first n itemsets, as views of this array
+    def head(self, n):
+        return ItemsetArray(self.ids[:self.offsets[n]], self.offsets[:n + 1])
+
+    # Row-wise union with another array of the same length, for disjoint rows (antecedent | consequent)
+    def union(self, other):
+        rows = np.concatenate([self.row_numbers(), other.row_numbers()])
+        ids = np.concatenate([self.ids, other.ids])
+        order = np.lexsort((ids, rows))
+        return ItemsetArray(ids[order], self.offsets + other.offsets)
+
+    # Positions of the itemsets of the given size and their ids as an (n, size) array
+    def padded(self, size):
+        positions = np.flatnonzero(self.lengths == size)
+        return positions, self.ids[self.offsets[positions][:, None] + np.arange(size)]
+
+    # uint64 bitmask per itemset, or None when the vocabulary does not fit in one word
+    def masks(self):
+        if self._masks is None and len(self) and self.ids.max() < MASK_BITS:
+            bits = np.left_shift(np.uint64(1), self.ids.astype(np.uint64))
+            self._masks = np.bitwise_or.reduceat(bits, self.offsets[:-1])
+        return self._masks
+
+    # Boolean mask of the itemsets that contain every id in required
+    def contains_all(self, required):
+        required = np.unique(np.asarray(required, dtype=np.int64))
+        if not len(required):
+            return np.ones(len(self), dtype=bool)
+        if required.min() < 0:
+            return np.zeros(len(self), dtype=bool)
+        masks = self.masks()
+        if masks is not None and required.max() < MASK_BITS:
+            wanted = np.bitwise_or.reduce(np.left_shift(np.uint64(1), required.astype(np.uint64)))
+            return (masks & wanted) == wanted
+        hits = np.bincount(self.row_numbers(), weights=np.isin(self.ids, required), minlength=len(self))
+        return hits == len(required)
+
+    # Stable order of the itemsets by their id rows compared lexicographically (a prefix sorts first).
+    # Given the dictionary, ids are first replaced by the alphabetical rank of their names and each row
+    # re-sorted, so this is the alphabetical order of the display text for any vocabulary.
+    def sort_order(self, descending=False, dictionary=None):
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        lengths = self.lengths
+        ids = self.ids
+        if dictionary is not None and dictionary.ranks is not None:
+            ids = dictionary.ranks[ids]
+            ids = ids[np.lexsort((ids, self.row_numbers()))]
+        matrix = np.full((len(self), int(lengths.max())), -1, dtype=np.int64)
+        matrix[self.row_numbers(), np.arange(len(ids)) - np.repeat(self.offsets[:-1], lengths)] = ids
+        if descending:
+            matrix = -matrix
+        return np.lexsort(matrix.T[::-1])
+
+    # Display text of every itemset
+    def join(self, dictionary):
+        return [dictionary.join(self[i]) for i in range(len(self))]
+
+    # frozensets of item names, the mlxtend itemset type
+    def frozensets(self, dictionary):
+        return [frozenset(dictionary.decode(self[i])) for i in range(len(self))]
+
+    def equals(self, other):
+        return np.array_equal(self.ids, other.ids) and np.array_equal(self.offsets, other.offsets)
+
+
+# Itemsets grouped by size for vectorized lookups: size -> (positions in the array, (n, size) ids, row keys),
+# each sorted by key
+class SizeIndex:
+    def __init__(self, itemsets):
+        self.sizes = {}
+        for size in np.unique(itemsets.lengths):
+            positions, ids = itemsets.padded(int(size))
+            keys = row_keys(ids)
+            order = np.argsort(keys)
+            self.sizes[int(size)] = (positions[order], ids[order], keys[order])
+
+    # Positions of the given (n, size) id rows in the indexed array, -1 where absent
+    def find(self, ids):
+        size = ids.shape[1]
+        if size not in self.sizes or not len(ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        positions, _, keys = self.sizes[size]
+        wanted = row_keys(ids)
+        found = np.searchsorted(keys, wanted).clip(0, len(keys) - 1)
+        return np.where(keys[found] == wanted, positions[found], -1)
+
+    # Positions of the itemsets of an ItemsetArray in the indexed array, -1 where absent
+    def find_itemsets(self, itemsets):
+        found = np.full(len(itemsets), -1, dtype=np.int64)
+        for size in np.unique(itemsets.lengths):
+            positions, ids = itemsets.padded(int(size))
+            found[positions] = self.find(ids)
+        return found
+
+
+# Apriori candidate generation: join frequent (n, k) id rows sharing their first k - 1 ids, then
+# keep the candidates whose k-subsets are all frequent
+def apriori_gen(frequent):
+    n, k = frequent.shape
+    if n < 2:
+        return np.empty((0, k + 1), dtype=np.int32)
+    frequent = frequent[np.lexsort(frequent.T[::-1])]
+    prefix_change = np.flatnonzero(np.any(frequent[1:, :-1] != frequent[:-1, :-1], axis=1)) + 1
+    joined = []
+    for group in np.split(frequent, prefix_change):
+        if len(group) < 2:
+            continue
+        first, second = np.triu_indices(len(group), k=1)
+        joined.append(np.column_stack([group[first], group[second, -1]]))
+    if not joined:
+        return np.empty((0, k + 1), dtype=np.int32)
+    candidates = np.concatenate(joined)
+
+    index = SizeIndex(ItemsetArray.from_padded(frequent))
+    keep = np.ones(len(candidates), dtype=bool)
+    for drop in range(k - 1):
+        keep &= index.find(np.delete(candidates, drop, axis=1)) >= 0
+    return candidates[keep]
+
+
+# Frequent itemsets: a support array aligned with an ItemsetArray
+class ItemsetTable:
+    itemset_columns = ('itemsets',)
+
+    def __init__(self, support, itemsets):
+        self.support = np.asarray(support, dtype=float)
+        self.itemsets = itemsets
+
+    # From (count, ids) rows as produced by the ECLAT backends
+    @classmethod
+    def from_counts(cls, rows, n_transactions):
+        counts = np.fromiter((count for count, _ in rows), dtype=float, count=len(rows))
+        return cls(counts / n_transactions, ItemsetArray.from_rows(ids for _, ids in rows))
+
+    def __len__(self):
+        return len(self.support)
+
+    @property
+    def empty(self):
+        return not len(self)
+
+    def take(self, positions):
+        return ItemsetTable(self.support[positions], self.itemsets.take(positions))
+
+    def head(self, n):
+        return ItemsetTable(self.support[:n], self.itemsets.head(n))
+
+    def column(self, name):
+        return {'support': self.support, 'itemsets': self.itemsets}[name]
+
+    # Decoded frame in the mlxtend apriori schema ('support', 'itemsets' as frozensets of names)
+    def frame(self, dictionary):
+        return pd.DataFrame({'support': self.support, 'itemsets': self.itemsets.frozensets(dictionary)})
+
+    def equals(self, other):
+        return np.array_equal(self.support, other.support) and self.itemsets.equals(other.itemsets)
@@ -0,0 +1,182 @@
+# Background jobs for slow work such as mining, so the Streamlit script keeps rendering while it runs.
+# A JobManager runs each job in a worker thread; submitting a job under a group supersedes (cancels)
+# the group's other unfinished jobs, unless another group (e.g. another session) still wants them. Code running inside a job reports progress and honours
+# cancellation through checkpoint(), which finds its job through a thread-local and does nothing
+# outside a job, so the mining code takes no extra parameters. Cancellation is cooperative: it takes
+# effect at the job's next checkpoint. The mlxtend backends have no checkpoints of their own, so inside a
+# job they run in a child process that is killed on cancellation (see mba/mining.py).
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_current = threading.local()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# Report progress (e.g. stage='mine', level=3, candidates=1200) to the job running in this thread,
+# and stop it there if it was cancelled. Outside a job this does nothing.
+def checkpoint(**progress):
+    job = current_job()
+    if job is not None:
+        job.report(**progress)
+
+
+# The job running in this thread, or None
+def current_job():
+    return getattr(_current, 'job', None)
+
+
+# One submitted call of fn(). state is queued, running, done, failed or cancelled; result is set
+# when done and error (the exception) when failed. superseded marks a cancellation by a newer job.
+# groups holds every group the job was submitted under and has not been superseded in since.
+class Job:
+    def __init__(self, key, fn, group=None, description=None):
+        self.key = key
+        self.groups = set() if group is None else {group}
+        self.description = description or str(key)
+        self.state = 'queued'
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.superseded = False
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._fn = fn
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.state in ('queued', 'running')
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def cancel(self, superseded=False):
+        if self.active and not self._cancel.is_set():
+            self.superseded = superseded
+            self._cancel.set()
+
+    # Progress of a new stage replaces that of the previous one
+    def report(self, **progress):
+        with self._lock:
+            if progress.get('stage', self.progress.get('stage')) != self.progress.get('stage'):
+                self.progress = {}
+            self.progress.update(progress)
+        if self._cancel.is_set():
+            raise JobCancelled(self.key)
+
+    # Block until the job has finished (or timeout seconds have passed); True when it has
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def elapsed(self):
+        end = self.finished or time.time()
+        return end - (self.started or end)
+
+    # Latest progress as text, e.g. "mine, level 3, 1200 candidates"
+    def describe(self):
+        with self._lock:
+            progress = dict(self.progress)
+        parts = [str(progress.pop('stage'))] if 'stage' in progress else []
+        if 'level' in progress:
+            parts.append(f"level {progress.pop('level')}")
+        parts += [f'{value} {name}' for name, value in progress.items()]
+        return ', '.join(parts) or self.state
+
+    def _run(self):
+        if self._cancel.is_set():
+            self._finish('cancelled')
+            return
+        self.state = 'running'
+        self.started = time.time()
+        _current.job = self
+        try:
+            result = self._fn()
+        except JobCancelled:
+            self._finish('cancelled')
+        except Exception as error:
+            self.error = error
+            self._finish('failed')
+        else:
+            self.result = result
+            self._finish('done')
+        finally:
+            _current.job = None
+
+    def _finish(self, state):
+        self.state = state
+        self.finished = time.time()
+        if self.started is None:
+            self.started = self.finished
+        self._fn = None
+        self._done.set()
+
+
+# Jobs by key, run by a pool of max_workers threads. Finished jobs are kept (and their results
+# reused by submit) until more than max_jobs are held; unfinished ones are always kept.
+class JobManager:
+    def __init__(self, max_workers=1, max_jobs=16):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mba-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    # The job for key, starting fn() in the background unless a job for key already exists. A job
+    # that was superseded is started again; one that failed or was cancelled by the user only with
+    # restart=True. Every other job of the same group leaves it, and is superseded once it belongs to
+    # no group any more: a job shared by several groups keeps running while any of them waits on it.
+    def submit(self, key, fn, group=None, description=None, restart=False):
+        with self._lock:
+            job = self._jobs.get(key)
+            rerun = job is not None and ((job.superseded and job.state != 'done') or
+                                         (restart and job.state in ('failed', 'cancelled')))
+            if job is None or rerun:
+                job = Job(key, fn, group, description)
+                self._jobs.pop(key, None)
+                self._jobs[key] = job
+                self._executor.submit(job._run)
+            if group is not None:
+                job.groups.add(group)
+                for other in self._jobs.values():
+                    if other is not job and group in other.groups:
+                        other.groups.discard(group)
+                        if not other.groups:
+                            other.cancel(superseded=True)
+            self._trim()
+            return job
+
+    def _trim(self):
+        finished = [key for key, job in self._jobs.items() if not job.active]
+        for key in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[key]
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    # Result of the finished job for key, or None
+    def result(self, key):
+        job = self.get(key)
+        return job.result if job is not None and job.state == 'done' else None
+
+    # Every held job, newest first
+    def jobs(self):
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, key):
+        job = self.get(key)
+        if job is not None:
+            job.cancel()
+
+    def shutdown(self):
+        for job in self.jobs():
+            job.cancel()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,217 @@
+# Pluggable frequent itemset mining engine.
+# Every backend takes an EncodedDataset and a minimum support and returns an ItemsetTable: a support
+# array and the itemsets as sorted int32 item ids (see mba.itemsets), in the dataset's dictionary.
+import time
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from mlxtend.frequent_patterns import apriori, fpgrowth, fpmax
+from scipy import sparse
+
+from mba.eclat import eclat_extend, frequent_singles
+from mba.instrument import PeakRSS, instrumented, max_rss, recorder, report_child_peak
+from mba.itemsets import ItemsetArray, ItemsetTable, SizeIndex
+from mba.jobs import checkpoint, current_job
+from mba.parallel import parallel_eclat, process_context
+from mba.snapshot import array_files
+
+# Every backend has the signature (dataset, min_support, max_len=None, workers=1); only the
+# parallel backend uses workers.
+
+
+_MLXTEND = {'apriori': apriori, 'fpgrowth': fpgrowth, 'fpmax': fpmax}
+
+# How often a job waiting for an mlxtend child process checks whether it was cancelled
+MLXTEND_POLL_SECONDS = 0.25
+
+
+# mlxtend result mined without column names (frozensets of column ids) -> ItemsetTable
+def _from_mlxtend(frame):
+    return ItemsetTable(frame['support'].to_numpy(), ItemsetArray.from_rows(frame['itemsets']))
+
+
+# Child process side of _run_mlxtend: the CSR arrays, mapped from .npy files, in; an ItemsetTable and
+# the child's peak RSS out
+def _mlxtend_itemsets(name, indices_path, indptr_path, shape, min_support, max_len):
+    indices, indptr = np.load(indices_path, mmap_mode='r'), np.load(indptr_path, mmap_mode='r')
+    matrix = sparse.csr_matrix((np.ones(len(indices), dtype=bool), indices, indptr), shape=shape)
+    frame = _MLXTEND[name](pd.DataFrame.sparse.from_spmatrix(matrix), min_support=min_support, max_len=max_len)
+    return _from_mlxtend(frame), max_rss()
+
+
+# Run an mlxtend backend. mlxtend cannot report progress or stop part way, so inside a background job
+# it runs in a child process: the job reports the time spent mining meanwhile, and a cancelled job
+# kills the child instead of holding its worker thread until mlxtend returns. The child maps the CSR
+# arrays from the dataset's snapshot files (or from temporary copies) rather than receiving them pickled,
+# and its peak RSS is reported as the peak of the run.
+def _run_mlxtend(name, dataset, min_support, max_len):
+    if current_job() is None:
+        return _from_mlxtend(_MLXTEND[name](dataset.sparse_frame(), min_support=min_support, max_len=max_len))
+    matrix = dataset.matrix
+    with array_files([matrix.indices, matrix.indptr]) as (indices_path, indptr_path):
+        pool = process_context().Pool(1)
+        try:
+            result = pool.apply_async(_mlxtend_itemsets, (name, indices_path, indptr_path, matrix.shape,
+                                                          min_support, max_len))
+            start = time.perf_counter()
+            while not result.ready():
+                checkpoint(stage='mine', elapsed=f'{time.perf_counter() - start:.0f} s')
+                result.wait(MLXTEND_POLL_SECONDS)
+            itemsets, peak = result.get()
+            report_child_peak(peak)
+            return itemsets
+        finally:
+            pool.terminate()
+
+
+def _apriori(dataset, min_support, max_len=None, workers=1):
+    return _run_mlxtend('apriori', dataset, min_support, max_len)
+
+
+def _fpgrowth(dataset, min_support, max_len=None, workers=1):
+    return _run_mlxtend('fpgrowth', dataset, min_support, max_len)
+
+
+def _fpmax(dataset, min_support, max_len=None, workers=1):
+    return _run_mlxtend('fpmax', dataset, min_support, max_len)
+
+
+# Depth-first ECLAT over the vertical bitsets: each extension ANDs the prefix bitset with one item bitset
+def _eclat(dataset, min_support, max_len=None, workers=1):
+    singles = frequent_singles(dataset.vertical, min_support)
+    rows = eclat_extend((), singles, dataset.n_transactions, min_support, max_len, [])
+    return ItemsetTable.from_counts(rows, dataset.n_transactions)
+
+
+# ECLAT with first-item equivalence classes mined in a process pool
+def _parallel_eclat(dataset, min_support, max_len=None, workers=1):
+    rows = parallel_eclat(dataset.vertical, min_support, max_len=max_len, workers=workers)
+    return ItemsetTable.from_counts(rows, dataset.n_transactions)
+
+
+# (subset position, superset position) for every itemset and each of its immediate subsets in the table,
+# found by dropping one column of the (n, size) id arrays and looking the rows up by key
+def _immediate_subsets(itemsets):
+    index = SizeIndex(itemsets)
+    subsets, supersets = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for size, (positions, ids, _) in index.sizes.items():
+        if size < 2:
+            continue
+        for drop in range(size):
+            found = index.find(np.delete(ids, drop, axis=1))
+            subsets.append(found[found >= 0])
+            supersets.append(positions[found >= 0])
+    return np.concatenate(subsets), np.concatenate(supersets)
+
+
+# Closed itemsets: frequent itemsets with no immediate superset of the same support
+def closed_itemsets(frequent_itemsets):
+    subsets, supersets = _immediate_subsets(frequent_itemsets.itemsets)
+    keep = np.ones(len(frequent_itemsets), dtype=bool)
+    support = frequent_itemsets.support
+    keep[subsets[support[subsets] == support[supersets]]] = False
+    return frequent_itemsets.take(np.flatnonzero(keep))
+
+
+# Maximal itemsets: frequent itemsets with no frequent immediate superset
+def maximal_itemsets(frequent_itemsets):
+    subsets, _ = _immediate_subsets(frequent_itemsets.itemsets)
+    keep = np.ones(len(frequent_itemsets), dtype=bool)
+    keep[subsets] = False
+    return frequent_itemsets.take(np.flatnonzero(keep))
+
+
+def _closed(dataset, min_support, max_len=None, workers=1):
+    return closed_itemsets(_fpgrowth(dataset, min_support, max_len=max_len))
+
+
+# Condensed representations -> function that derives them from every frequent itemset
+CONDENSE = {
+    'maximal': maximal_itemsets,
+    'closed': closed_itemsets,
+}
+
+# name -> (label shown in the sidebar, mining function, condensed representation or None)
+ALGORITHMS = {
+    'apriori': ('Apriori', _apriori, None),
+    'fpgrowth': ('FP-Growth', _fpgrowth, None),
+    'eclat': ('ECLAT (vertical bitsets)', _eclat, None),
+    'parallel_eclat': ('ECLAT (parallel, process pool)', _parallel_eclat, None),
+    'fpmax': ('FP-Max (maximal itemsets)', _fpmax, 'maximal'),
+    'closed': ('Closed itemsets', _closed, 'closed'),
+}
+
+
+# Outcome of a single mining run, with its wall time, its peak traced memory (None unless memory is
+# traced) and the peak RSS of the process that mined (the child process for mlxtend inside a job)
+class MiningResult:
+    def __init__(self, algorithm, min_support, frequent_itemsets, wall_time, peak_memory, peak_rss=None):
+        self.algorithm = algorithm
+        self.min_support = min_support
+        self.frequent_itemsets = frequent_itemsets
+        self.wall_time = wall_time
+        self.peak_memory = peak_memory
+        self.peak_rss = peak_rss
+
+    def summary(self):
+        label = ALGORITHMS[self.algorithm][0]
+        peak = '' if not self.peak_rss else f', peak RSS {self.peak_rss / 1024 ** 2:.1f} MiB'
+        if self.peak_memory is not None:
+            peak += f', traced peak {self.peak_memory / 1024 ** 2:.1f} MiB'
+        return (f'{label} @ min_support={self.min_support:.4f}: {len(self.frequent_itemsets)} itemsets, '
+                f'{self.wall_time * 1000:.1f} ms{peak}')
+
+
+# Peak RSS of a PeakRSS block: a child process's when one did the work, else this process's
+def run_peak(rss):
+    return rss.child_peak if rss.child_peak is not None else rss.peak
+
+
+# Run the selected backend and record wall time and peak RSS, and traced peak memory (of this process
+# only) when memory is traced
+def mine(dataset, min_support, algorithm='apriori', max_len=None, workers=1):
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f'Unknown mining algorithm: {algorithm!r}. Choose one of {sorted(ALGORITHMS)}.')
+    _, func, _ = ALGORITHMS[algorithm]
+
+    with recorder.stage('mine', algorithm=algorithm, min_support=min_support, transactions=dataset.n_transactions,
+                        items=len(dataset.columns)) as record:
+        with PeakRSS() as rss:
+            checkpoint(stage='mine')
+            frequent_itemsets = func(dataset, min_support, max_len=max_len, workers=workers)
+        record.outputs.update(itemsets=len(frequent_itemsets), peak_rss=run_peak(rss))
+
+    return MiningResult(algorithm, min_support, frequent_itemsets, record.wall_time, record.peak_memory, run_peak(rss))
+
+
+# Expand a condensed (maximal or closed) result into every frequent itemset, counting the
+# subset supports on the vertical index, so association rules can be generated from it
+@instrumented('complete_itemsets', inputs=lambda dataset, frequent_itemsets: {'itemsets': len(frequent_itemsets)},
+              outputs=lambda table: {'itemsets': len(table)})
+def complete_itemsets(dataset, frequent_itemsets):
+    subsets = {}
+    for size, (_, ids, _) in SizeIndex(frequent_itemsets.itemsets).sizes.items():
+        for subset_size in range(1, size + 1):
+            for positions in combinations(range(size), subset_size):
+                subsets.setdefault(subset_size, []).append(ids[:, list(positions)])
+
+    vertical = dataset.vertical
+    tables = []
+    for subset_size in sorted(subsets):
+        ids = np.unique(np.concatenate(subsets[subset_size]), axis=0)
+        checkpoint(stage='complete_itemsets', level=subset_size, candidates=len(ids))
+        counts = vertical.count_rows(ids).astype(float)
+        tables.append((counts / dataset.n_transactions, ItemsetArray.from_padded(ids)))
+    if not tables:
+        return frequent_itemsets
+    return ItemsetTable(np.concatenate([support for support, _ in tables]),
+                        ItemsetArray.concat(itemsets for _, itemsets in tables))
+
+
+# Frequent itemsets suitable for association rule generation (every subset has a support)
+def mine_for_rules(dataset, min_support, algorithm='apriori', max_len=None, workers=1):
+    result = mine(dataset, min_support, algorithm=algorithm, max_len=max_len, workers=workers)
+    if ALGORITHMS[algorithm][2] is not None:
+        result.frequent_itemsets = complete_itemsets(dataset, result.frequent_itemsets)
+    return result
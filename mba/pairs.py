@@ -0,0 +1,69 @@
+# Pair engine: co-occurrence counts of every item pair from one sparse matrix product XᵀX over the
+# encoded transactions. Support, confidence, lift, leverage and conviction of every ordered pair
+# (a -> b) follow as array math over the counts, without mining itemsets or generating rules.
+import numpy as np
+
+from mba.instrument import recorder
+from mba.itemsets import ItemsetArray
+from mba.rules import RuleTable, metrics_frame
+
+PAIR_METRICS = ('support', 'confidence', 'lift', 'leverage', 'conviction')
+
+
+# Item counts and the (symmetric, zero-diagonal) sparse matrix of pair co-occurrence counts
+class PairMatrix:
+    def __init__(self, dataset):
+        self.n_transactions = dataset.n_transactions
+        self.dictionary = dataset.dictionary
+        with recorder.stage('pairs', transactions=dataset.n_transactions, items=len(dataset.columns)) as record:
+            # A boolean product would OR instead of counting, so the matrix is multiplied as int32
+            matrix = dataset.matrix.astype(np.int32)
+            counts = (matrix.T @ matrix).tocsr()
+            self.item_counts = counts.diagonal().astype(np.int64)
+            counts.setdiag(0)
+            counts.eliminate_zeros()
+            counts.sort_indices()
+            self.counts = counts
+            record.outputs['pairs'] = counts.nnz // 2
+
+    @property
+    def item_support(self):
+        return self.item_counts / max(self.n_transactions, 1)
+
+    # Every ordered pair (a -> b) of items bought together with support >= min_support, as a RuleTable
+    def rules(self, min_support=0.0):
+        pairs = self.counts.tocoo()
+        support = pairs.data / max(self.n_transactions, 1)
+        keep = support >= min_support
+        antecedents, consequents, support = pairs.row[keep], pairs.col[keep], support[keep]
+        item_support = self.item_support
+        return RuleTable(ItemsetArray.from_padded(antecedents[:, None].astype(np.int32)),
+                         ItemsetArray.from_padded(consequents[:, None].astype(np.int32)),
+                         metrics_frame(item_support[antecedents], item_support[consequents], support))
+
+    # The n pairs with the highest sort_by metric, best first
+    def top(self, n, sort_by='lift', min_support=0.0):
+        rules = self.rules(min_support)
+        metric = rules.column(sort_by)
+        if len(rules) > n:
+            rules = rules.take(np.argpartition(-metric, n - 1)[:n])
+            metric = rules.column(sort_by)
+        return rules.take(np.argsort(-metric, kind='stable'))
+
+    # Ids of the k most frequent items, most frequent first
+    def frequent_item_ids(self, k):
+        return np.argsort(-self.item_counts, kind='stable')[:k]
+
+    # Dense (k, k) array of a metric for the pairs of the given items: rows are antecedents, columns
+    # consequents; the diagonal is NaN
+    def block(self, item_ids, metric='lift'):
+        item_ids = np.asarray(item_ids)
+        support = self.counts[item_ids][:, item_ids].toarray() / max(self.n_transactions, 1)
+        item_support = self.item_support[item_ids]
+        antecedent_support = np.repeat(item_support, len(item_ids))
+        consequent_support = np.tile(item_support, len(item_ids))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = metrics_frame(antecedent_support, consequent_support, support.ravel())[metric]
+        values = values.to_numpy(dtype=float, copy=True).reshape(len(item_ids), len(item_ids))
+        np.fill_diagonal(values, np.nan)
+        return values
@@ -0,0 +1,97 @@
+# Parallel ECLAT: the search space is partitioned into first-item equivalence classes (all frequent
+# itemsets whose smallest item is i) and each class is mined by a worker process on its own bitsets.
+# Classes are returned in item order, so the output is identical to the serial ECLAT backend.
+# Workers map the CSC arrays from .npy files instead of receiving a pickled copy each.
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+from mba.eclat import eclat_extend
+from mba.instrument import max_rss, report_child_peak
+from mba.jobs import checkpoint
+from mba.snapshot import array_files
+from mba.vertical import VerticalIndex, popcount
+
+# Per-process state set by the pool initializer: (vertical index, frequent item ids, min_support, max_len)
+_WORKER = None
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+# Context for worker processes. The app starts them from job threads of a multi-threaded server, where a
+# forked child can inherit locks held by other threads, so they start from a fork server (or a fresh
+# interpreter where there is none) and are handed file paths or small arguments only.
+def process_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def _set_worker(csc, columns, frequent_ids, min_support, max_len):
+    global _WORKER
+    _WORKER = (VerticalIndex(None, columns, csc=csc), frequent_ids, min_support, max_len)
+
+
+def _init_worker(indptr_path, indices_path, shape, columns, frequent_ids, min_support, max_len):
+    indptr, indices = np.load(indptr_path, mmap_mode='r'), np.load(indices_path, mmap_mode='r')
+    csc = sparse.csc_matrix((np.ones(len(indices), dtype=bool), indices, indptr), shape=shape, copy=False)
+    _set_worker(csc, columns, frequent_ids, min_support, max_len)
+
+
+# _mine_class in a worker process, with the worker's peak RSS so far
+def _mine_class_in_worker(position):
+    return _mine_class(position), max_rss()
+
+
+# Mine the equivalence class of frequent_ids[position]: that item extended by the frequent items after it
+def _mine_class(position):
+    vertical, frequent_ids, min_support, max_len = _WORKER
+    n = vertical.n_transactions
+    item_id = frequent_ids[position]
+    out = [(len(vertical.tids(item_id)), (item_id,))]
+    if max_len is not None and max_len <= 1:
+        return out
+
+    bits = vertical.bitset(item_id)
+    suffix = []
+    for other_id in frequent_ids[position + 1:]:
+        joined = bits & vertical.bitset(other_id)
+        count = popcount(joined)
+        if count / n >= min_support:
+            suffix.append((other_id, joined, count))
+    if suffix:
+        eclat_extend((item_id,), suffix, n, min_support, max_len, out)
+    return out
+
+
+# (count, itemset ids) for every frequent itemset, in the same order as the serial ECLAT
+def parallel_eclat(vertical, min_support, max_len=None, workers=None):
+    workers = workers or default_workers()
+    n = vertical.n_transactions
+    frequent_ids = [item_id for item_id in range(len(vertical.columns)) if len(vertical.tids(item_id)) / n >= min_support]
+    csc = vertical.csc
+
+    if workers <= 1:
+        _set_worker(csc, vertical.columns, frequent_ids, min_support, max_len)
+        return [row for position in range(len(frequent_ids)) for row in _mine_class(position)]
+
+    # Classes of the first items are the largest, so they are handed out first, one at a time.
+    # Classes not started yet are dropped when the run is cancelled between classes. The highest
+    # worker peak RSS is reported as the peak of the run.
+    with array_files([csc.indptr, csc.indices]) as (indptr_path, indices_path):
+        initargs = (indptr_path, indices_path, csc.shape, vertical.columns, frequent_ids, min_support, max_len)
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=process_context(), initializer=_init_worker,
+                                       initargs=initargs)
+        try:
+            out = []
+            for position, (rows, peak) in enumerate(executor.map(_mine_class_in_worker, range(len(frequent_ids)))):
+                checkpoint(stage='mine', classes=f'{position + 1}/{len(frequent_ids)}', itemsets=len(out))
+                report_child_peak(peak)
+                out.extend(rows)
+            return out
+        finally:
+            executor.shutdown(cancel_futures=True)
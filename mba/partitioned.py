@@ -0,0 +1,108 @@
+# Out-of-core mining in two passes over a transactions file (Savasere, Omiecinski & Navathe, 1995).
+# Pass one encodes the file a chunk of whole transactions at a time, mines each chunk at min_support
+# and keeps the union of the local results: an itemset frequent in the whole file is frequent in at
+# least one chunk, so the union holds every frequent itemset. Pass two reads the chunks again and
+# counts those candidates exactly. Only one chunk is encoded at a time, so memory is bounded by the
+# chunk size and the candidates rather than by the file.
+import numpy as np
+from scipy import sparse
+
+from mba.ingest import DEFAULT_CHUNKSIZE, iter_encoded_chunks
+from mba.instrument import PeakRSS, recorder
+from mba.itemsets import ItemDictionary, ItemsetArray, ItemsetTable, SizeIndex
+from mba.mining import ALGORITHMS, CONDENSE, MiningResult, mine_for_rules, run_peak
+from mba.pipeline import EncodedDataset
+from mba.vertical import VerticalIndex
+
+
+# Chunks of path as (columns, their global item ids, CSR matrix); items get ids in order of first appearance
+def _chunks(path, vocabulary, name, chunksize):
+    with open(path, 'rb') as source:
+        for columns, matrix in iter_encoded_chunks(source, name=name or path, chunksize=chunksize):
+            ids = np.fromiter((vocabulary.setdefault(item, len(vocabulary)) for item in columns), dtype=np.int32,
+                              count=len(columns))
+            yield columns, ids, matrix
+
+
+# Result of a partitioned run. mining holds the itemsets in the algorithm's representation (maximal
+# or closed for the condensed ones) and all_itemsets every frequent itemset, for rule generation.
+class PartitionedResult:
+    def __init__(self, columns, n_transactions, n_chunks, n_candidates, mining, all_itemsets):
+        self.columns = columns
+        self.dictionary = ItemDictionary(columns)
+        self.n_transactions = n_transactions
+        self.n_chunks = n_chunks
+        self.n_candidates = n_candidates
+        self.mining = mining
+        self.all_itemsets = all_itemsets
+
+    def summary(self):
+        return f'{self.mining.summary()}; {self.n_chunks} chunks, {self.n_candidates} candidates counted in pass two'
+
+
+# Frequent itemsets of the transactions file at path, mined chunk by chunk with the given backend.
+# Columns and item ids come out sorted by item name, as from an in-memory load.
+def mine_partitioned(path, min_support, algorithm='apriori', max_len=None, chunksize=DEFAULT_CHUNKSIZE, name=None):
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f'Unknown mining algorithm: {algorithm!r}. Choose one of {sorted(ALGORITHMS)}.')
+    with recorder.stage('mine_partitioned', algorithm=algorithm, min_support=min_support,
+                        chunksize=chunksize) as record, PeakRSS() as rss:
+        # Pass one: local frequent itemsets of each chunk (as global ids) and exact single item counts
+        vocabulary = {}
+        item_counts = np.zeros(0, dtype=np.int64)
+        local = {}
+        n_transactions = n_chunks = 0
+        for columns, ids, matrix in _chunks(path, vocabulary, name, chunksize):
+            item_counts = np.concatenate([item_counts, np.zeros(len(vocabulary) - len(item_counts), dtype=np.int64)])
+            item_counts[ids] += np.bincount(matrix.indices, minlength=len(columns))
+            n_transactions += matrix.shape[0]
+            n_chunks += 1
+            chunk = EncodedDataset(None, columns, matrix)
+            itemsets = mine_for_rules(chunk, min_support, algorithm=algorithm, max_len=max_len).frequent_itemsets.itemsets
+            for size, (_, local_ids, _) in SizeIndex(itemsets).sizes.items():
+                if size > 1:
+                    merged = local.get(size, [])
+                    merged.append(np.sort(ids[local_ids], axis=1))
+                    local[size] = [np.unique(np.concatenate(merged), axis=0)]
+
+        # Candidates with an infrequent item cannot be frequent, so they are dropped before pass two
+        frequent_items = item_counts / max(n_transactions, 1) >= min_support
+        candidates = {}
+        for size, (ids,) in local.items():
+            ids = ids[frequent_items[ids].all(axis=1)]
+            if len(ids):
+                candidates[size] = ids
+        n_candidates = sum(len(ids) for ids in candidates.values())
+
+        # Pass two: exact counts of the candidates, chunk by chunk, on bitsets over the global ids
+        counts = {size: np.zeros(len(ids), dtype=np.int64) for size, ids in candidates.items()}
+        if candidates:
+            names = list(vocabulary)
+            for _, ids, matrix in _chunks(path, vocabulary, name, chunksize):
+                remapped = sparse.csr_matrix((matrix.data, ids[matrix.indices], matrix.indptr),
+                                             shape=(matrix.shape[0], len(names)))
+                vertical = VerticalIndex(remapped, names)
+                for size, size_ids in candidates.items():
+                    counts[size] += vertical.count_rows(size_ids)
+
+        # Renumber the items by name and collect the frequent itemsets, smallest first
+        columns = sorted(vocabulary)
+        rank = np.empty(len(columns), dtype=np.int32)
+        rank[[vocabulary[item] for item in columns]] = np.arange(len(columns), dtype=np.int32)
+        singles = np.flatnonzero(frequent_items)
+        levels = [(item_counts[singles], rank[singles][:, None])]
+        for size in sorted(candidates):
+            frequent = counts[size] / n_transactions >= min_support
+            levels.append((counts[size][frequent], np.sort(rank[candidates[size][frequent]], axis=1)))
+        levels = [(level_counts, ids) for level_counts, ids in levels if len(ids)]
+        if levels:
+            all_itemsets = ItemsetTable(np.concatenate([level_counts for level_counts, _ in levels]) / n_transactions,
+                                        ItemsetArray.concat(ItemsetArray.from_padded(ids) for _, ids in levels))
+        else:
+            all_itemsets = ItemsetTable(np.empty(0), ItemsetArray.empty())
+
+        condense = ALGORITHMS[algorithm][2]
+        itemsets = CONDENSE[condense](all_itemsets) if condense is not None else all_itemsets
+        record.outputs.update(transactions=n_transactions, chunks=n_chunks, candidates=n_candidates, itemsets=len(itemsets))
+    mining = MiningResult(algorithm, min_support, itemsets, record.wall_time, record.peak_memory, run_peak(rss))
+    return PartitionedResult(columns, n_transactions, n_chunks, n_candidates, mining, all_itemsets)
@@ -0,0 +1,195 @@
+# Load -> parse -> encode pipeline for the transactions file, with a bounded cache
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from mba.ingest import DEFAULT_CHUNKSIZE, source_size, encode_source
+from mba.instrument import recorder
+from mba.itemsets import ItemDictionary
+from mba.vertical import VerticalIndex
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+# Content hash of the raw file bytes (bytes or a seekable binary file-like object), used as the cache key
+def content_hash(data):
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(data).hexdigest()
+    digest = hashlib.sha256()
+    data.seek(0)
+    for block in iter(lambda: data.read(HASH_BLOCK_SIZE), b''):
+        digest.update(block)
+    data.seek(0)
+    return digest.hexdigest()
+
+
+# Read the transactions in chunks, intern the items and encode them as a sparse boolean matrix.
+# name (the file name, if known) selects Parquet/Arrow input; CSVs are told apart by their header.
+def load_and_encode(data, progress=None, key=None, name=None, chunksize=DEFAULT_CHUNKSIZE):
+    source = io.BytesIO(data) if isinstance(data, (bytes, bytearray, memoryview)) else data
+    with recorder.stage('ingest', bytes=source_size(source)) as record:
+        if key is None:
+            key = content_hash(source)
+        transaction_ids, columns, matrix, timestamps = encode_source(source, name=name, chunksize=chunksize, progress=progress)
+        dataset = EncodedDataset(transaction_ids, columns, matrix, key=key, timestamps=timestamps)
+        record.outputs.update(transactions=dataset.n_transactions, items=len(dataset.columns), entries=int(matrix.nnz))
+    return dataset
+
+
+# Result of the pipeline: the transaction ids, the item vocabulary and the encoded matrix.
+# dictionary maps item names to the column ids that itemsets and rules are stored as.
+# The matrix is kept as a CSR sparse matrix (one row per transaction, one column per item) so memory scales
+# with the number of purchased items rather than transactions x items. key is the content hash of the source.
+# csc is an optional prebuilt column-major copy (from a snapshot) for the vertical index.
+# timestamps (datetime64[ns] per transaction, NaT if unknown) is None when the file has no time column.
+class EncodedDataset:
+    def __init__(self, transaction_ids, columns, matrix, key=None, csc=None, timestamps=None):
+        self.key = key
+        self._csc = csc
+        self.columns = list(columns)
+        self.matrix = sparse.csr_matrix(matrix, dtype=bool)
+        if transaction_ids is None:
+            transaction_ids = np.arange(1, self.matrix.shape[0] + 1)
+        self.transaction_ids = np.asarray(transaction_ids)
+        self.timestamps = None if timestamps is None else np.asarray(timestamps, dtype='datetime64[ns]')
+        self.dictionary = ItemDictionary(self.columns)
+        self.column_index = self.dictionary.index
+        self._sparse_frame = None
+        self._vertical = None
+
+    @property
+    def n_transactions(self):
+        return self.matrix.shape[0]
+
+    # Sparse boolean DataFrame view of the matrix, accepted directly by mlxtend's apriori
+    def sparse_frame(self):
+        if self._sparse_frame is None:
+            with recorder.stage('encode', transactions=self.n_transactions, items=len(self.columns)):
+                self._sparse_frame = pd.DataFrame.sparse.from_spmatrix(self.matrix, columns=self.columns)
+        return self._sparse_frame
+
+    # Vertical tid-list / bitset index used for support counting
+    @property
+    def vertical(self):
+        if self._vertical is None:
+            with recorder.stage('vertical_index', transactions=self.n_transactions, items=len(self.columns)):
+                self._vertical = VerticalIndex(self.matrix, self.columns, csc=self._csc)
+        return self._vertical
+
+    # Transactions start..stop in the template format (items joined back from the matrix), used for display
+    def transactions_window(self, start, stop):
+        stop = min(stop, self.n_transactions)
+        indptr, indices = self.matrix.indptr, self.matrix.indices
+        items = [', '.join(self.columns[j] for j in indices[indptr[row]:indptr[row + 1]]) for row in range(start, stop)]
+        window = pd.DataFrame({'Transaction_ID': self.transaction_ids[start:stop], 'Items': items}, index=range(start, stop))
+        if self.timestamps is not None:
+            window['Timestamp'] = self.timestamps[start:stop]
+        return window
+
+    # Dense boolean DataFrame for rows start..stop (and optionally only the given item columns), used for display
+    def dense_rows(self, start, stop, columns=None):
+        stop = min(stop, self.n_transactions)
+        rows = self.matrix[start:stop]
+        if columns is None:
+            columns = self.columns
+        else:
+            rows = rows[:, [self.column_index[item] for item in columns]]
+        return pd.DataFrame(rows.toarray(), columns=columns, index=range(start, stop))
+
+    # Boolean mask of the transactions that contain every item in items
+    def contains_all(self, items):
+        return self.vertical.contains_all(items)
+
+    # Number of transactions that contain every item in items
+    def support_count(self, items):
+        return self.vertical.support_count(items)
+
+    # Proportion of transactions that contain every item in items
+    def support(self, items):
+        return self.support_count(items) / self.n_transactions
+
+    # Approximate memory held by this dataset, used by the cache budget. Arrays mapped from a snapshot
+    # count in full: they are shared through the page cache, but every page a session reads is resident.
+    # Once the vertical index is built, its CSC copy and its bitset caches count too, so the size grows.
+    def nbytes(self):
+        arrays = [self.transaction_ids, self.matrix.data, self.matrix.indices, self.matrix.indptr]
+        csc = self._csc if self._csc is not None or self._vertical is None else self._vertical.csc
+        if csc is not None:
+            arrays += [csc.indices, csc.indptr]
+        if self.timestamps is not None:
+            arrays.append(self.timestamps)
+        cached = self._vertical.cache_nbytes() if self._vertical is not None else 0
+        return sum(int(array.nbytes) for array in arrays) + cached
+
+
+# LRU cache of encoded datasets keyed on the content hash, bounded by entries and bytes. Sizes are
+# read on every lookup, since a dataset grows once its vertical index and bitsets are built.
+# With a snapshot_store, datasets are written once to memory-mapped snapshots and served from them.
+class PipelineCache:
+    def __init__(self, max_entries=4, max_bytes=2 * 1024 ** 3, snapshot_store=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.snapshot_store = snapshot_store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Encoded dataset for data (bytes or a seekable binary file-like object), loading it on a miss
+    def get(self, data, progress=None, name=None):
+        key = content_hash(data)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._evict()
+                return self._entries[key]
+
+        dataset = self._load_snapshot(key)
+        if dataset is None:
+            dataset = load_and_encode(data, progress=progress, key=key, name=name)
+            if self.snapshot_store is not None:
+                self.snapshot_store.save(dataset)
+                dataset = self._load_snapshot(key) or dataset
+
+        with self._lock:
+            self._entries[key] = dataset
+            self._entries.move_to_end(key)
+            self._evict()
+        return dataset
+
+    def _load_snapshot(self, key):
+        if self.snapshot_store is None:
+            return None
+        if key not in self.snapshot_store:
+            return None
+        with recorder.stage('snapshot_load') as record:
+            snapshot = self.snapshot_store.load(key)
+            if snapshot is None:
+                return None
+            transaction_ids, columns, csr, csc, timestamps = snapshot
+            dataset = EncodedDataset(transaction_ids, columns, csr, key=key, csc=csc, timestamps=timestamps)
+            record.outputs.update(transactions=dataset.n_transactions, items=len(dataset.columns))
+        return dataset
+
+    def total_bytes(self):
+        with self._lock:
+            return self._total_bytes()
+
+    def _total_bytes(self):
+        return sum(dataset.nbytes() for dataset in self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # Drop least recently used entries until both limits hold, always keeping the newest one
+    def _evict(self):
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries
+                                          or self._total_bytes() > self.max_bytes):
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,247 @@
+# Basket recommendations from association rules ("customers who bought X also buy Y").
+# A rule fires for a basket when the basket holds its whole antecedent; every consequent item of a fired
+# rule that is not already in the basket is recommended, scored by the best confidence (or lift) among
+# the rules recommending it. One basket is answered from an index keyed by item id that lists each
+# distinct antecedent once, under its rarest item, so only the antecedents listed under the basket's
+# items are checked. A batch of baskets runs the same steps on arrays of (basket, antecedent) pairs,
+# a block of baskets at a time. make_server wraps both in a local JSON endpoint.
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from mba.itemsets import row_keys
+
+DEFAULT_PORT = 8765
+
+# Bounds on a block of recommend_batch: bytes of its dense basket masks and candidate (basket, antecedent) pairs
+BATCH_BLOCK_BYTES = 16 * 1024 ** 2
+BATCH_CANDIDATES = 1_000_000
+
+
+# Itemsets as an (n, longest) array, padded with the id n_items
+def _padded(itemsets, n_items):
+    width = int(itemsets.lengths.max()) if len(itemsets) else 0
+    padded = np.full((len(itemsets), width), n_items, dtype=np.int32)
+    rows = itemsets.row_numbers()
+    padded[rows, np.arange(len(itemsets.ids)) - itemsets.offsets[rows]] = itemsets.ids
+    return padded
+
+
+# Positions of the CSR ranges indptr[key]:indptr[key + 1] of every key, concatenated, and each range's length
+def _ranges(indptr, keys):
+    starts = indptr[keys]
+    counts = indptr[keys + 1] - starts
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1]), counts
+
+
+# (indptr, rows) index listing each itemset once, under its item found in the fewest of the itemsets:
+# rows[indptr[i]:indptr[i + 1]] are the sorted row numbers of the itemsets keyed by item id i
+def _rarest_item_index(itemsets, n_items):
+    indptr = np.zeros(n_items + 1, dtype=np.int64)
+    if not len(itemsets):
+        return indptr, np.empty(0, dtype=np.int64)
+    frequency = np.bincount(itemsets.ids, minlength=n_items).astype(np.int64)
+    keys = np.minimum.reduceat(frequency[itemsets.ids] * n_items + itemsets.ids, itemsets.offsets[:-1]) % n_items
+    np.cumsum(np.bincount(keys, minlength=n_items), out=indptr[1:])
+    return indptr, np.argsort(keys, kind='stable')
+
+
+# Rules (a RuleTable) indexed for recommendation; sort_by is the metric recommendations are ranked by.
+# Rules sharing an antecedent are merged: each distinct antecedent keeps the items its rules
+# recommend with their best score, best first, so a basket only checks the distinct antecedents.
+class Recommender:
+    def __init__(self, rules, dictionary, sort_by='confidence', min_confidence=0.0, min_lift=None):
+        keep = rules.column('confidence') >= min_confidence
+        if min_lift is not None:
+            keep &= rules.column('lift') >= min_lift
+        rules = rules.take(np.flatnonzero(keep))
+        n_items = len(dictionary)
+        self.dictionary = dictionary
+        self.sort_by = sort_by
+        self.n_rules = len(rules)
+
+        padded = _padded(rules.antecedents, n_items)
+        _, first, group = np.unique(row_keys(padded), return_index=True, return_inverse=True)
+        group = group.ravel()
+        antecedents = rules.antecedents.take(first)
+        self._padded_antecedents = padded[first]
+        self._index = _rarest_item_index(antecedents, n_items)
+
+        # (antecedent, item) entries with their best score, by antecedent and then best first
+        entry_group = np.repeat(group, rules.consequents.lengths)
+        entry_item = rules.consequents.ids
+        entry_score = np.repeat(np.asarray(rules.column(sort_by), dtype=float), rules.consequents.lengths)
+        order = np.lexsort((entry_item, -entry_score, entry_group))
+        _, best = np.unique(entry_group[order].astype(np.int64) * n_items + entry_item[order], return_index=True)
+        best = order[np.sort(best)]
+        self._items = entry_item[best]
+        self._scores = entry_score[best]
+        self._item_indptr = np.zeros(len(antecedents) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(entry_group[best], minlength=len(antecedents)), out=self._item_indptr[1:])
+
+    # Sorted ids of the known items of a basket (unknown items are ignored)
+    def encode(self, basket):
+        ids = [self.dictionary.index.get(item) for item in basket]
+        return np.unique(np.array([i for i in ids if i is not None], dtype=np.int64))
+
+    # Top-n (item, score) recommendations for one basket, best first (ties by item name). Only the
+    # antecedents listed under the basket's items can hold; those whose padded ids lie in the basket
+    # (the padding id counts as present) do, and their items outside the basket are ranked.
+    def recommend(self, basket, n=5):
+        ids = self.encode(basket)
+        if not len(ids) or not self.n_rules:
+            return []
+        indptr, antecedents = self._index
+        candidates = antecedents[_ranges(indptr, ids)[0]]
+        in_basket = np.zeros(len(self.dictionary) + 1, dtype=bool)
+        in_basket[ids] = True
+        in_basket[-1] = True
+        held = candidates[np.take(in_basket, np.take(self._padded_antecedents, candidates, axis=0)).all(axis=1)]
+
+        entries = _ranges(self._item_indptr, held)[0]
+        items, scores = self._items[entries], self._scores[entries]
+        new = ~np.take(in_basket, items)
+        items, scores = items[new], scores[new]
+        order = np.lexsort((items, -scores))
+        items, scores = items[order], scores[order]
+        _, first = np.unique(items, return_index=True)
+        first = np.sort(first)[:n]
+        return [(self.dictionary.names[item], float(score)) for item, score in zip(items[first], scores[first])]
+
+    # (baskets, items) boolean incidence matrix of a list of baskets (lists of item names)
+    def basket_matrix(self, baskets):
+        lengths = np.fromiter((len(basket) for basket in baskets), dtype=np.int64, count=len(baskets))
+        ids = np.fromiter((self.dictionary.index.get(item, -1) for basket in baskets for item in basket),
+                          dtype=np.int64, count=int(lengths.sum()))
+        rows = np.repeat(np.arange(len(baskets)), lengths)
+        known = ids >= 0
+        matrix = sparse.csr_matrix((np.ones(int(known.sum()), dtype=bool), (rows[known], ids[known])),
+                                   shape=(len(baskets), len(self.dictionary)))
+        matrix.sum_duplicates()
+        return matrix
+
+    # Top-n recommendations for every basket: a DataFrame with columns basket (position in baskets),
+    # rank, item and score. baskets is a list of item name lists, or a sparse (baskets, items) matrix
+    # over the dictionary's item ids (e.g. the matrix of an EncodedDataset the rules were mined from).
+    # Baskets are scored a block at a time, bounded by BATCH_BLOCK_BYTES and BATCH_CANDIDATES.
+    def recommend_batch(self, baskets, n=5):
+        if sparse.issparse(baskets):
+            matrix = sparse.csr_matrix(baskets, dtype=bool)
+            matrix.sum_duplicates()
+        else:
+            matrix = self.basket_matrix(baskets)
+        indptr, _ = self._index
+        candidates = np.diff(indptr)[matrix.indices]
+        rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+        cumulative = np.cumsum(np.bincount(rows, weights=candidates, minlength=matrix.shape[0]))
+        max_rows = max(1, BATCH_BLOCK_BYTES // (len(self.dictionary) + 1))
+        parts = []
+        start = 0
+        while start < matrix.shape[0]:
+            done = cumulative[start - 1] if start else 0
+            stop = min(start + max_rows, int(np.searchsorted(cumulative, done + BATCH_CANDIDATES, side='right')))
+            stop = max(stop, start + 1)
+            basket, item, score = self._recommend_block(matrix[start:stop], n)
+            parts.append(pd.DataFrame({'basket': basket + start, 'item': item, 'score': score}))
+            start = stop
+        frame = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame({'basket': [], 'item': [], 'score': []})
+        frame['basket'] = frame['basket'].astype(np.int64)
+        frame.insert(1, 'rank', frame.groupby('basket').cumcount() + 1)
+        frame['item'] = self.dictionary.names[frame['item'].to_numpy(dtype=np.int64)]
+        return frame
+
+    # (basket, item id, score) arrays of the top-n recommendations of a block of baskets, by basket
+    # and then best first: the steps of recommend() on arrays of (basket, antecedent) pairs
+    def _recommend_block(self, matrix, n):
+        n_baskets, n_items = matrix.shape[0], len(self.dictionary)
+        in_basket = np.zeros((n_baskets, n_items + 1), dtype=bool)
+        in_basket[:, :n_items] = matrix.toarray()
+        in_basket[:, n_items] = True
+        in_basket = in_basket.ravel()
+        row_start = np.arange(n_baskets, dtype=np.int64) * (n_items + 1)
+
+        indptr, antecedents = self._index
+        positions, counts = _ranges(indptr, matrix.indices.astype(np.int64))
+        antecedent = antecedents[positions]
+        basket = np.repeat(np.repeat(np.arange(n_baskets, dtype=np.int64), np.diff(matrix.indptr)), counts)
+        cells = row_start[basket][:, None] + np.take(self._padded_antecedents, antecedent, axis=0)
+        held = np.take(in_basket, cells).all(axis=1)
+        basket, antecedent = basket[held], antecedent[held]
+
+        entries, counts = _ranges(self._item_indptr, antecedent)
+        basket = np.repeat(basket, counts)
+        item, score = self._items[entries].astype(np.int64), self._scores[entries]
+        new = ~np.take(in_basket, row_start[basket] + item)
+        basket, item, score = basket[new], item[new], score[new]
+
+        order = np.lexsort((item, -score, basket))
+        basket, item, score = basket[order], item[order], score[order]
+        _, first = np.unique(basket * n_items + item, return_index=True)
+        first = np.sort(first)
+        basket, item, score = basket[first], item[first], score[first]
+        keep = np.arange(len(basket)) - np.searchsorted(basket, basket) < n
+        return basket[keep], item[keep], score[keep]
+
+
+# JSON request -> JSON-ready response, shared by the HTTP endpoint and offline callers:
+#   {"basket": ["bread", "milk"], "n": 5}  -> {"recommendations": [{"item": ..., "score": ...}, ...]}
+#   {"baskets": [[...], [...]], "n": 5}    -> {"recommendations": [[{"item": ..., "score": ...}, ...], ...]}
+def handle_request(recommender, request):
+    if not isinstance(request, dict):
+        raise ValueError('The request must be a JSON object.')
+    n = int(request.get('n', 5))
+    if n < 0:
+        raise ValueError('"n" must not be negative.')
+    if 'basket' in request:
+        if not isinstance(request['basket'], list):
+            raise ValueError('"basket" must be a list of items.')
+        return {'recommendations': [{'item': item, 'score': score} for item, score in recommender.recommend(request['basket'], n)]}
+    if 'baskets' in request:
+        baskets = request['baskets']
+        if not isinstance(baskets, list) or not all(isinstance(basket, list) for basket in baskets):
+            raise ValueError('"baskets" must be a list of lists of items.')
+        grouped = [[] for _ in baskets]
+        frame = recommender.recommend_batch(baskets, n)
+        for basket, item, score in zip(frame['basket'], frame['item'], frame['score']):
+            grouped[basket].append({'item': item, 'score': float(score)})
+        return {'recommendations': grouped}
+    raise ValueError('The request needs a "basket" or a "baskets" field.')
+
+
+# Local HTTP endpoint: POST /recommend with a request as above, GET /health. Call serve_forever() on
+# the returned server; port 0 picks a free port (server.server_address has the one chosen).
+def make_server(recommender, host='127.0.0.1', port=DEFAULT_PORT):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, {'status': 'ok', 'rules': recommender.n_rules, 'sort_by': recommender.sort_by})
+            else:
+                self._send(404, {'error': f'Unknown path {self.path}.'})
+
+        def do_POST(self):
+            if self.path != '/recommend':
+                self._send(404, {'error': f'Unknown path {self.path}.'})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                self._send(200, handle_request(recommender, request))
+            except (ValueError, TypeError) as error:
+                self._send(400, {'error': str(error)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
@@ -0,0 +1,213 @@
+# Vectorized association rule generation on integer-encoded itemsets.
+# Itemsets of each size are held as an (n, k) array of sorted item ids with a support array;
+# every antecedent/consequent split pattern of size k is evaluated for all itemsets of that size
+# at once, looking the antecedent and consequent supports up with a binary search. Size limits,
+# item filters and metric thresholds are applied before any rule row is built, and top-K keeps
+# only the K best candidates per batch.
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from mba.instrument import instrumented
+from mba.itemsets import ItemsetArray, SizeIndex
+from mba.jobs import checkpoint
+
+RULE_COLUMNS = ['antecedents', 'consequents', 'antecedent support', 'consequent support', 'support',
+                'confidence', 'lift', 'leverage', 'conviction']
+
+
+# Supports of itemsets looked up by their (n, size) id rows
+class SupportTable:
+    def __init__(self, frequent_itemsets):
+        self.support = frequent_itemsets.support
+        self.index = SizeIndex(frequent_itemsets.itemsets)
+        self.sizes = {size: (positions, ids, self.support[positions])
+                      for size, (positions, ids, _) in self.index.sizes.items()}
+
+    # Supports of the given (n, size) id rows (NaN where the itemset is not in the table)
+    def lookup(self, ids):
+        positions = self.index.find(ids)
+        return np.where(positions >= 0, self.support[positions], np.nan)
+
+    # Supports of the itemsets of an ItemsetArray (NaN where not in the table)
+    def lookup_itemsets(self, itemsets):
+        positions = self.index.find_itemsets(itemsets)
+        return np.where(positions >= 0, self.support[positions], np.nan)
+
+
+# Association rules: antecedent and consequent itemsets aligned with a frame of the metric columns
+class RuleTable:
+    itemset_columns = ('antecedents', 'consequents')
+
+    def __init__(self, antecedents, consequents, metrics):
+        self.antecedents = antecedents
+        self.consequents = consequents
+        self.metrics = metrics.reset_index(drop=True)
+
+    @classmethod
+    def concat(cls, tables):
+        tables = list(tables)
+        return cls(ItemsetArray.concat(table.antecedents for table in tables),
+                   ItemsetArray.concat(table.consequents for table in tables),
+                   pd.concat([table.metrics for table in tables], ignore_index=True))
+
+    def __len__(self):
+        return len(self.metrics)
+
+    @property
+    def empty(self):
+        return not len(self)
+
+    def take(self, positions):
+        return RuleTable(self.antecedents.take(positions), self.consequents.take(positions), self.metrics.iloc[positions])
+
+    def column(self, name):
+        if name in self.itemset_columns:
+            return getattr(self, name)
+        return self.metrics[name].to_numpy()
+
+    # Decoded frame in the mlxtend association_rules schema (itemsets as frozensets of names)
+    def frame(self, dictionary):
+        rules = self.metrics.copy()
+        rules.insert(0, 'consequents', self.consequents.frozensets(dictionary))
+        rules.insert(0, 'antecedents', self.antecedents.frozensets(dictionary))
+        return rules
+
+
+def _size_ok(size, bounds):
+    low, high = bounds
+    return (low is None or size >= low) and (high is None or size <= high)
+
+
+# Rules from frequent itemsets (an ItemsetTable) with filters pushed into generation.
+#   antecedent_len / consequent_len: (min, max) sizes, either may be None
+#   antecedent_items / consequent_items: items each side must include
+#   top_k, sort_by: keep only the K rules with the highest sort_by metric
+#   only: boolean mask of the itemsets to split (default all); supports are still looked up in all of them
+@instrumented('rules', inputs=lambda frequent_itemsets, *args, **kwargs: {'itemsets': len(frequent_itemsets)},
+              outputs=lambda rules: {'rules': len(rules)})
+def generate_rules(frequent_itemsets, dictionary, min_support=0.0, min_confidence=0.0, min_lift=None,
+                   antecedent_len=(None, None), consequent_len=(None, None),
+                   antecedent_items=(), consequent_items=(), top_k=None, sort_by='confidence', only=None):
+    table = SupportTable(frequent_itemsets)
+    # An item missing from the dictionary becomes id -1, which no itemset contains
+    required_antecedent = np.array([dictionary.index.get(item, -1) for item in antecedent_items], dtype=np.int32)
+    required_consequent = np.array([dictionary.index.get(item, -1) for item in consequent_items], dtype=np.int32)
+    required = np.concatenate([required_antecedent, required_consequent])
+
+    batches = []
+    kept = 0
+    threshold = -np.inf
+    for size in sorted(table.sizes):
+        if size < 2:
+            continue
+        positions, ids, supports = table.sizes[size]
+        mask = supports >= min_support
+        if only is not None:
+            mask &= only[positions]
+        if len(required):
+            mask &= np.isin(ids, required).sum(axis=1) == len(np.unique(required))
+        ids, supports = ids[mask], supports[mask]
+        checkpoint(stage='rules', level=size, candidates=len(ids), rules=kept)
+        if not len(ids):
+            continue
+
+        for antecedent_size in range(1, size):
+            consequent_size = size - antecedent_size
+            if not (_size_ok(antecedent_size, antecedent_len) and _size_ok(consequent_size, consequent_len)):
+                continue
+            for positions in combinations(range(size), antecedent_size):
+                rest = [p for p in range(size) if p not in positions]
+                antecedents, consequents = ids[:, list(positions)], ids[:, rest]
+
+                keep = np.ones(len(ids), dtype=bool)
+                if len(required_antecedent):
+                    keep &= np.isin(antecedents, required_antecedent).sum(axis=1) == len(np.unique(required_antecedent))
+                if len(required_consequent):
+                    keep &= np.isin(consequents, required_consequent).sum(axis=1) == len(np.unique(required_consequent))
+                if not keep.any():
+                    continue
+
+                antecedents, consequents, support = antecedents[keep], consequents[keep], supports[keep]
+                antecedent_support = table.lookup(antecedents)
+                consequent_support = table.lookup(consequents)
+                confidence = support / antecedent_support
+                lift = confidence / consequent_support
+
+                keep = confidence >= min_confidence
+                if min_lift is not None:
+                    keep &= lift >= min_lift
+                metric = {'confidence': confidence, 'lift': lift, 'support': support}[sort_by]
+                if top_k is not None:
+                    keep &= metric >= threshold
+                if not keep.any():
+                    continue
+
+                batch = (antecedents[keep], consequents[keep], antecedent_support[keep], consequent_support[keep],
+                         support[keep], confidence[keep], lift[keep], metric[keep])
+                batches.append(batch)
+                kept += len(batch[-1])
+
+                # Keep only the K best candidates seen so far and raise the bar for later batches
+                if top_k is not None and kept > top_k:
+                    batches, threshold = _top_k(batches, top_k)
+                    kept = top_k
+
+    if top_k is not None and kept > top_k:
+        batches, _ = _top_k(batches, top_k)
+    return _rule_table(batches, sort_by if top_k is not None else None)
+
+
+# Merge candidate batches and keep the k with the highest metric; returns (batches, k-th metric)
+def _top_k(batches, k):
+    metric = np.concatenate([batch[-1] for batch in batches])
+    best = np.argpartition(-metric, k - 1)[:k]
+    offset = 0
+    selected = []
+    for batch in batches:
+        n = len(batch[-1])
+        local = best[(best >= offset) & (best < offset + n)] - offset
+        if len(local):
+            selected.append(tuple(part[local] for part in batch))
+        offset += n
+    return selected, metric[best].min()
+
+
+# Build the rule table; antecedents and consequents stay as id arrays
+def _rule_table(batches, sort_by=None):
+    if not batches:
+        return RuleTable(ItemsetArray.empty(), ItemsetArray.empty(), pd.DataFrame(columns=RULE_COLUMNS[2:], dtype=float))
+    antecedents = ItemsetArray.concat(ItemsetArray.from_padded(batch[0]) for batch in batches)
+    consequents = ItemsetArray.concat(ItemsetArray.from_padded(batch[1]) for batch in batches)
+    antecedent_support, consequent_support, support, metric = (
+        np.concatenate([batch[i] for batch in batches]) for i in (2, 3, 4, 7))
+
+    rules = RuleTable(antecedents, consequents, metrics_frame(antecedent_support, consequent_support, support))
+    if sort_by is not None:
+        rules = rules.take(np.argsort(-metric, kind='stable'))
+    return rules
+
+
+# Metric columns of a rule table from the antecedent, consequent and rule supports
+def metrics_frame(antecedent_support, consequent_support, support):
+    confidence = support / antecedent_support
+    lift = confidence / consequent_support
+    leverage = support - antecedent_support * consequent_support
+    with np.errstate(divide='ignore', invalid='ignore'):
+        conviction = np.where(confidence >= 1, np.inf, (1 - consequent_support) / (1 - confidence))
+    return pd.DataFrame({
+        'antecedent support': antecedent_support, 'consequent support': consequent_support,
+        'support': support, 'confidence': confidence, 'lift': lift, 'leverage': leverage, 'conviction': conviction,
+    })
+
+
+# Rules whose itemsets are all still in frequent_itemsets, with every metric recomputed from its supports
+def rescore_rules(rules, frequent_itemsets):
+    table = SupportTable(frequent_itemsets)
+    support = table.lookup_itemsets(rules.antecedents.union(rules.consequents))
+    antecedent_support = table.lookup_itemsets(rules.antecedents)
+    consequent_support = table.lookup_itemsets(rules.consequents)
+    keep = np.flatnonzero(~(np.isnan(support) | np.isnan(antecedent_support) | np.isnan(consequent_support)))
+    return RuleTable(rules.antecedents.take(keep), rules.consequents.take(keep),
+                     metrics_frame(antecedent_support[keep], consequent_support[keep], support[keep]))
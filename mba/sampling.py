@@ -0,0 +1,195 @@
+# Fast preview mining on a uniform random sample of the transactions (Toivonen, 1996).
+# The sample is mined at a lowered threshold, below which the sampled support of an itemset that is
+# frequent in the full data falls only with a small probability, and supports are estimated with
+# Wilson score intervals. verify() counts only the candidates -- the itemsets frequent in the sample
+# at the lowered threshold and their negative border (the minimal itemsets that are not) -- on the
+# full data. If no border itemset turns out frequent, the sample missed nothing; otherwise the missed
+# part is completed level by level from the exact counts, so the verified result is always exact.
+import math
+from collections import OrderedDict
+from statistics import NormalDist
+
+import numpy as np
+
+from mba.instrument import recorder
+from mba.itemsets import ItemsetArray, ItemsetTable, SizeIndex, apriori_gen
+from mba.mining import mine
+from mba.pipeline import EncodedDataset
+
+DEFAULT_SAMPLE_SIZE = 20_000
+
+
+def _z(probability):
+    return NormalDist().inv_cdf(probability)
+
+
+# Finite population correction for a sample of n out of N transactions drawn without replacement
+def _correction(n, N):
+    return math.sqrt((N - n) / (N - 1)) if N > 1 else 0.0
+
+
+# Wilson score interval of the true support from count hits in a sample of n out of N transactions
+def wilson_interval(counts, n, N, confidence=0.95):
+    z = _z(0.5 + confidence / 2)
+    p = np.asarray(counts, dtype=float) / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator * _correction(n, N)
+    return np.clip(centre - half, 0.0, 1.0), np.clip(centre + half, 0.0, 1.0)
+
+
+# Threshold the sampled support of an itemset with true support min_support stays above with
+# probability 1 - miss_probability (normal approximation to its sampling distribution)
+def lowered_threshold(min_support, n, N, miss_probability=0.01):
+    spread = math.sqrt(min_support * (1 - min_support) / n) * _correction(n, N)
+    return max(0.0, min_support - _z(1 - miss_probability) * spread)
+
+
+# Minimal itemsets that are not in a downward-closed ItemsetArray: the single items it lacks and the
+# apriori-gen candidates of each of its levels that are not in it
+def negative_border(itemsets, n_items):
+    index = SizeIndex(itemsets)
+    singles = index.sizes[1][1][:, 0] if 1 in index.sizes else np.empty(0, dtype=np.int32)
+    border = [np.setdiff1d(np.arange(n_items, dtype=np.int32), singles)[:, None]]
+    for size in sorted(index.sizes):
+        candidates = apriori_gen(index.sizes[size][1])
+        border.append(candidates[index.find(candidates) < 0])
+    return ItemsetArray.concat(ItemsetArray.from_padded(ids) for ids in border if len(ids))
+
+
+# Sampled support estimates: an ItemsetTable with the interval bounds alongside
+class EstimateTable(ItemsetTable):
+    def __init__(self, support, itemsets, low, high):
+        super().__init__(support, itemsets)
+        self.low = np.asarray(low, dtype=float)
+        self.high = np.asarray(high, dtype=float)
+
+    def take(self, positions):
+        return EstimateTable(self.support[positions], self.itemsets.take(positions), self.low[positions], self.high[positions])
+
+    def head(self, n):
+        return self.take(np.arange(min(n, len(self))))
+
+    def column(self, name):
+        return {'support': self.support, 'itemsets': self.itemsets, 'support low': self.low, 'support high': self.high}[name]
+
+
+# Outcome of verify(): the exact frequent itemsets and what it took to get them, and the error of the
+# sample estimate (the itemsets estimated at or above min_support): false_positives of its n_estimated
+# itemsets are not frequent, and it left out missed frequent itemsets
+class Verification:
+    def __init__(self, itemsets, n_sample_candidates, n_border, border_hits, n_extra, n_estimated, false_positives,
+                 missed):
+        self.itemsets = itemsets
+        self.n_sample_candidates = n_sample_candidates
+        self.n_border = n_border
+        self.border_hits = border_hits
+        self.n_extra = n_extra
+        self.n_estimated = n_estimated
+        self.false_positives = false_positives
+        self.missed = missed
+
+    # True when the sample found every frequent itemset (no border itemset is frequent)
+    @property
+    def complete_from_sample(self):
+        return self.border_hits == 0
+
+    def summary(self):
+        text = (f'{len(self.itemsets)} frequent itemsets, counted exactly: {self.n_sample_candidates} sample candidates '
+                f'and {self.n_border} negative border itemsets')
+        if self.complete_from_sample:
+            text = f'{text}. No border itemset is frequent, so the sample missed nothing.'
+        else:
+            text = (f'{text}. {self.border_hits} border itemsets are frequent, so the sample missed some; '
+                    f'{self.n_extra} more candidates were counted to complete the result.')
+        return (f'{text} Of the {self.n_estimated} itemsets the sample estimated at or above the threshold, '
+                f'{self.false_positives} are not frequent (false positives), and {self.missed} frequent itemsets '
+                f'were not among them (missed).')
+
+
+# Uniform sample of a dataset, mined on demand per threshold (the last max_entries thresholds are kept)
+class SamplePreview:
+    def __init__(self, dataset, sample_size=DEFAULT_SAMPLE_SIZE, miss_probability=0.01, confidence=0.95, seed=0,
+                 max_entries=16):
+        self.dataset = dataset
+        self.miss_probability = miss_probability
+        self.confidence = confidence
+        self.max_entries = max_entries
+        N = dataset.n_transactions
+        rows = np.sort(np.random.default_rng(seed).choice(N, size=min(sample_size, N), replace=False))
+        self.sample = EncodedDataset(None, dataset.columns, dataset.matrix[rows])
+        self.sample_size = len(rows)
+        self._mined = OrderedDict()
+
+    def lowered(self, min_support):
+        return lowered_threshold(min_support, self.sample_size, self.dataset.n_transactions, self.miss_probability)
+
+    # Itemsets frequent in the sample at the lowered threshold for min_support
+    def candidates(self, min_support):
+        lowered = self.lowered(min_support)
+        if lowered not in self._mined:
+            self._mined[lowered] = mine(self.sample, lowered, algorithm='eclat').frequent_itemsets
+            while len(self._mined) > self.max_entries:
+                self._mined.popitem(last=False)
+        self._mined.move_to_end(lowered)
+        return self._mined[lowered]
+
+    # Sample itemsets whose estimated support is >= min_support, with their intervals, by support
+    def estimates(self, min_support):
+        candidates = self.candidates(min_support)
+        keep = np.flatnonzero(candidates.support >= min_support)
+        keep = keep[np.argsort(-candidates.support[keep], kind='stable')]
+        counts = np.rint(candidates.support[keep] * self.sample_size)
+        low, high = wilson_interval(counts, self.sample_size, self.dataset.n_transactions, self.confidence)
+        return EstimateTable(candidates.support[keep], candidates.itemsets.take(keep), low, high)
+
+    # Exact frequent itemsets at min_support, counting the sample candidates and their negative border
+    # on the full data, then any candidates the sample missed
+    def verify(self, min_support):
+        sample_itemsets = self.candidates(min_support)
+        candidates = sample_itemsets.itemsets
+        with recorder.stage('verify', candidates=len(candidates)) as record:
+            border = negative_border(candidates, len(self.dataset.columns))
+            counted = ItemsetArray.concat([candidates, border])
+            counted_index = SizeIndex(counted)
+            vertical = self.dataset.vertical
+            N = self.dataset.n_transactions
+
+            levels = {}
+            for size, (positions, ids, _) in counted_index.sizes.items():
+                counts = vertical.count_rows(ids)
+                frequent = counts / N >= min_support
+                levels[size] = (ids[frequent], counts[frequent], positions[frequent])
+            border_hits = sum(int(np.sum(positions >= len(candidates))) for _, _, positions in levels.values())
+            verified = np.zeros(len(candidates), dtype=bool)
+            for _, _, positions in levels.values():
+                verified[positions[positions < len(candidates)]] = True
+            estimated = sample_itemsets.support >= min_support
+
+            # Every frequent (k + 1)-itemset is an apriori-gen candidate of the frequent k-itemsets;
+            # only the candidates not counted yet are counted
+            n_extra = 0
+            size = 1
+            while size in levels and len(levels[size][0]):
+                extra = apriori_gen(levels[size][0])
+                extra = extra[counted_index.find(extra) < 0]
+                if len(extra):
+                    counts = vertical.count_rows(extra)
+                    frequent = counts / N >= min_support
+                    ids, level_counts, _ = levels.get(size + 1, (np.empty((0, size + 1), dtype=np.int32), np.empty(0, dtype=np.int64), None))
+                    levels[size + 1] = (np.concatenate([ids, extra[frequent]]), np.concatenate([level_counts, counts[frequent]]), None)
+                    n_extra += len(extra)
+                size += 1
+
+            sizes = [size for size in sorted(levels) if len(levels[size][0])]
+            if sizes:
+                itemsets = ItemsetTable(np.concatenate([levels[size][1] for size in sizes]) / N,
+                                        ItemsetArray.concat(ItemsetArray.from_padded(levels[size][0]) for size in sizes))
+            else:
+                itemsets = ItemsetTable(np.empty(0), ItemsetArray.empty())
+            record.outputs.update(border=len(border), border_hits=border_hits, extra=n_extra, itemsets=len(itemsets))
+            false_positives = int(np.sum(estimated & ~verified))
+            missed = len(itemsets) - int(np.sum(estimated & verified))
+            record.outputs.update(false_positives=false_positives, missed=missed)
+        return Verification(itemsets, len(candidates), len(border), border_hits, n_extra, int(np.sum(estimated)),
+                            false_positives, missed)
@@ -0,0 +1,165 @@
+# Memory-mapped snapshots of encoded datasets.
+# The CSR and CSC arrays, the transaction ids and the item vocabulary are written once per dataset
+# hash; every session and worker process then maps them read-only, so the pages are shared by the
+# OS page cache instead of being copied into each process. Snapshots are evicted least recently used
+# first once the store exceeds max_bytes; a process that still maps an evicted snapshot keeps reading
+# it until it lets go (on POSIX the files only disappear from the directory).
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+from scipy import sparse
+
+from mba.cache import DEFAULT_CACHE_DIR
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(DEFAULT_CACHE_DIR, 'snapshots')
+
+DEFAULT_SNAPSHOT_MAX_BYTES = 8 * 1024 ** 3
+
+_ARRAYS = ('csr_indptr', 'csr_indices', 'csc_indptr', 'csc_indices', 'data')
+
+
+class SnapshotStore:
+    def __init__(self, directory=DEFAULT_SNAPSHOT_DIR, max_bytes=DEFAULT_SNAPSHOT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(self._path(key), 'columns.json'))
+
+    # Write the dataset's arrays into a temporary directory and rename it into place. Object-dtype
+    # transaction ids (mixed or string ids) cannot be mapped, so they are kept as a JSON list instead.
+    def save(self, dataset):
+        if dataset.key is None or dataset.key in self:
+            return
+        csr = dataset.matrix
+        csc = csr.tocsc()
+        csc.sort_indices()
+        arrays = {
+            'csr_indptr': csr.indptr, 'csr_indices': csr.indices,
+            'csc_indptr': csc.indptr, 'csc_indices': csc.indices,
+            'data': np.ones(csr.nnz, dtype=bool),
+        }
+        object_ids = dataset.transaction_ids.dtype == object
+        if not object_ids:
+            arrays['transaction_ids'] = dataset.transaction_ids
+        if dataset.timestamps is not None:
+            arrays['timestamps'] = dataset.timestamps
+
+        tmp_dir = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(array))
+            if object_ids:
+                with open(os.path.join(tmp_dir, 'transaction_ids.json'), 'w') as f:
+                    json.dump(dataset.transaction_ids.tolist(), f, default=str)
+            with open(os.path.join(tmp_dir, 'columns.json'), 'w') as f:
+                json.dump({'columns': dataset.columns, 'shape': list(csr.shape)}, f)
+            os.rename(tmp_dir, self._path(dataset.key))
+        except OSError:
+            # Another process already published this snapshot
+            if dataset.key not in self:
+                raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict(keep=dataset.key)
+
+    # Map a saved snapshot read-only: (transaction ids, columns, CSR matrix, CSC matrix, timestamps or None), or None
+    def load(self, key):
+        if key not in self:
+            return None
+        path = self._path(key)
+        try:
+            with open(os.path.join(path, 'columns.json')) as f:
+                meta = json.load(f)
+            os.utime(os.path.join(path, 'columns.json'))
+            arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in _ARRAYS}
+            if os.path.exists(os.path.join(path, 'transaction_ids.json')):
+                with open(os.path.join(path, 'transaction_ids.json')) as f:
+                    transaction_ids = np.empty(meta['shape'][0], dtype=object)
+                    transaction_ids[:] = json.load(f)
+            else:
+                transaction_ids = np.load(os.path.join(path, 'transaction_ids.npy'), mmap_mode='r')
+            timestamps_path = os.path.join(path, 'timestamps.npy')
+            timestamps = np.load(timestamps_path, mmap_mode='r') if os.path.exists(timestamps_path) else None
+        except FileNotFoundError:
+            # Evicted by another process while loading
+            return None
+        shape = tuple(meta['shape'])
+        csr = sparse.csr_matrix((arrays['data'], arrays['csr_indices'], arrays['csr_indptr']), shape=shape, copy=False)
+        csc = sparse.csc_matrix((arrays['data'], arrays['csc_indices'], arrays['csc_indptr']), shape=shape, copy=False)
+        return transaction_ids, meta['columns'], csr, csc, timestamps
+
+    # (size in bytes, last use) of every published snapshot
+    def _entries(self):
+        entries = {}
+        for name in os.listdir(self.directory):
+            path = self._path(name)
+            if name.startswith('.tmp-') or not os.path.isdir(path):
+                continue
+            try:
+                last_used = os.stat(os.path.join(path, 'columns.json')).st_mtime
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+            except FileNotFoundError:
+                continue
+            entries[name] = (size, last_used)
+        return entries
+
+    # Remove least recently used snapshots until the store fits in max_bytes, never removing keep
+    def evict(self, keep=None):
+        entries = self._entries()
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda entry: entry[1][1]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            # Unpublish first, so no process starts loading a half-removed snapshot
+            try:
+                os.remove(os.path.join(self._path(key), 'columns.json'))
+            except FileNotFoundError:
+                continue
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            total -= size
+
+    def total_bytes(self):
+        return sum(size for size, _ in self._entries().values())
+
+
+# The .npy file array is memory-mapped from in full (e.g. an array of a loaded snapshot), or None
+def mapped_file(array):
+    mapped = array
+    while mapped is not None and not isinstance(mapped, np.memmap):
+        mapped = mapped.base
+    if mapped is None or not str(mapped.filename or '').endswith('.npy'):
+        return None
+    whole = mapped.shape == array.shape and mapped.dtype == array.dtype and mapped.ctypes.data == array.ctypes.data
+    return mapped.filename if whole else None
+
+
+# Paths of .npy files holding the given arrays, for a child process to map read-only instead of
+# receiving them pickled: the snapshot files of mapped arrays, temporary copies (removed on exit) of the others
+@contextmanager
+def array_files(arrays):
+    tmp_dir = None
+    paths = []
+    try:
+        for array in arrays:
+            path = mapped_file(array)
+            if path is None:
+                if tmp_dir is None:
+                    tmp_dir = tempfile.mkdtemp(prefix='mba-arrays-')
+                path = os.path.join(tmp_dir, f'{len(paths)}.npy')
+                np.save(path, np.ascontiguousarray(array))
+            paths.append(path)
+        yield paths
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
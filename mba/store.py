@@ -0,0 +1,132 @@
+# Mine once at a floor threshold, then answer every higher threshold by filtering.
+# Raising min_support or min_confidence only ever shrinks the result, so itemsets and rules are
+# kept sorted by support and a slider move is a binary search plus a mask over the surviving prefix.
+import numpy as np
+
+from mba.instrument import instrumented
+from mba.mining import ALGORITHMS, CONDENSE, mine_for_rules
+from mba.rules import generate_rules
+
+
+# Number of leading rows of a frame sorted by descending support with support >= min_support
+def _support_prefix(descending_support, min_support):
+    return int(np.searchsorted(-descending_support, -min_support, side='right'))
+
+
+# Frequent itemsets at the floor threshold, sorted by descending support
+class ItemsetStore:
+    def __init__(self, frequent_itemsets, condense=None):
+        self.frequent_itemsets = frequent_itemsets.take(np.argsort(-frequent_itemsets.support, kind='stable'))
+        self.condense = condense
+        # Closedness does not depend on the threshold, so closed itemsets are derived once
+        if condense == 'closed':
+            self._condensed = CONDENSE['closed'](self.frequent_itemsets)
+
+    # Itemsets with support >= min_support (maximal/closed if the store is condensed)
+    def above(self, min_support):
+        if self.condense == 'closed':
+            return self._condensed.head(_support_prefix(self._condensed.support, min_support))
+        frequent = self.frequent_itemsets.head(_support_prefix(self.frequent_itemsets.support, min_support))
+        if self.condense == 'maximal':
+            frequent = CONDENSE['maximal'](frequent)
+        return frequent
+
+    def __len__(self):
+        return len(self.frequent_itemsets)
+
+
+# Association rules at the floor thresholds, sorted by descending support, with an
+# inverted index from item id to the positions of the rules that contain it
+class RuleStore:
+    def __init__(self, rules, dictionary):
+        self.dictionary = dictionary
+        self.rules = rules.take(np.lexsort((-rules.column('confidence'), -rules.column('support'))))
+        self._support = self.rules.column('support')
+        self._confidence = self.rules.column('confidence')
+        self._antecedent_index = self._item_positions(self.rules.antecedents, len(dictionary))
+        self._consequent_index = self._item_positions(self.rules.consequents, len(dictionary))
+
+    # (indptr, positions): positions[indptr[i]:indptr[i + 1]] are the sorted positions of the rules
+    # whose itemsets contain item id i (CSR layout, built with one stable argsort)
+    @staticmethod
+    def _item_positions(itemsets, n_items):
+        order = np.argsort(itemsets.ids, kind='stable')
+        indptr = np.zeros(n_items + 1, dtype=np.int64)
+        np.cumsum(np.bincount(itemsets.ids, minlength=n_items), out=indptr[1:])
+        return indptr, itemsets.row_numbers()[order]
+
+    # Mask over the first n rules keeping those that contain every item in items
+    def _containing(self, index, items, n):
+        indptr, positions = index
+        mask = np.ones(n, dtype=bool)
+        for item in items:
+            item_id = self.dictionary.index.get(item)
+            rows = np.zeros(n, dtype=bool)
+            if item_id is not None:
+                item_positions = positions[indptr[item_id]:indptr[item_id + 1]]
+                rows[item_positions[:np.searchsorted(item_positions, n)]] = True
+            mask &= rows
+        return mask
+
+    # Rules with support >= min_support and confidence >= min_confidence whose antecedents and
+    # consequents include all the requested items, in descending support/confidence order
+    @instrumented('filter_rules', inputs=lambda self, *args, **kwargs: {'rules': len(self)},
+                  outputs=lambda rules: {'rules': len(rules)})
+    def filter(self, min_support=0.0, min_confidence=0.0, antecedent_items=(), consequent_items=()):
+        n = _support_prefix(self._support, min_support)
+        mask = self._confidence[:n] >= min_confidence
+        if antecedent_items:
+            mask &= self._containing(self._antecedent_index, antecedent_items, n)
+        if consequent_items:
+            mask &= self._containing(self._consequent_index, consequent_items, n)
+        return self.rules.take(np.flatnonzero(mask))
+
+    def __len__(self):
+        return len(self.rules)
+
+
+# One mining pass at the floor threshold, kept as an itemset store and a rule store.
+# With a result_cache, the pass is loaded from / saved to the on-disk cache. mined is an already
+# computed (frequent_itemsets, rules) pair at the floor, e.g. from an incremental update (update
+# holds its statistics).
+class MinedStore:
+    def __init__(self, dataset, algorithm='apriori', floor_support=0.01, result_cache=None, workers=1,
+                 mined=None, update=None):
+        self.algorithm = algorithm
+        self.floor_support = floor_support
+        self.mining = None
+        self.update = update
+        cache_params = (dataset.key, algorithm, floor_support, 0.0)
+
+        use_cache = result_cache is not None and bool(dataset.key)
+        cached = result_cache.load(*cache_params) if use_cache and mined is None else None
+        if cached is not None:
+            frequent_itemsets, rules = cached
+        else:
+            if mined is not None:
+                frequent_itemsets, rules = mined
+            else:
+                self.mining = mine_for_rules(dataset, floor_support, algorithm=algorithm, workers=workers)
+                frequent_itemsets = self.mining.frequent_itemsets
+                rules = generate_rules(frequent_itemsets, dataset.dictionary)
+            if use_cache:
+                result_cache.save(*cache_params, frequent_itemsets, rules)
+
+        self.dictionary = dataset.dictionary
+        self.n_transactions = dataset.n_transactions
+        self.itemsets = ItemsetStore(frequent_itemsets, condense=ALGORITHMS[algorithm][2])
+        self.rules = RuleStore(rules, self.dictionary)
+
+    def summary(self):
+        label = ALGORITHMS[self.algorithm][0]
+        if self.update is not None:
+            return f'{label} @ min_support={self.floor_support:.4f}: {len(self.itemsets)} itemsets, {self.update.summary()}'
+        if self.mining is None:
+            return f'{label} @ min_support={self.floor_support:.4f}: {len(self.itemsets)} itemsets, loaded from disk cache'
+        return self.mining.summary()
+
+    # Top-K rules by lift or confidence, generated from the floor itemsets with every filter pushed down
+    def top_rules(self, k, sort_by, min_support=0.0, min_confidence=0.0, antecedent_items=(), consequent_items=()):
+        return generate_rules(self.itemsets.frequent_itemsets, self.dictionary, min_support=min_support,
+                              min_confidence=min_confidence, antecedent_items=antecedent_items,
+                              consequent_items=consequent_items, top_k=k, sort_by=sort_by)
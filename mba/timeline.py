@@ -0,0 +1,107 @@
+# Time-bucketed and sliding-window mining over the transaction timestamps.
+# Transactions are grouped into calendar buckets (day, week or month). Each bucket is mined locally at
+# the floor support: an itemset frequent in a window (a run of consecutive buckets) is frequent in at
+# least one of its buckets, so the union of the local results is counted once per bucket and every
+# window is answered from those per-bucket counts. Sliding the window by one bucket adds the counts of
+# the bucket entering it and subtracts those of the bucket leaving it; nothing is re-mined.
+import numpy as np
+import pandas as pd
+
+from mba.eclat import eclat_extend, frequent_singles
+from mba.itemsets import ItemsetArray, ItemsetTable
+from mba.vertical import VerticalIndex
+
+# Bucket frequency -> label shown in the UI (pandas period aliases)
+FREQUENCIES = {'D': 'Day', 'W': 'Week', 'M': 'Month'}
+
+
+# Bucket number of every transaction (-1 where the timestamp is NaT) and the PeriodIndex of all
+# buckets from the first to the last timestamp, empty buckets included
+def bucket_codes(timestamps, freq='D'):
+    periods = pd.PeriodIndex(pd.DatetimeIndex(timestamps), freq=freq)
+    valid = ~periods.isna()
+    if not valid.any():
+        return np.full(len(periods), -1, dtype=np.int64), pd.PeriodIndex([], freq=freq)
+    labels = pd.period_range(periods[valid].min(), periods[valid].max(), freq=freq)
+    codes = np.where(valid, periods.asi8 - labels[0].ordinal, -1)
+    return codes, labels
+
+
+# Per-bucket support counts of every itemset that is frequent in at least one bucket
+class BucketedCounts:
+    def __init__(self, dataset, freq='D', min_support=0.01):
+        self.freq = freq
+        self.min_support = min_support
+        codes, self.labels = bucket_codes(dataset.timestamps, freq)
+        self.sizes = np.bincount(codes[codes >= 0], minlength=len(self.labels))
+
+        order = np.argsort(codes, kind='stable')
+        order = order[codes[order] >= 0]
+        buckets = []
+        local = set()
+        for rows in np.split(order, np.cumsum(self.sizes)[:-1]):
+            if not len(rows):
+                buckets.append(None)
+                continue
+            vertical = VerticalIndex(dataset.matrix[rows], dataset.columns)
+            singles = frequent_singles(vertical, min_support)
+            local.update(ids for _, ids in eclat_extend((), singles, len(rows), min_support, None, []))
+            buckets.append(vertical)
+
+        local = sorted(local, key=lambda ids: (len(ids), ids))
+        self.itemsets = ItemsetArray.from_rows(local)
+        self.counts = np.zeros((len(local), len(self.labels)), dtype=np.int64)
+        by_size = [self.itemsets.padded(size) for size in np.unique(self.itemsets.lengths)]
+        for b, vertical in enumerate(buckets):
+            if vertical is not None:
+                for positions, ids in by_size:
+                    self.counts[positions, b] = vertical.count_rows(ids)
+
+    # Itemsets with support >= min_support given their counts over n transactions
+    def _frequent(self, counts, n, min_support):
+        if not n:
+            return ItemsetTable(np.empty(0), ItemsetArray.empty())
+        keep = np.flatnonzero(counts / n >= max(min_support, self.min_support))
+        return ItemsetTable(counts[keep] / n, self.itemsets.take(keep))
+
+    # Frequent itemsets of the window of length buckets ending at bucket end (inclusive)
+    def window(self, end, length, min_support=0.0):
+        start = max(0, end - length + 1)
+        return self._frequent(self.counts[:, start:end + 1].sum(axis=1), int(self.sizes[start:end + 1].sum()), min_support)
+
+    # (label of the last bucket, frequent itemsets) for every window of length buckets, in time order
+    def sliding(self, length, min_support=0.0):
+        counts = np.zeros(len(self.itemsets), dtype=np.int64)
+        n = 0
+        for end in range(len(self.labels)):
+            counts += self.counts[:, end]
+            n += int(self.sizes[end])
+            if end >= length:
+                counts -= self.counts[:, end - length]
+                n -= int(self.sizes[end - length])
+            yield self.labels[end], self._frequent(counts, n, min_support)
+
+
+# Support, confidence and lift of the rule antecedent -> consequent per bucket, or over a rolling
+# window of buckets, from three vertical-index masks and one bincount each
+def rule_timeline(dataset, antecedent, consequent, freq='D', window=1):
+    codes, labels = bucket_codes(dataset.timestamps, freq)
+    valid = codes >= 0
+
+    def per_bucket(mask):
+        counts = np.bincount(codes[valid & mask], minlength=len(labels))
+        if window > 1:
+            cumulative = np.concatenate([[0], np.cumsum(counts)])
+            counts = cumulative[1:] - cumulative[np.maximum(np.arange(1, len(counts) + 1) - window, 0)]
+        return counts
+
+    transactions = per_bucket(np.ones(len(codes), dtype=bool))
+    both = per_bucket(dataset.contains_all(list(antecedent) + list(consequent)))
+    antecedent_count = per_bucket(dataset.contains_all(list(antecedent)))
+    consequent_count = per_bucket(dataset.contains_all(list(consequent)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        support = both / transactions
+        confidence = both / antecedent_count
+        lift = confidence / (consequent_count / transactions)
+    return pd.DataFrame({'transactions': transactions, 'support': support, 'confidence': confidence, 'lift': lift},
+                        index=labels.to_timestamp())
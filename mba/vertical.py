@@ -0,0 +1,177 @@
+# Vertical (item -> transactions) index for fast support counting of ad-hoc itemsets.
+# Each item maps to the sorted array of transaction ids that contain it, and to a packed
+# bitset built on demand. The support of an itemset is the popcount of the AND of its bitsets.
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy import sparse
+
+# Popcount of every byte value, used when numpy has no bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+# Number of set bits in a packed uint64 bitset
+def popcount(bits):
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(bits).sum())
+    return int(_POPCOUNT_TABLE[bits.view(np.uint8)].sum())
+
+
+# Set bits in each row of a 2-d array of packed uint64 bitsets
+def popcount_rows(bits):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bits).sum(axis=1, dtype=np.int64)
+    return _POPCOUNT_TABLE[bits.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+# Small thread-safe LRU mapping of numpy arrays, bounded by the bytes of the values it holds
+class LRUCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    # A value larger than the whole budget is not kept
+    def put(self, key, value):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._nbytes -= previous.nbytes
+            self._entries[key] = value
+            self._nbytes += value.nbytes
+            while self._entries and self._nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def nbytes(self):
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Bytes of ANDed bitsets (and of stacked item bitsets) held at once by count_rows
+COUNT_BLOCK_BYTES = 64 * 1024 ** 2
+
+# Default budgets of the single-item bitset cache and of the cache of multi-item intersections
+BITSET_CACHE_BYTES = 256 * 1024 ** 2
+INTERSECTION_CACHE_BYTES = 64 * 1024 ** 2
+
+
+class VerticalIndex:
+    # csc, if given, is a prebuilt (e.g. memory-mapped) CSC copy of matrix with sorted indices
+    def __init__(self, matrix, columns, cache_bytes=INTERSECTION_CACHE_BYTES, bitset_cache_bytes=BITSET_CACHE_BYTES,
+                 csc=None):
+        self.columns = list(columns)
+        self.column_index = {item: i for i, item in enumerate(self.columns)}
+        if csc is None:
+            csc = sparse.csc_matrix(matrix, dtype=bool)
+            csc.sort_indices()
+        self._csc = csc
+        self.n_transactions = self._csc.shape[0]
+        self._n_words = -(-self.n_transactions // 64)
+        self._bitsets = LRUCache(bitset_cache_bytes)
+        self._intersections = LRUCache(cache_bytes)
+
+    # Bytes held by the cached bitsets and intersections (the CSC arrays are counted by the dataset)
+    def cache_nbytes(self):
+        return self._bitsets.nbytes() + self._intersections.nbytes()
+
+    # Column-major (CSC) matrix the index is built on
+    @property
+    def csc(self):
+        return self._csc
+
+    # Sorted transaction ids that contain the item with the given column id
+    def tids(self, item_id):
+        start, stop = self._csc.indptr[item_id], self._csc.indptr[item_id + 1]
+        return self._csc.indices[start:stop]
+
+    # Packed bitset (uint64 words) of the transactions containing the item with the given column id
+    def bitset(self, item_id):
+        bits = self._bitsets.get(item_id)
+        if bits is None:
+            flags = np.zeros(self._n_words * 64, dtype=bool)
+            flags[self.tids(item_id)] = True
+            bits = np.packbits(flags, bitorder='little').view(np.uint64)
+            self._bitsets.put(item_id, bits)
+        return bits
+
+    def item_ids(self, items):
+        return tuple(sorted({self.column_index[item] for item in items}))
+
+    # Bitset of the transactions containing all the given column ids (sorted tuple).
+    # Intersections are built prefix by prefix so related queries reuse cached work.
+    def _intersection(self, ids):
+        if len(ids) == 1:
+            return self.bitset(ids[0])
+        bits = self._intersections.get(ids)
+        if bits is None:
+            bits = self._intersection(ids[:-1]) & self.bitset(ids[-1])
+            self._intersections.put(ids, bits)
+        return bits
+
+    # Number of transactions that contain every item in items
+    def support_count(self, items):
+        return self.count_ids(self.item_ids(items))
+
+    # Number of transactions that contain every item with the given column ids (sorted tuple)
+    def count_ids(self, ids):
+        if not ids:
+            return self.n_transactions
+        if len(ids) == 1:
+            return len(self.tids(ids[0]))
+        return popcount(self._intersection(ids))
+
+    # Counts of an (n, k) array of id rows, one itemset per row, ANDed and popcounted a block of rows
+    # at a time. Within a block each column is ANDed in with the bitsets of its items, stacked a bounded
+    # chunk of items at a time, so memory stays a few COUNT_BLOCK_BYTES whatever the vocabulary size.
+    def count_rows(self, ids):
+        ids = np.asarray(ids)
+        if not len(ids) or ids.shape[1] == 0:
+            return np.full(len(ids), self.n_transactions, dtype=np.int64)
+        if ids.shape[1] == 1:
+            return np.diff(self._csc.indptr)[ids[:, 0]].astype(np.int64)
+        counts = np.empty(len(ids), dtype=np.int64)
+        block = max(1, COUNT_BLOCK_BYTES // (self._n_words * 8))
+        for start in range(0, len(ids), block):
+            rows = ids[start:start + block]
+            joined = np.full((len(rows), self._n_words), np.iinfo(np.uint64).max, dtype=np.uint64)
+            for column in range(rows.shape[1]):
+                self._and_column(joined, rows[:, column], block)
+            counts[start:start + block] = popcount_rows(joined)
+        return counts
+
+    # joined[i] &= bitset(item_ids[i]) for every row, stacking at most chunk item bitsets at once
+    def _and_column(self, joined, item_ids, chunk):
+        items, local = np.unique(item_ids, return_inverse=True)
+        for first in range(0, len(items), chunk):
+            bits = np.stack([self.bitset(int(item_id)) for item_id in items[first:first + chunk]])
+            selected = np.flatnonzero((local >= first) & (local < first + len(bits)))
+            joined[selected] &= bits[local[selected] - first]
+
+    # Proportion of transactions that contain every item in items
+    def support(self, items):
+        return self.support_count(items) / self.n_transactions
+
+    # Boolean mask of the transactions that contain every item in items
+    def contains_all(self, items):
+        ids = self.item_ids(items)
+        if not ids:
+            return np.ones(self.n_transactions, dtype=bool)
+        bits = self._intersection(ids)
+        return np.unpackbits(bits.view(np.uint8), count=self.n_transactions, bitorder='little').astype(bool)
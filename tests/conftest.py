@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from mba.pipeline import EncodedDataset
+
+
+# Factory of small EncodedDatasets: a seeded random matrix of the given density (a number, or one per
+# item), or the given dense boolean matrix; items are named item00, item01, ... unless columns are given.
+# Other keyword arguments (transaction_ids, key, timestamps) go to EncodedDataset.
+@pytest.fixture(scope='session')
+def make_dataset():
+    def make(n_transactions=300, n_items=10, density=0.35, seed=0, dense=None, columns=None, **kwargs):
+        if dense is None:
+            dense = np.random.default_rng(seed).random((n_transactions, n_items)) < density
+        dense = np.asarray(dense, dtype=bool)
+        if columns is None:
+            columns = [f'item{i:02d}' for i in range(dense.shape[1])]
+        return EncodedDataset(kwargs.pop('transaction_ids', None), columns, sparse.csr_matrix(dense), **kwargs)
+    return make
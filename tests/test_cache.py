@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mba.cache import ResultCache
+from mba.mining import mine
+from mba.pipeline import PipelineCache
+from mba.rules import generate_rules
+
+
+@pytest.fixture(scope='module')
+def mined(make_dataset):
+    dataset = make_dataset(300, 10, density=0.4)
+    frequent_itemsets = mine(dataset, 0.05, 'eclat').frequent_itemsets
+    return frequent_itemsets, generate_rules(frequent_itemsets, dataset.dictionary)
+
+
+def test_results_round_trip(mined, tmp_path):
+    cache = ResultCache(str(tmp_path))
+    frequent_itemsets, rules = mined
+    cache.save('data', 'eclat', 0.05, 0.0, frequent_itemsets, rules)
+    itemsets, loaded_rules = cache.load('data', 'eclat', 0.05, 0.0)
+    assert itemsets.itemsets.equals(frequent_itemsets.itemsets)
+    assert np.array_equal(itemsets.support, frequent_itemsets.support)
+    assert loaded_rules.antecedents.equals(rules.antecedents) and loaded_rules.consequents.equals(rules.consequents)
+    pd.testing.assert_frame_equal(loaded_rules.metrics, rules.metrics)
+
+
+def test_other_parameters_and_damaged_files_miss(mined, tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.save('data', 'eclat', 0.05, 0.0, *mined)
+    for params in (('other', 'eclat', 0.05, 0.0), ('data', 'apriori', 0.05, 0.0), ('data', 'eclat', 0.06, 0.0),
+                   ('data', 'eclat', 0.05, 0.5)):
+        assert cache.load(*params) is None
+    for name in os.listdir(str(tmp_path)):
+        with open(os.path.join(str(tmp_path), name), 'wb') as f:
+            f.write(b'not parquet')
+    assert cache.load('data', 'eclat', 0.05, 0.0) is None
+
+
+def test_least_recently_used_results_are_evicted(mined, tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.save('first', 'eclat', 0.05, 0.0, *mined)
+    size = cache.total_bytes()
+    cache.max_bytes = 2 * size
+    cache.save('second', 'eclat', 0.05, 0.0, *mined)
+    # Loading the first entry makes the second one the least recently used
+    for name in os.listdir(str(tmp_path)):
+        os.utime(os.path.join(str(tmp_path), name), (0, 0))
+    assert cache.load('first', 'eclat', 0.05, 0.0) is not None
+    cache.save('third', 'eclat', 0.05, 0.0, *mined)
+    assert cache.load('second', 'eclat', 0.05, 0.0) is None
+    assert cache.load('first', 'eclat', 0.05, 0.0) is not None and cache.load('third', 'eclat', 0.05, 0.0) is not None
+    assert cache.total_bytes() <= cache.max_bytes
+
+
+def transactions_csv(n):
+    return ''.join(['Transaction_ID,Items\n'] + [f'{i},"item{i % 7}, item{i % 3}"\n' for i in range(n)]).encode()
+
+
+def test_pipeline_cache_reuses_encoded_datasets():
+    cache = PipelineCache(max_entries=2)
+    first = cache.get(transactions_csv(20))
+    assert cache.get(transactions_csv(20)) is first and len(cache) == 1
+    cache.get(transactions_csv(30))
+    cache.get(transactions_csv(40))
+    assert len(cache) == 2 and cache.get(transactions_csv(20)) is not first
+
+
+def test_pipeline_cache_budget_counts_the_vertical_index():
+    cache = PipelineCache()
+    first = cache.get(transactions_csv(2000))
+    second = cache.get(transactions_csv(3000))
+    cache.max_bytes = cache.total_bytes() + 1
+    # Building the index of the older dataset grows it past the budget, so the next lookup drops it
+    first.support_count(['item0', 'item1'])
+    assert cache.total_bytes() > cache.max_bytes
+    assert cache.get(transactions_csv(3000)) is second and len(cache) == 1
@@ -0,0 +1,75 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from mba.examples import find_multi_item_rule, find_single_item_rule
+
+
+# (support, confidence) of the top rule of the first shape that has any rule, over every itemset of at
+# most max_len items: highest support, then highest confidence
+def brute_force(dataset, shapes, max_len):
+    dense = dataset.matrix.toarray()
+    n = len(dense)
+    count = lambda items: int(dense[:, list(items)].all(axis=1).sum())
+    for antecedent_ok, consequent_ok, below_one in shapes:
+        best = None
+        for size in range(2, max_len + 1):
+            for ids in combinations(range(dense.shape[1]), size):
+                support = count(ids)
+                if support == 0:
+                    continue
+                for antecedent_size in range(1, size):
+                    if not (antecedent_ok(antecedent_size) and consequent_ok(size - antecedent_size)):
+                        continue
+                    for antecedent in combinations(ids, antecedent_size):
+                        confidence = support / count(antecedent)
+                        if below_one and confidence >= 1:
+                            continue
+                        best = max(best or (support / n, confidence), (support / n, confidence))
+        if best is not None:
+            return best
+    return None
+
+
+def one(size):
+    return size == 1
+
+
+def many(size):
+    return size > 1
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_single_item_rule_has_top_support(make_dataset, seed):
+    dataset = make_dataset(seed=seed)
+    rule = find_single_item_rule(dataset)
+    expected = brute_force(dataset, [(one, one, True), (one, one, False)], 2)
+    assert len(rule['antecedents']) == 1 and len(rule['consequents']) == 1
+    assert (rule['support'], rule['confidence']) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_multi_item_rule_has_top_support(make_dataset, seed):
+    dataset = make_dataset(seed=seed)
+    rule = find_multi_item_rule(dataset)
+    expected = brute_force(dataset, [(many, many, True), (many, many, False), (many, one, True), (many, one, False)], 4)
+    assert len(rule['antecedents']) > 1 and len(rule['consequents']) > 1
+    assert (rule['support'], rule['confidence']) == pytest.approx(expected)
+
+
+def test_multi_item_rule_falls_back_to_single_consequent(make_dataset):
+    # Three items never co-occur with a fourth, so no rule has two items on both sides
+    dense = np.zeros((40, 4), dtype=bool)
+    dense[:30, :3] = True
+    dense[30:, 3] = True
+    dense[::4, 2] = False
+    dataset = make_dataset(dense=dense, columns=['a', 'b', 'c', 'd'])
+    rule = find_multi_item_rule(dataset)
+    assert rule['antecedents'] == frozenset({'a', 'b'}) and rule['consequents'] == frozenset({'c'})
+    assert (rule['support'], rule['confidence']) == pytest.approx((22 / 40, 22 / 30))
+
+
+def test_same_rule_on_every_run(make_dataset):
+    rules = [find_multi_item_rule(make_dataset(2000, 40, density=0.1, seed=7)) for _ in range(3)]
+    assert all(rule.equals(rules[0]) for rule in rules)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from mba.display import sort_page
+from mba.incremental import append_transactions, update_itemsets
+from mba.mining import mine
+
+
+def as_dict(itemsets):
+    return {frozenset(items): support for items, support in zip(itemsets.itemsets, itemsets.support)}
+
+
+def test_update_matches_mining_the_appended_data(make_dataset):
+    history = make_dataset(200, 8, density=0.4)
+    batch = make_dataset(50, 8, density=0.6, seed=1)
+    combined = append_transactions(history, batch)
+    updated, _, _ = update_itemsets(mine(history, 0.1, 'eclat').frequent_itemsets, combined, 200, 0.1)
+    expected = mine(combined, 0.1, 'eclat').frequent_itemsets
+    assert as_dict(updated) == pytest.approx(as_dict(expected))
+
+
+def test_update_of_history_without_frequent_itemsets(make_dataset):
+    # Every item of the history is below the floor, so it has no frequent itemsets at all
+    history = make_dataset(dense=np.eye(10, 3))
+    batch = make_dataset(dense=np.ones((10, 3)))
+    previous = mine(history, 0.5, 'eclat').frequent_itemsets
+    assert len(previous) == 0
+    combined = append_transactions(history, batch)
+    updated, _, _ = update_itemsets(previous, combined, 10, 0.5)
+    assert as_dict(updated) == pytest.approx(as_dict(mine(combined, 0.5, 'eclat').frequent_itemsets))
+    assert len(updated) == 7
+
+
+def test_appended_items_sort_and_display_alphabetically(make_dataset):
+    history = make_dataset(60, 4, density=0.6, columns=['b', 'd', 'f', 'h'])
+    batch = make_dataset(60, 4, density=0.6, seed=1, columns=['a', 'c', 'd', 'g'])
+    combined = append_transactions(history, batch)
+    assert combined.columns == ['b', 'd', 'f', 'h', 'a', 'c', 'g']
+    itemsets = mine(combined, 0.05, 'eclat').frequent_itemsets
+    column = itemsets.column('itemsets')
+    text = column.join(combined.dictionary)
+    assert all(row.split(', ') == sorted(row.split(', ')) for row in text)
+    for ascending in (True, False):
+        positions = sort_page(itemsets, 'itemsets', ascending, 0, len(itemsets), combined.dictionary)
+        rows = [row.split(', ') for row in text]
+        assert [rows[i] for i in positions] == sorted(rows, reverse=not ascending)
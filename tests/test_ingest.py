@@ -0,0 +1,66 @@
+import io
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from mba.ingest import iter_encoded_chunks
+from mba.pipeline import load_and_encode
+
+TEMPLATE = b'Transaction_ID,Items\n1,"Bread, Milk"\n2,"Bread, Diapers, Beer"\n3,"Milk, Beer"\n4,Cola\n'
+LONG = (b'Transaction_ID,Item\n1,Bread\n1,Milk\n2,Bread\n2,Diapers\n2,Beer\n3,Milk\n3,Beer\n4,Cola\n')
+
+
+def baskets(dataset):
+    return [sorted(dataset.columns[i] for i in row.indices) for row in dataset.matrix]
+
+
+def test_template_and_long_format_encode_alike():
+    template, long = load_and_encode(TEMPLATE), load_and_encode(LONG)
+    assert template.columns == long.columns == ['Beer', 'Bread', 'Cola', 'Diapers', 'Milk']
+    assert baskets(template) == baskets(long) == [['Bread', 'Milk'], ['Beer', 'Bread', 'Diapers'], ['Beer', 'Milk'], ['Cola']]
+    assert list(template.transaction_ids) == list(long.transaction_ids) == [1, 2, 3, 4]
+
+
+def test_chunked_read_matches_whole_read():
+    whole = load_and_encode(TEMPLATE)
+    chunked = load_and_encode(TEMPLATE, chunksize=1)
+    assert chunked.columns == whole.columns and baskets(chunked) == baskets(whole)
+
+
+def test_parquet_input():
+    buffer = io.BytesIO()
+    pq.write_table(pa.table({'transaction_id': ['a', 'a', 'b', None], 'sku': ['x', 'y', 'x', 'z']}), buffer)
+    dataset = load_and_encode(buffer.getvalue(), name='lines.parquet')
+    assert list(dataset.transaction_ids) == ['a', 'b'] and baskets(dataset) == [['x', 'y'], ['x']]
+
+
+def test_lines_without_id_are_dropped_and_empty_items_skipped():
+    dataset = load_and_encode(b'Transaction_ID,Item\n1,Bread\n,Milk\n1,\n2,Beer\n3,\n')
+    assert dataset.columns == ['Beer', 'Bread']
+    assert list(dataset.transaction_ids) == [1, 2, 3] and baskets(dataset) == [['Bread'], ['Beer'], []]
+    template = load_and_encode(b'Transaction_ID,Items\n1,"Bread, Milk"\n2,\n3,"Beer,,"\n')
+    assert template.columns == ['Beer', 'Bread', 'Milk'] and baskets(template) == [['Bread', 'Milk'], [], ['Beer']]
+
+
+@pytest.mark.parametrize('data', [b'Transaction_ID,Items\n', b'Transaction_ID,Item\n'])
+def test_header_only_file_is_a_clear_error(data):
+    with pytest.raises(ValueError, match='No transactions'):
+        load_and_encode(data)
+
+
+def test_missing_columns_are_a_clear_error():
+    with pytest.raises(ValueError, match='Transaction_ID'):
+        load_and_encode(b'id,Items\n1,Bread\n')
+
+
+def test_timestamps_are_parsed():
+    dataset = load_and_encode(b'Transaction_ID,Items,Timestamp\n1,Bread,2024-01-01 10:00\n2,Milk,not a date\n')
+    assert dataset.timestamps[0] == np.datetime64('2024-01-01T10:00') and np.isnat(dataset.timestamps[1])
+
+
+def test_chunks_hold_whole_transactions():
+    chunks = list(iter_encoded_chunks(io.BytesIO(LONG), chunksize=3))
+    rows = [sorted(columns[i] for i in row.indices) for columns, matrix in chunks for row in matrix]
+    assert rows == baskets(load_and_encode(LONG))
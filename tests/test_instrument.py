@@ -0,0 +1,36 @@
+import tracemalloc
+
+import numpy as np
+
+from mba.instrument import PeakRSS, Recorder, report_child_peak
+
+
+def test_memory_is_not_traced_by_default():
+    recorder = Recorder()
+    with recorder.stage('work') as record:
+        assert not tracemalloc.is_tracing()
+        bytearray(1 << 20)
+    assert record.wall_time is not None and record.peak_memory is None
+
+
+def test_tracing_memory_records_peaks_then_restores():
+    recorder = Recorder()
+    with recorder.tracing_memory():
+        with recorder.stage('outer') as outer:
+            with recorder.stage('inner') as inner:
+                bytearray(4 << 20)
+    assert not recorder.trace_memory and not tracemalloc.is_tracing()
+    assert inner.peak_memory >= 4 << 20 and outer.peak_memory >= inner.peak_memory
+
+
+def test_peak_rss_covers_the_block_and_its_child_processes():
+    with PeakRSS() as outer:
+        with PeakRSS() as inner:
+            block = np.ones((64 << 20) // 8)
+            report_child_peak(123)
+        del block
+    assert inner.peak >= 64 << 20 and outer.peak >= inner.peak
+    assert inner.child_peak == outer.child_peak == 123
+    report_child_peak(456)
+    assert outer.child_peak == 123
+
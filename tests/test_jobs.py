@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+import pytest
+
+from mba.jobs import JobManager, checkpoint
+from mba.mining import mine
+
+
+@pytest.fixture
+def jobs():
+    manager = JobManager(max_workers=2)
+    yield manager
+    manager.shutdown()
+
+
+def test_checkpoint_outside_a_job_does_nothing():
+    checkpoint(stage='mine', level=2)
+
+
+def test_submitting_to_a_group_supersedes_its_other_jobs(jobs):
+    def wait_for_cancel():
+        while True:
+            checkpoint(stage='wait')
+            time.sleep(0.01)
+
+    first = jobs.submit('first', wait_for_cancel, group='mining')
+    second = jobs.submit('second', lambda: 42, group='mining')
+    assert first.wait(5) and first.state == 'cancelled' and first.superseded
+    assert second.wait(5) and jobs.result('second') == 42
+
+
+def test_a_job_another_group_waits_on_is_not_superseded(jobs):
+    def wait_for_cancel():
+        while True:
+            checkpoint(stage='wait')
+            time.sleep(0.01)
+
+    shared = jobs.submit('shared', wait_for_cancel, group=('mine', 'a'))
+    assert jobs.submit('shared', wait_for_cancel, group=('mine', 'b')) is shared
+    jobs.submit('other', lambda: 1, group=('mine', 'a'))
+    time.sleep(0.1)
+    assert shared.active and not shared.cancel_requested
+    jobs.submit('another', lambda: 2, group=('mine', 'b'))
+    assert shared.wait(5) and shared.state == 'cancelled' and shared.superseded
+
+
+@pytest.mark.parametrize('algorithm', ['apriori', 'fpgrowth', 'fpmax'])
+def test_mlxtend_backends_in_a_job_match_a_direct_run(make_dataset, jobs, algorithm):
+    dataset = make_dataset(300, 10, density=0.4)
+    expected = mine(dataset, 0.05, algorithm).frequent_itemsets
+    job = jobs.submit(algorithm, lambda: mine(dataset, 0.05, algorithm))
+    assert job.wait(60) and job.state == 'done', job.error
+    # The peak of the child process that mined, sent back with its itemsets
+    assert job.result.peak_rss > 0 and 'peak RSS' in job.result.summary()
+    result = job.result.frequent_itemsets
+    assert np.array_equal(result.support, expected.support)
+    assert np.array_equal(result.itemsets.ids, expected.itemsets.ids)
+    assert np.array_equal(result.itemsets.offsets, expected.itemsets.offsets)
+
+
+def test_cancelling_an_mlxtend_backend_stops_it_part_way(make_dataset, jobs):
+    # A run that takes tens of seconds
+    dataset = make_dataset(2000, 40, density=0.5)
+    job = jobs.submit('slow', lambda: mine(dataset, 0.1, 'fpgrowth'))
+    deadline = time.time() + 30
+    while 'elapsed' not in job.describe() and time.time() < deadline:
+        time.sleep(0.05)
+    assert 'elapsed' in job.describe()
+    jobs.cancel('slow')
+    assert job.wait(5) and job.state == 'cancelled'
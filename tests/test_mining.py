@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+from mlxtend.frequent_patterns import apriori, association_rules, fpmax
+
+from mba.mining import mine, mine_for_rules
+from mba.rules import generate_rules
+
+METRICS = ['antecedent support', 'consequent support', 'support', 'confidence', 'lift', 'leverage', 'conviction']
+
+
+@pytest.fixture(scope='module')
+def dataset(make_dataset):
+    return make_dataset(400, 12, density=np.linspace(0.6, 0.1, 12))
+
+
+# Serial mlxtend apriori on the same data, itemsets as frozensets of names
+def reference(dataset, min_support, max_len=None):
+    return apriori(dataset.sparse_frame(), min_support=min_support, use_colnames=True, max_len=max_len)
+
+
+def as_dict(frame):
+    return dict(zip(frame['itemsets'], frame['support']))
+
+
+@pytest.mark.parametrize('algorithm, workers', [('apriori', 1), ('fpgrowth', 1), ('eclat', 1),
+                                                ('parallel_eclat', 1), ('parallel_eclat', 3)])
+@pytest.mark.parametrize('max_len', [None, 2])
+def test_backends_match_mlxtend_apriori(dataset, algorithm, workers, max_len):
+    result = mine(dataset, 0.03, algorithm, max_len=max_len, workers=workers)
+    assert as_dict(result.frequent_itemsets.frame(dataset.dictionary)) == pytest.approx(
+        as_dict(reference(dataset, 0.03, max_len)))
+
+
+def test_parallel_eclat_matches_the_serial_order(dataset):
+    serial = mine(dataset, 0.03, 'eclat').frequent_itemsets
+    parallel = mine(dataset, 0.03, 'parallel_eclat', workers=3).frequent_itemsets
+    assert parallel.itemsets.equals(serial.itemsets) and np.array_equal(parallel.support, serial.support)
+
+
+def test_fpmax_matches_mlxtend_and_the_maximal_frequent_itemsets(dataset):
+    result = as_dict(mine(dataset, 0.03, 'fpmax').frequent_itemsets.frame(dataset.dictionary))
+    assert result == pytest.approx(as_dict(fpmax(dataset.sparse_frame(), min_support=0.03, use_colnames=True)))
+    frequent = as_dict(reference(dataset, 0.03))
+    maximal = {items: support for items, support in frequent.items() if not any(items < other for other in frequent)}
+    assert result == pytest.approx(maximal)
+
+
+def test_closed_itemsets_have_no_superset_of_the_same_support(dataset):
+    result = as_dict(mine(dataset, 0.03, 'closed').frequent_itemsets.frame(dataset.dictionary))
+    frequent = as_dict(reference(dataset, 0.03))
+    closed = {items: support for items, support in frequent.items()
+              if not any(items < other and np.isclose(support, frequent[other]) for other in frequent)}
+    assert result == pytest.approx(closed)
+
+
+@pytest.mark.parametrize('algorithm', ['fpmax', 'closed'])
+def test_condensed_results_expand_to_every_frequent_itemset(dataset, algorithm):
+    result = mine_for_rules(dataset, 0.03, algorithm)
+    assert as_dict(result.frequent_itemsets.frame(dataset.dictionary)) == pytest.approx(as_dict(reference(dataset, 0.03)))
+
+
+# Metric columns of a rules frame indexed and sorted by (antecedents, consequents) as sorted name tuples
+def by_rule(frame):
+    index = pd.MultiIndex.from_arrays([[tuple(sorted(items)) for items in frame[column]]
+                                       for column in ('antecedents', 'consequents')])
+    return frame[METRICS].set_axis(index).sort_index()
+
+
+# mlxtend association rules of the reference itemsets
+def reference_rules(dataset, min_confidence):
+    return association_rules(reference(dataset, 0.03), num_itemsets=dataset.n_transactions,
+                             metric='confidence', min_threshold=min_confidence)
+
+
+# generate_rules filters, each with the same filter applied to an mlxtend rule row
+RULE_FILTERS = [
+    ({}, lambda rule: True),
+    ({'min_support': 0.1}, lambda rule: rule['support'] >= 0.1),
+    ({'min_lift': 1.1}, lambda rule: rule['lift'] >= 1.1),
+    ({'antecedent_items': ['item00']}, lambda rule: 'item00' in rule['antecedents']),
+    ({'consequent_items': ['item01']}, lambda rule: 'item01' in rule['consequents']),
+    ({'antecedent_len': (2, None)}, lambda rule: len(rule['antecedents']) >= 2),
+    ({'consequent_len': (None, 1)}, lambda rule: len(rule['consequents']) <= 1),
+]
+
+
+@pytest.mark.parametrize('filters, expected_filter', RULE_FILTERS)
+def test_rules_match_mlxtend_association_rules(dataset, filters, expected_filter):
+    frequent_itemsets = mine(dataset, 0.03, 'eclat').frequent_itemsets
+    rules = generate_rules(frequent_itemsets, dataset.dictionary, min_confidence=0.3, **filters)
+    result = by_rule(rules.frame(dataset.dictionary))
+    expected = reference_rules(dataset, 0.3)
+    expected = by_rule(expected[expected.apply(expected_filter, axis=1).astype(bool)])
+    assert len(result) > 0 and result.index.equals(expected.index)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('sort_by', ['confidence', 'lift', 'support'])
+def test_top_k_rules_are_the_best_mlxtend_rules(dataset, sort_by):
+    frequent_itemsets = mine(dataset, 0.03, 'eclat').frequent_itemsets
+    rules = generate_rules(frequent_itemsets, dataset.dictionary, min_confidence=0.3, top_k=15, sort_by=sort_by)
+    result = rules.frame(dataset.dictionary)
+    expected = by_rule(reference_rules(dataset, 0.3))
+    assert len(result) == 15
+    # Best first, and the same scores as the 15 best mlxtend rules (ties may pick different rules)
+    assert list(result[sort_by]) == sorted(result[sort_by], reverse=True)
+    assert np.allclose(result[sort_by], np.sort(expected[sort_by].to_numpy())[::-1][:15])
+    result = by_rule(result)
+    matched = expected.loc[result.index]
+    assert np.allclose(matched[METRICS].to_numpy(), result[METRICS].to_numpy())
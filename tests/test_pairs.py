@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from mba.mining import mine
+from mba.pairs import PairMatrix
+from mba.rules import generate_rules
+
+
+@pytest.fixture(scope='module')
+def dataset(make_dataset):
+    return make_dataset(400, 12, density=np.linspace(0.6, 0.05, 12))
+
+
+def rules_dict(rules, metrics=('support', 'confidence', 'lift', 'leverage', 'conviction')):
+    return {(int(rules.antecedents[i][0]), int(rules.consequents[i][0])): tuple(rules.metrics.iloc[i][list(metrics)])
+            for i in range(len(rules))}
+
+
+@pytest.mark.parametrize('min_support', [0.0, 0.05])
+def test_pair_rules_match_the_mined_two_item_rules(dataset, min_support):
+    pairs = PairMatrix(dataset)
+    floor = min_support or 1 / dataset.n_transactions
+    expected = generate_rules(mine(dataset, floor, 'eclat', max_len=2).frequent_itemsets, dataset.dictionary)
+    result = rules_dict(pairs.rules(min_support))
+    assert result.keys() == rules_dict(expected).keys()
+    for key, metrics in rules_dict(expected).items():
+        assert result[key] == pytest.approx(metrics)
+
+
+def test_item_counts(dataset):
+    pairs = PairMatrix(dataset)
+    assert np.array_equal(pairs.item_counts, dataset.matrix.toarray().sum(axis=0))
+    assert list(pairs.frequent_item_ids(3)) == list(np.argsort(-pairs.item_counts, kind='stable')[:3])
+
+
+@pytest.mark.parametrize('sort_by', ['lift', 'confidence', 'support'])
+def test_top_pairs_are_the_best_pairs(dataset, sort_by):
+    pairs = PairMatrix(dataset)
+    top = pairs.top(10, sort_by=sort_by)
+    assert len(top) == 10
+    assert np.allclose(top.column(sort_by), np.sort(pairs.rules().column(sort_by))[::-1][:10])
+
+
+def test_block_matches_the_pair_rules(dataset):
+    pairs = PairMatrix(dataset)
+    item_ids = pairs.frequent_item_ids(5)
+    block = pairs.block(item_ids, 'lift')
+    lifts = {key: lift for key, (lift,) in rules_dict(pairs.rules(), ('lift',)).items()}
+    for row, a in enumerate(item_ids):
+        for column, b in enumerate(item_ids):
+            if a == b:
+                assert np.isnan(block[row, column])
+            else:
+                assert block[row, column] == pytest.approx(lifts.get((a, b), 0.0))
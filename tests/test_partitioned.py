@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from mba.mining import mine, mine_for_rules
+from mba.partitioned import mine_partitioned
+from mba.pipeline import load_and_encode
+
+
+# Template CSV of 600 random baskets. Later rows use items the first chunks never saw, so item ids
+# are assigned in a different order than the sorted names.
+@pytest.fixture(scope='module')
+def path(tmp_path_factory):
+    rng = np.random.default_rng(5)
+    names = [f'z{i}' for i in range(4)] + [f'a{i}' for i in range(8)]
+    dense = rng.random((600, len(names))) < np.linspace(0.5, 0.1, len(names))
+    dense[:200, 8:] = False
+    dense[np.arange(600), rng.integers(0, len(names), 600)] = True
+    lines = ['Transaction_ID,Items'] + [f'{i},"{", ".join(np.array(names)[row])}"' for i, row in enumerate(dense)]
+    path = tmp_path_factory.mktemp('partitioned') / 'baskets.csv'
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def as_dict(table, columns):
+    return {frozenset(columns[i] for i in table.itemsets[j]): table.support[j] for j in range(len(table))}
+
+
+@pytest.mark.parametrize('algorithm', ['apriori', 'eclat', 'fpmax', 'closed'])
+@pytest.mark.parametrize('chunksize', [70, 600])
+def test_partitioned_mining_matches_mining_in_memory(path, algorithm, chunksize):
+    with open(path, 'rb') as f:
+        dataset = load_and_encode(f.read())
+    result = mine_partitioned(path, 0.05, algorithm=algorithm, chunksize=chunksize)
+    assert result.columns == sorted(result.columns) == dataset.columns
+    assert result.n_transactions == 600 and result.n_chunks == -(-600 // chunksize)
+    assert as_dict(result.mining.frequent_itemsets, result.columns) == pytest.approx(
+        as_dict(mine(dataset, 0.05, algorithm).frequent_itemsets, dataset.columns))
+    assert as_dict(result.all_itemsets, result.columns) == pytest.approx(
+        as_dict(mine_for_rules(dataset, 0.05, 'eclat').frequent_itemsets, dataset.columns))
+    assert result.mining.peak_rss > 0
+
+
+def test_partitioned_mining_without_frequent_itemsets(path):
+    result = mine_partitioned(path, 1.0, algorithm='eclat', chunksize=100)
+    assert len(result.mining.frequent_itemsets) == 0 and len(result.all_itemsets) == 0
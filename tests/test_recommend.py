@@ -0,0 +1,113 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from mba.mining import mine
+from mba.recommend import Recommender, handle_request, make_server
+from mba.rules import generate_rules
+
+
+@pytest.fixture(scope='module')
+def mined(make_dataset):
+    dataset = make_dataset(400, 12, density=np.linspace(0.6, 0.1, 12))
+    rules = generate_rules(mine(dataset, 0.02, 'eclat').frequent_itemsets, dataset.dictionary)
+    return dataset, rules
+
+
+def baskets(dataset, n_baskets=60, seed=1):
+    rng = np.random.default_rng(seed)
+    return [list(rng.choice(dataset.columns, size=rng.integers(0, 5), replace=False)) for _ in range(n_baskets)]
+
+
+# Every consequent item outside the basket of every rule whose antecedent the basket holds, with its
+# best score, best first and ties by item name
+def brute_force(dataset, rules, basket, sort_by, n):
+    held = {dataset.dictionary.index[item] for item in basket}
+    antecedents, consequents = rules.column('antecedents'), rules.column('consequents')
+    best = {}
+    for i, score in enumerate(rules.column(sort_by)):
+        if set(antecedents[i].tolist()) <= held:
+            for item in set(consequents[i].tolist()) - held:
+                best[item] = max(best.get(item, -np.inf), score)
+    ranked = sorted(best.items(), key=lambda entry: (-entry[1], dataset.columns[entry[0]]))[:n]
+    return [(dataset.columns[item], score) for item, score in ranked]
+
+
+@pytest.mark.parametrize('sort_by', ['confidence', 'lift'])
+def test_recommend_matches_brute_force(mined, sort_by):
+    dataset, rules = mined
+    recommender = Recommender(rules, dataset.dictionary, sort_by=sort_by)
+    for basket in baskets(dataset):
+        expected = brute_force(dataset, rules, basket, sort_by, 3)
+        result = recommender.recommend(basket, n=3)
+        assert [item for item, _ in result] == [item for item, _ in expected]
+        assert [score for _, score in result] == pytest.approx([score for _, score in expected])
+
+
+def test_recommend_batch_matches_recommend(mined, monkeypatch):
+    dataset, rules = mined
+    recommender = Recommender(rules, dataset.dictionary)
+    batch = baskets(dataset, n_baskets=200, seed=2)
+    # Small blocks, so the batch is scored in several of them
+    monkeypatch.setattr('mba.recommend.BATCH_CANDIDATES', 50)
+    frame = recommender.recommend_batch(batch, n=4)
+    for position, basket in enumerate(batch):
+        rows = frame[frame['basket'] == position]
+        assert list(rows['rank']) == list(range(1, len(rows) + 1))
+        assert list(zip(rows['item'], rows['score'])) == recommender.recommend(basket, n=4)
+
+
+def test_recommend_batch_of_a_sparse_matrix(mined):
+    dataset, rules = mined
+    recommender = Recommender(rules, dataset.dictionary)
+    frame = recommender.recommend_batch(dataset.matrix[:50], n=2)
+    expected = recommender.recommend_batch([list(dataset.columns[i] for i in row.indices) for row in dataset.matrix[:50]], n=2)
+    assert frame.equals(expected)
+
+
+def test_handle_request(mined):
+    dataset, rules = mined
+    recommender = Recommender(rules, dataset.dictionary)
+    basket = ['item00', 'item01']
+    single = handle_request(recommender, {'basket': basket, 'n': 2})
+    assert [(entry['item'], entry['score']) for entry in single['recommendations']] == recommender.recommend(basket, n=2)
+    batch = handle_request(recommender, {'baskets': [basket, [], ['no such item']], 'n': 2})
+    assert batch['recommendations'] == [single['recommendations'], [], []]
+    assert handle_request(recommender, {'basket': []}) == {'recommendations': []}
+    assert handle_request(recommender, {'basket': ['no such item', 'item00']}) == handle_request(recommender, {'basket': ['item00']})
+    bad = (['item00'], {'items': ['item00']}, 'not json', {'basket': 'item00'}, {'baskets': ['item00']},
+           {'basket': ['item00'], 'n': -1}, {'baskets': [['item00']], 'n': -1})
+    for request in bad:
+        with pytest.raises(ValueError):
+            handle_request(recommender, request)
+
+
+def test_server_round_trip(mined):
+    dataset, rules = mined
+    recommender = Recommender(rules, dataset.dictionary)
+    server = make_server(recommender, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = 'http://{}:{}'.format(*server.server_address[:2])
+    try:
+        def post(body):
+            request = urllib.request.Request(f'{url}/recommend', data=body, headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, json.load(response)
+
+        with urllib.request.urlopen(f'{url}/health', timeout=10) as response:
+            assert json.load(response) == {'status': 'ok', 'rules': recommender.n_rules, 'sort_by': 'confidence'}
+        status, body = post(json.dumps({'basket': ['item00'], 'n': 3}).encode())
+        assert status == 200 and body == handle_request(recommender, {'basket': ['item00'], 'n': 3})
+        for body in (b'{not json', b'{"basket": "item00"}', b'{"basket": ["item00"], "n": -1}'):
+            with pytest.raises(urllib.error.HTTPError) as error:
+                post(body)
+            assert error.value.code == 400 and 'error' in json.load(error.value)
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -0,0 +1,35 @@
+import pytest
+
+from mba.mining import mine
+from mba.sampling import SamplePreview
+
+
+def as_dict(table):
+    return {frozenset(items.tolist()): support for items, support in zip(table.itemsets, table.support)}
+
+
+@pytest.mark.parametrize('min_support', [0.05, 0.1, 0.2])
+def test_verification_is_exact_and_reports_the_sample_error(make_dataset, min_support):
+    dataset = make_dataset(3000, 12, density=0.25)
+    preview = SamplePreview(dataset, sample_size=300)
+    verification = preview.verify(min_support)
+    exact = as_dict(mine(dataset, min_support, 'eclat').frequent_itemsets)
+    assert as_dict(verification.itemsets) == pytest.approx(exact)
+
+    estimated = set(as_dict(preview.estimates(min_support)))
+    assert verification.n_estimated == len(estimated)
+    assert verification.false_positives == len(estimated - exact.keys())
+    assert verification.missed == len(exact.keys() - estimated)
+    assert 'false positives' in verification.summary()
+
+
+def test_small_sample_misses_are_completed(make_dataset):
+    dataset = make_dataset(5000, 15, density=0.2, seed=3)
+    preview = SamplePreview(dataset, sample_size=50, miss_probability=0.5)
+    for min_support in (0.03, 0.05, 0.08):
+        verification = preview.verify(min_support)
+        exact = as_dict(mine(dataset, min_support, 'eclat').frequent_itemsets)
+        assert as_dict(verification.itemsets) == pytest.approx(exact)
+        estimated = set(as_dict(preview.estimates(min_support)))
+        assert verification.false_positives == len(estimated - exact.keys()) > 0
+        assert verification.missed == len(exact.keys() - estimated)
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+
+from mba.pipeline import PipelineCache
+from mba.snapshot import SnapshotStore, array_files
+
+
+def dataset(make_dataset, key, **kwargs):
+    return make_dataset(50, 6, density=0.5, key=key, **kwargs)
+
+
+def test_round_trip(make_dataset, tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    timestamps = np.arange(50).astype('datetime64[D]')
+    original = dataset(make_dataset, 'k1', timestamps=timestamps)
+    store.save(original)
+    transaction_ids, columns, csr, csc, loaded_timestamps = store.load('k1')
+    assert columns == original.columns
+    assert (csr != original.matrix).nnz == 0 and (csc != original.matrix.tocsc()).nnz == 0
+    assert transaction_ids.dtype == original.transaction_ids.dtype
+    assert np.array_equal(transaction_ids, original.transaction_ids)
+    assert np.array_equal(loaded_timestamps, original.timestamps)
+
+
+def test_object_transaction_ids_keep_their_values(make_dataset, tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    ids = np.array([f'T{i}' if i % 2 else i for i in range(50)], dtype=object)
+    store.save(dataset(make_dataset, 'k1', transaction_ids=ids))
+    transaction_ids = store.load('k1')[0]
+    assert transaction_ids.dtype == object
+    assert transaction_ids.tolist() == ids.tolist()
+
+
+def test_least_recently_used_snapshots_are_evicted(make_dataset, tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.save(dataset(make_dataset, 'k1'))
+    size = store.total_bytes()
+    store.max_bytes = 2 * size
+    store.save(dataset(make_dataset, 'k2'))
+    os.utime(os.path.join(str(tmp_path), 'k1', 'columns.json'), (0, 0))
+    os.utime(os.path.join(str(tmp_path), 'k2', 'columns.json'), (1, 1))
+    assert store.load('k1') is not None
+    store.save(dataset(make_dataset, 'k3'))
+    assert 'k1' in store and 'k2' not in store and 'k3' in store
+    assert store.total_bytes() <= store.max_bytes
+
+
+def mapped(array):
+    while array is not None and not isinstance(array, np.memmap):
+        array = array.base
+    return array is not None
+
+
+def test_snapshot_datasets_count_towards_the_cache_budget(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    data = b'Transaction_ID,Items\n1,"Bread, Milk"\n2,"Bread, Beer"\n3,"Milk"\n'
+    cache = PipelineCache(snapshot_store=store)
+    loaded = cache.get(data)
+    assert loaded.key in store and mapped(loaded.matrix.indices)
+    assert loaded.nbytes() > 0 and cache.total_bytes() == loaded.nbytes()
+
+
+def test_array_files_use_the_snapshot_files_of_mapped_arrays(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots'))
+    cache = PipelineCache(snapshot_store=store)
+    loaded = cache.get(b'Transaction_ID,Items\n1,"Bread, Milk"\n2,"Bread, Beer"\n3,"Milk"\n')
+    in_memory = np.arange(10)
+    with array_files([loaded.matrix.indices, in_memory, loaded.matrix.indices[1:]]) as paths:
+        assert paths[0] == os.path.join(store.directory, loaded.key, 'csr_indices.npy')
+        assert not paths[1].startswith(store.directory) and not paths[2].startswith(store.directory)
+        for path, array in zip(paths, [loaded.matrix.indices, in_memory, loaded.matrix.indices[1:]]):
+            assert np.array_equal(np.load(path, mmap_mode='r'), array)
+    assert not os.path.exists(paths[1]) and os.path.exists(paths[0])
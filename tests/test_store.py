@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from mba.cache import ResultCache
+from mba.mining import mine, mine_for_rules
+from mba.rules import generate_rules
+from mba.store import MinedStore
+
+FLOOR = 0.02
+
+
+@pytest.fixture(scope='module')
+def dataset(make_dataset):
+    return make_dataset(400, 12, density=np.linspace(0.6, 0.1, 12), key='store')
+
+
+def itemsets_dict(table, dataset):
+    return {frozenset(dataset.dictionary.decode(table.itemsets[i])): table.support[i] for i in range(len(table))}
+
+
+def rules_dict(rules):
+    return {(tuple(rules.antecedents[i]), tuple(rules.consequents[i])): (support, confidence)
+            for i, (support, confidence) in enumerate(zip(rules.column('support'), rules.column('confidence')))}
+
+
+@pytest.mark.parametrize('algorithm', ['eclat', 'fpmax', 'closed'])
+@pytest.mark.parametrize('min_support', [FLOOR, 0.05, 0.2])
+def test_itemsets_above_a_threshold_match_mining_at_it(dataset, algorithm, min_support):
+    store = MinedStore(dataset, algorithm=algorithm, floor_support=FLOOR)
+    expected = mine(dataset, min_support, algorithm).frequent_itemsets
+    result = store.itemsets.above(min_support)
+    assert itemsets_dict(result, dataset) == pytest.approx(itemsets_dict(expected, dataset))
+    assert np.all(np.diff(result.support) <= 0)
+
+
+@pytest.mark.parametrize('min_support, min_confidence, antecedent_items, consequent_items', [
+    (FLOOR, 0.0, (), ()), (0.05, 0.4, (), ()), (0.03, 0.2, ('item00',), ()), (0.03, 0.2, (), ('item01', 'item02')),
+    (0.03, 0.0, ('no such item',), ()),
+])
+def test_filtered_rules_match_generating_them_at_the_thresholds(dataset, min_support, min_confidence,
+                                                                 antecedent_items, consequent_items):
+    store = MinedStore(dataset, algorithm='eclat', floor_support=FLOOR)
+    result = store.rules.filter(min_support, min_confidence, antecedent_items, consequent_items)
+    expected = generate_rules(mine_for_rules(dataset, min_support, 'eclat').frequent_itemsets, dataset.dictionary,
+                              min_confidence=min_confidence, antecedent_items=antecedent_items,
+                              consequent_items=consequent_items)
+    assert rules_dict(result) == pytest.approx(rules_dict(expected))
+    order = np.lexsort((-result.column('confidence'), -result.column('support')))
+    assert np.array_equal(order, np.arange(len(result)))
+
+
+def test_top_rules_push_the_filters_down(dataset):
+    store = MinedStore(dataset, algorithm='eclat', floor_support=FLOOR)
+    result = store.top_rules(10, 'lift', min_support=0.03, min_confidence=0.3)
+    candidates = store.rules.filter(0.03, 0.3)
+    assert len(result) == 10
+    assert np.allclose(result.column('lift'), np.sort(candidates.column('lift'))[::-1][:10])
+
+
+def test_store_is_saved_to_and_loaded_from_the_result_cache(dataset, tmp_path):
+    cache = ResultCache(str(tmp_path))
+    mined = MinedStore(dataset, algorithm='eclat', floor_support=FLOOR, result_cache=cache)
+    loaded = MinedStore(dataset, algorithm='eclat', floor_support=FLOOR, result_cache=cache)
+    assert mined.mining is not None and loaded.mining is None
+    assert 'loaded from disk cache' in loaded.summary()
+    assert itemsets_dict(loaded.itemsets.above(FLOOR), dataset) == itemsets_dict(mined.itemsets.above(FLOOR), dataset)
+    assert rules_dict(loaded.rules.filter()) == rules_dict(mined.rules.filter())
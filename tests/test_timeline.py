@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mba.mining import mine
+from mba.timeline import BucketedCounts, bucket_codes, rule_timeline
+
+
+# 300 transactions over ten days: day 4 has none, and a few have no timestamp
+@pytest.fixture(scope='module')
+def timed(make_dataset):
+    rng = np.random.default_rng(2)
+    dense = rng.random((300, 8)) < np.linspace(0.6, 0.1, 8)
+    days = rng.choice([0, 1, 2, 3, 5, 6, 7, 8, 9], size=300)
+    timestamps = (np.datetime64('2024-03-01') + days).astype('datetime64[ns]')
+    timestamps[::37] = np.datetime64('NaT')
+    return make_dataset(dense=dense, timestamps=timestamps), dense, days
+
+
+def as_dict(table):
+    return {tuple(table.itemsets[i]): table.support[i] for i in range(len(table))}
+
+
+def test_bucket_codes_cover_every_bucket_from_first_to_last(timed):
+    dataset, _, days = timed
+    codes, labels = bucket_codes(dataset.timestamps, 'D')
+    assert len(labels) == 10 and str(labels[0]) == '2024-03-01'
+    assert np.array_equal(codes[::37], np.full(len(codes[::37]), -1))
+    valid = codes >= 0
+    assert np.array_equal(codes[valid], days[valid])
+
+
+@pytest.mark.parametrize('end, length', [(3, 1), (4, 1), (5, 3), (9, 10), (9, 4)])
+def test_window_matches_mining_its_transactions(make_dataset, timed, end, length):
+    dataset, dense, days = timed
+    counts = BucketedCounts(dataset, 'D', min_support=0.1)
+    valid = ~np.isnat(dataset.timestamps)
+    rows = valid & (days > end - length) & (days <= end)
+    result = counts.window(end, length, min_support=0.15)
+    if not rows.any():
+        assert len(result) == 0
+        return
+    expected = mine(make_dataset(dense=dense[rows]), 0.15, 'eclat').frequent_itemsets
+    assert as_dict(result) == pytest.approx(as_dict(expected))
+
+
+def test_sliding_windows_match_each_window(timed):
+    dataset, _, _ = timed
+    counts = BucketedCounts(dataset, 'D', min_support=0.1)
+    windows = list(counts.sliding(3, min_support=0.1))
+    assert [label for label, _ in windows] == list(counts.labels)
+    for end, (_, table) in enumerate(windows):
+        assert as_dict(table) == pytest.approx(as_dict(counts.window(end, 3, min_support=0.1)))
+
+
+@pytest.mark.parametrize('window', [1, 3])
+def test_rule_timeline_matches_brute_force(timed, window):
+    dataset, dense, days = timed
+    frame = rule_timeline(dataset, ['item00'], ['item01'], freq='D', window=window)
+    assert list(frame.index) == list(pd.date_range('2024-03-01', periods=10, freq='D'))
+    valid = ~np.isnat(dataset.timestamps)
+    for end in range(10):
+        rows = valid & (days > end - window) & (days <= end)
+        both, antecedent = (dense[rows, 0] & dense[rows, 1]).sum(), dense[rows, 0].sum()
+        assert frame['transactions'].iloc[end] == rows.sum()
+        if rows.any():
+            assert frame['support'].iloc[end] == pytest.approx(both / rows.sum())
+            assert frame['confidence'].iloc[end] == pytest.approx(both / antecedent)
+            assert frame['lift'].iloc[end] == pytest.approx(both / antecedent / (dense[rows, 1].sum() / rows.sum()))
+        else:
+            assert np.isnan(frame['support'].iloc[end])
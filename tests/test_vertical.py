@@ -0,0 +1,40 @@
+import numpy as np
+
+from mba.vertical import VerticalIndex
+
+
+def brute_force(dataset, ids):
+    dense = dataset.matrix.toarray()
+    return np.array([int(dense[:, list(row)].all(axis=1).sum()) for row in ids])
+
+
+def test_count_rows_in_small_blocks_matches_brute_force(make_dataset, monkeypatch):
+    dataset = make_dataset(500, 30, density=0.4)
+    rng = np.random.default_rng(3)
+    ids = np.sort(np.array([rng.choice(30, size=3, replace=False) for _ in range(200)]), axis=1)
+    expected = brute_force(dataset, ids)
+    assert np.array_equal(dataset.vertical.count_rows(ids), expected)
+    # Blocks of one row and chunks of one item bitset
+    monkeypatch.setattr('mba.vertical.COUNT_BLOCK_BYTES', 8)
+    assert np.array_equal(dataset.vertical.count_rows(ids), expected)
+
+
+def test_bitset_caches_are_bounded_by_bytes(make_dataset):
+    dataset = make_dataset(640, 20, density=0.5)
+    bitset_bytes = 640 // 8
+    vertical = VerticalIndex(dataset.matrix, dataset.columns, cache_bytes=3 * bitset_bytes,
+                             bitset_cache_bytes=5 * bitset_bytes)
+    for first in range(19):
+        assert vertical.support_count([dataset.columns[first], dataset.columns[first + 1]]) \
+            == brute_force(dataset, [(first, first + 1)])[0]
+    assert len(vertical._bitsets) == 5 and len(vertical._intersections) == 3
+    assert vertical.cache_nbytes() == 8 * bitset_bytes
+
+
+def test_dataset_size_includes_the_vertical_index(make_dataset):
+    dataset = make_dataset(400, 10)
+    before = dataset.nbytes()
+    dataset.support_count(['item00', 'item01', 'item02'])
+    vertical = dataset.vertical
+    assert dataset.nbytes() == before + vertical.csc.indices.nbytes + vertical.csc.indptr.nbytes + vertical.cache_nbytes()
+    assert vertical.cache_nbytes() > 0